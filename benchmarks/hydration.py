@@ -0,0 +1,100 @@
+import timeit
+
+from bson import ObjectId
+
+from minerva.categories.dates import Date
+from minerva.categories.employments import Employment
+from minerva.categories.housings import Housing
+from minerva.categories.links import Link
+from minerva.categories.logins import Login
+from minerva.categories.notes import Note
+from minerva.categories.recipes import Recipe
+from minerva.categories.tags import Tag
+from minerva.helpers.caches import tag_cache
+
+NUM_RECORDS = 5000
+TAGS = ["first", "second", "third"]
+ADDRESS = {
+    "number": "1",
+    "street": "Main St",
+    "city": "Springfield",
+    "state": "IL",
+    "zip_code": "12345",
+    "extra": "",
+}
+# One stored document per category, as `find_all_no_limit()` would get it from Mongo
+RECORDS = {
+    Date: {
+        "name": "Birthday",
+        "day": "07",
+        "month": "04",
+        "year": "1990",
+        "notes": [],
+        "tags": TAGS,
+    },
+    Employment: {
+        "title": "Engineer",
+        "salary": 100,
+        "employer": {"name": "ACME", "address": ADDRESS, "phone": "555-5555", "supervisor": ""},
+        "start_month": "01",
+        "start_year": "2015",
+        "end_month": "12",
+        "end_year": "2019",
+        "tags": TAGS,
+    },
+    Housing: {
+        "address": ADDRESS,
+        "start_month": "01",
+        "start_year": "2015",
+        "end_month": "",
+        "end_year": "",
+        "monthly_payment": 1000,
+        "tags": TAGS,
+    },
+    Link: {"name": "Search", "url": "ddg.com", "notes": ["private"], "tags": TAGS},
+    Login: {
+        "application": "Email",
+        "password": "hunter2",
+        "url": "mail.com",
+        "username": "me",
+        "email": "me@mail.com",
+        "security_questions": [{"question": "Pet?", "answer": "Dog"}] * 3,
+        "tags": TAGS,
+    },
+    Note: {"contents": "Remember the milk", "url": "", "tags": TAGS},
+    Recipe: {
+        "name": "Soup",
+        "ingredients": [{"amount": "1 cup", "item": "water"}] * 10,
+        "instructions": ["boil", "serve"],
+        "recipe_type": "soup",
+        "url": "",
+        "source": "",
+        "notes": [],
+        "tags": TAGS,
+    },
+    Tag: {"name": "first"},
+}
+
+
+def hydrate_all(category, trusted: bool) -> None:
+    record = RECORDS[category]
+    for _ in range(NUM_RECORDS):
+        category.from_mongo({"_id": ObjectId(), **record}, trusted=trusted)
+
+
+if __name__ == "__main__":
+    """
+    Compares validated (full constructor) and trusted hydration of the documents that
+    `find_all_no_limit()` would return, without needing a running Mongo instance.
+    The tag cache is primed up front so the validated path never hits the datastore.
+    """
+    tag_cache.names(lambda: TAGS)
+    print(f"--- Hydrating {NUM_RECORDS} records per category ---")
+    print(f"{'Category':<12}{'validated':>12}{'trusted':>12}{'speedup':>10}")
+    for category in RECORDS:
+        validated = min(timeit.repeat(lambda: hydrate_all(category, False), number=1, repeat=3))
+        trusted = min(timeit.repeat(lambda: hydrate_all(category, True), number=1, repeat=3))
+        print(
+            f"{category.__name__:<12}{validated * 1000:>10.1f}ms{trusted * 1000:>10.1f}ms"
+            f"{validated / trusted:>9.1f}x"
+        )
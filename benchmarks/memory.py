@@ -0,0 +1,62 @@
+import gc
+import tracemalloc
+
+import attr
+
+from minerva.categories.category import _nested_category
+
+from .hydration import RECORDS
+
+NUM_RECORDS = 5000
+
+# Per-Category stand-in class with a per-instance `__dict__`, like every model had
+# before they were slotted
+_dict_backed_types = {}
+
+
+def hydrate_dict_backed(category, record):
+    """`from_trusted()` as it was, building objects that keep their fields in a `__dict__`"""
+    item_type = _dict_backed_types.get(category)
+    if item_type is None:
+        item_type = _dict_backed_types[category] = type(category.__name__, (), {})
+    item = item_type()
+    for field in attr.fields(category):
+        if field.name in record:
+            value = record[field.name]
+        elif isinstance(field.default, attr.Factory):
+            value = field.default.factory()
+        else:
+            value = field.default
+        nested = _nested_category(field.type)
+        if nested is field.type:
+            value = hydrate_dict_backed(nested, value)
+        elif nested is not None:
+            value = [hydrate_dict_backed(nested, v) for v in value]
+        setattr(item, field.name, value)
+    return item
+
+
+def bytes_per_object(category, hydrate) -> float:
+    # The records are built up front so only the hydrated objects are counted
+    records = [{**RECORDS[category], "id": f"{i:024x}"} for i in range(NUM_RECORDS)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    items = [hydrate(category, record) for record in records]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(items) == NUM_RECORDS
+    return (after - before) / NUM_RECORDS
+
+
+if __name__ == "__main__":
+    """
+    Compares the memory held by each hydrated object (nested objects included) now that
+    the models are slotted, against the same objects with a per-instance `__dict__`
+    """
+    print(f"--- Bytes per hydrated object, over {NUM_RECORDS} records per category ---")
+    print(f"{'Category':<12}{'__dict__':>12}{'slotted':>12}{'saved':>10}")
+    for category in RECORDS:
+        old = bytes_per_object(category, hydrate_dict_backed)
+        new = bytes_per_object(category, lambda c, record: c.from_trusted(record))
+        print(f"{category.__name__:<12}{old:>12.0f}{new:>12.0f}{1 - new / old:>10.0%}")
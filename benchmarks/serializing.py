@@ -0,0 +1,69 @@
+import timeit
+
+from bson import ObjectId
+from flask import Flask
+
+from minerva.categories.employments import Employment
+from minerva.categories.recipes import Recipe
+from minerva.helpers.session import open_session, close_session, serialize
+
+from .hydration import RECORDS
+
+NUM_REQUESTS = 2000
+TAGS = [f"tag-{i}" for i in range(50)]
+# Much bigger than a typical document, so the per-field cost dominates
+LARGE_RECIPE = {
+    **RECORDS[Recipe],
+    "ingredients": [{"amount": f"{i} cups", "item": f"item {i}"} for i in range(200)],
+    "instructions": [f"step {i}" for i in range(50)],
+    "tags": TAGS,
+}
+LARGE_EMPLOYMENT = {**RECORDS[Employment], "tags": TAGS}
+DOCUMENTS = [
+    ("Recipe", Recipe, RECORDS[Recipe]),
+    ("Employment", Employment, RECORDS[Employment]),
+    ("big Recipe", Recipe, LARGE_RECIPE),
+    ("big Employment", Employment, LARGE_EMPLOYMENT),
+]
+
+app = Flask(__name__)
+
+
+# Every request opens and closes its DataSession either way, so both of these do too
+def plain_request(item) -> None:
+    # A single-item GET serializes the object for the log details and for the response body
+    open_session()
+    item.to_response()
+    item.to_response()
+    close_session()
+
+
+def memoized_request(item) -> None:
+    # The same two serializations, through the request's DataSession
+    open_session()
+    serialize(item)
+    serialize(item)
+    close_session()
+
+
+def serve_all(item, request) -> None:
+    for _ in range(NUM_REQUESTS):
+        request(item)
+
+
+if __name__ == "__main__":
+    """
+    Compares serializing an object with plain `to_response()` calls against the per-request
+    memo in `serialize()`, on typical documents and on much larger than usual ones
+    """
+    print(f"--- Serializing each document for {NUM_REQUESTS} single-item GETs ---")
+    print(f"{'Document':<16}{'plain':>12}{'memoized':>12}{'speedup':>10}")
+    with app.test_request_context():
+        for name, category, record in DOCUMENTS:
+            item = category.from_mongo({"_id": ObjectId(), **record})
+            times = [
+                min(timeit.repeat(lambda: serve_all(item, request), number=1, repeat=3))
+                for request in (plain_request, memoized_request)
+            ]
+            old, new = times
+            print(f"{name:<16}{old * 1000:>10.1f}ms{new * 1000:>10.1f}ms{old / new:>9.1f}x")
@@ -6,10 +6,11 @@ from minerva.categories.logins import Login
 from minerva.categories.notes import Note
 from minerva.categories.recipes import Recipe
 from minerva.categories.tags import Tag
+from minerva.categories.tag_cascades import TagCascade
 from minerva.categories.logs import Log
 from minerva.connectors.mongo import MongoConnector
 
-collections = [Date, Employment, Housing, Link, Login, Note, Recipe, Tag]
+collections = [Date, Employment, Housing, Link, Login, Note, Recipe, Tag, TagCascade]
 
 
 if __name__ == "__main__":
@@ -30,15 +31,6 @@ if __name__ == "__main__":
     print("--- Cleaning Logs ---")
     print("---------------------")
     with MongoConnector(item_type=Log, is_test=False) as db:
-        logs = db.find_all_no_limit()
-        to_delete = []
-        for log in logs:
-            if not isinstance(log, Log):
-                continue
-            if log.user == "TEST_USER":
-                to_delete.append(log.id)
-        count = 0
-        for delete_id in to_delete:
-            count += 1 if db.delete_one(delete_id) else 0
+        count = db.delete_logs(users=["TEST_USER"])
         print(f"Deleted {count} records for Logs")
     print(("=" * 30))
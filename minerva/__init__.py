@@ -1,9 +1,10 @@
 import os
 import attr
 
-from typing import Type, List, Callable
-from flask import Flask, request, make_response, Response, url_for
-from pymongo.errors import DuplicateKeyError
+from datetime import date
+from typing import Type, List, Callable, Set, Tuple
+from flask import Flask, request, make_response, Response, url_for, json, stream_with_context, g
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 from .categories.category import Category
 from .categories.logs import Log
@@ -15,17 +16,49 @@ from .categories.links import Link
 from .categories.logins import Login
 from .categories.recipes import Recipe
 from .categories.tags import Tag
+from .categories.tag_cascades import TagCascade, DELETE, UPDATE
+from .connectors.base_connector import BaseConnector
 from .connectors.mongo import MongoConnector
 from .categories.notes import Note
-from .helpers.exceptions import HttpError, BadRequestError, NotFoundError, InternalServerError
+from .helpers.exceptions import (
+    HttpError,
+    BadRequestError,
+    NotFoundError,
+    InternalServerError,
+    PreconditionFailedError,
+)
 from .helpers.custom_types import Maybe, JsonData
-from .helpers.authorization import validate_key
+from .helpers.authorization import validate_key, key_cache_stats
 from .helpers.logging import info, error
+from .helpers.log_writer import log_writer
+from .helpers.caches import tag_cache, item_cache
+from .helpers.cache_watcher import cache_watcher
+from .helpers.etags import item_etag, etag_version, list_etag, not_modified_counter
+from .helpers.cascades import start_tag_cascade, resume_tag_cascades
+from .helpers.indexes import ensure_indexes, find_unindexed_queries
+from .helpers.session import (
+    open_session,
+    close_session,
+    current_session,
+    connector_for,
+    serialize,
+)
+from .helpers.validators import defer_tag_creation
 
 URL_BASE = "/api/v1"
+NDJSON = "application/x-ndjson"
+# How many records to pull from the datastore per trip when streaming a whole collection
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+# The most items a single bulk request may hold, and how many are written per trip
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 1000))
 # Note that not all Category subtypes are here.  This is only the Category subtypes
 # that will have API endpoints created for them!
 ALL_TYPES = [Date, Employment, Housing, Link, Login, Note, Recipe, Tag]
+# Every Category type that is stored in its own collection, and so may need indexes
+STORED_TYPES = ALL_TYPES + [ApiKey, Log, TagCascade]
+# The Category types whose tags get updated when a Tag is renamed or deleted
+TAGGED_TYPES = [t for t in ALL_TYPES if t != Tag]
 
 
 @attr.s
@@ -36,10 +69,17 @@ class Hooks:
     on my part.  See the Route for notes on my thoughts for that.
     """
 
+    # Used for keeping the tag cache fresh
+    after_create: Callable[[Category], None] = attr.ib(default=lambda x: None)
     # Used for cascading tags deletion
     after_delete: Callable[[Category], None] = attr.ib(default=lambda x: None)
     # Used for cascading tags updates
     after_update: Callable[[Category, Category], None] = attr.ib(default=lambda x, y: None)
+    # The bulk endpoints call these once per batch instead of once per item
+    after_bulk_delete: Callable[[List[Category]], None] = attr.ib(default=lambda x: None)
+    after_bulk_update: Callable[[List[Tuple[Category, Category]]], None] = attr.ib(
+        default=lambda x: None
+    )
 
 
 class Route:
@@ -73,16 +113,59 @@ class Route:
         """
         return cls(cat, is_test, hooks)
 
+    def item_not_found_error(self, item_id: str) -> JsonData:
+        """
+        Helper function to reduce magic string repetition for a common error type
+        :param item_id: The ID that didn't match the datastore entries
+        :return: The error body
+        """
+        return {"error": f"Could not find a {str(self.category.__name__)} with the ID '{item_id}'"}
+
     def item_not_found(self, item_id: str) -> Response:
         """
         Helper function to reduce magic string repetition for a common error type
         :param item_id: The ID that didn't match the datastore entries
         :return: A Flask Response object
         """
-        return make_response(
-            {"error": f"Could not find a {str(self.category.__name__)} with the ID '{item_id}'"},
-            404,
-        )
+        return make_response(self.item_not_found_error(item_id), 404)
+
+    @staticmethod
+    def not_modified(etag: str) -> Response:
+        """
+        Helper function for answering a conditional GET whose ETag still matches
+        :param etag: The current ETag
+        :return: An empty 304 Flask Response object
+        """
+        not_modified_counter.count(request.endpoint)
+        response = make_response("", 304)
+        response.set_etag(etag)
+        return response
+
+    def expected_versions(self, item_id: str) -> Maybe[List[int]]:
+        """
+        Read the object versions that an `If-Match` header asks for
+        :param item_id: The unique ID of the object being written
+        :return: The versions the object must be at, or None if any version will do
+        """
+        if not request.if_match or request.if_match.star_tag:
+            return None
+        versions = [etag_version(etag, item_id) for etag in request.if_match.as_set()]
+        versions = [version for version in versions if version is not None]
+        if not versions:
+            raise PreconditionFailedError(f"If-Match does not match {item_id}")
+        return versions
+
+    def write_failed(self, db: BaseConnector, item_id: str) -> Response:
+        """
+        Helper function for when a write to a single object matched nothing -- either the
+        object doesn't exist, or it didn't match the `If-Match` header
+        :param db: The open connector
+        :param item_id: The unique ID of the object that was being written
+        :return: A Flask Response object
+        """
+        if request.if_match and db.find_one(item_id, fields=[]):
+            raise PreconditionFailedError(f"{item_id} has changed since it was read")
+        return self.item_not_found(item_id)
 
     @staticmethod
     def log_http_error(api_key: Maybe[ApiKey], e: HttpError) -> None:
@@ -99,45 +182,334 @@ class Route:
             details={"error": e.__class__.__name__},
         )
 
+    def wants_stream(self) -> bool:
+        """
+        Whether a list request asked for the whole collection as a stream, either with
+        `?stream=1`, or with `?all=1` and an `Accept: application/x-ndjson` header
+        :return: True if the response should be streamed as NDJSON
+        """
+        if request.args.get("stream", None):
+            return True
+        return bool(request.args.get("all", None)) and (
+            request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+        )
+
+    def stream_items(self) -> Response:
+        """
+        Streams every object of a given type as NDJSON (one JSON document per line).
+        Records are read and sent one at a time, as they are stored (see the `raw` reads in
+        the connectors), so memory use stays constant no matter how big the collection is.
+        :return: The (streaming) Flask Response object
+        """
+        user = self.api_key.user if self.api_key else "TEST_USER"
+
+        def generate():
+            count = 0
+            with connector_for(self.category, is_test=self.is_test) as db:
+                for body in db.iter_all(batch_size=STREAM_BATCH_SIZE, raw=True):
+                    count += 1
+                    yield json.dumps(body) + "\n"
+            info(request, user=user, message=f"Streamed {count} items")
+
+        return Response(stream_with_context(generate()), 200, mimetype=NDJSON)
+
+    @staticmethod
+    def next_page_url(page_num: int, num_per_page: int, total: int) -> Maybe[str]:
+        """
+        Build the link to the page after this one, keeping every other query parameter
+        :param page_num: The **1-indexed** number of the current page
+        :param num_per_page: The number of items in each page
+        :param total: The total number of items across every page
+        :return: The URL of the next page, or None if this is the last page
+        """
+        if page_num * num_per_page >= total:
+            return None
+        args = {**request.args.to_dict(), "page": page_num + 1, "count": num_per_page}
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    def requested_fields(self) -> Maybe[List[str]]:
+        """
+        Read the `fields` query parameter -- a comma-separated list of the fields to return.
+        Only those fields are read from the datastore and hydrated (the ID always comes back)
+        :return: The validated field names, or None if every field was asked for
+        """
+        names = Route.requested_field_names()
+        if names is not None:
+            self.category.verify_fields(names)
+        return names
+
+    @staticmethod
+    def requested_field_names() -> Maybe[List[str]]:
+        """
+        Read the `fields` query parameter, without checking the names against a Category type
+        :return: The field names, or None if every field was asked for
+        """
+        fields = request.args.get("fields", None)
+        if fields is None:
+            return None
+        return [name.strip() for name in fields.split(",") if name.strip() not in ("", "_id")]
+
+    def bulk_request_bodies(self) -> List[JsonData]:
+        """
+        Read the items out of a bulk request, sent either as a JSON array or as NDJSON
+        (one JSON object per line, with a `Content-Type: application/x-ndjson` header)
+        :return: The list of item bodies, not yet validated
+        """
+        if request.mimetype == NDJSON:
+            bodies = []
+            for line_num, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+                if not line.strip():
+                    continue
+                try:
+                    bodies.append(json.loads(line))
+                except ValueError:
+                    raise BadRequestError(f"Line {line_num} of the NDJSON body is not valid JSON")
+        else:
+            bodies = request.get_json(silent=True)
+            if not isinstance(bodies, list):
+                raise BadRequestError("Expected a json array (or NDJSON) body")
+        if not bodies:
+            raise BadRequestError("Expected at least one item but received none")
+        if len(bodies) > BULK_MAX_ITEMS:
+            raise BadRequestError(f"Expected at most {BULK_MAX_ITEMS} items, got {len(bodies)}")
+        return bodies
+
+    def create_missing_tags(self, names: Set[str]) -> None:
+        """
+        Create every Tag that a batch of items needs in a single upsert.
+        See `defer_tag_creation` for how the names are collected.
+        :param names: The Tag names that were missing while validating the batch
+        :return: N/A
+        """
+        if not names:
+            return
+        with connector_for(Tag) as db:
+            db.upsert_tags(sorted(names))
+        for name in names:
+            tag_cache.add(name)
+
+    def bulk_create(self) -> Response:
+        """
+        Create many new objects at once.  Every item is validated first, then the valid ones
+        are written with unordered batch inserts.  The body's `items` has an `id` or an
+        `error` for each item, in the order they were sent
+        :return: The Flask Response object
+        """
+        bodies = self.bulk_request_bodies()
+        results: List[JsonData] = [{} for _ in bodies]
+        valid: List[Tuple[int, Category]] = []
+        with defer_tag_creation() as missing_tags:
+            for index, body in enumerate(bodies):
+                try:
+                    if not isinstance(body, dict):
+                        raise BadRequestError("Expected each item to be a json object")
+                    valid.append((index, self.category.from_request(body)))
+                except HttpError as e:
+                    results[index] = {"error": e.msg}
+        self.create_missing_tags(missing_tags)
+        with connector_for(self.category, is_test=self.is_test) as db:
+            ids, errors = db.create_many([item for _, item in valid], chunk_size=BULK_CHUNK_SIZE)
+        for position, (index, item) in enumerate(valid):
+            if position in errors:
+                results[index] = {"error": errors[position]}
+            else:
+                results[index] = {"id": ids[position]}
+                self.hooks.after_create(item)
+        created = sum(1 for result in results if "id" in result)
+        info(
+            request,
+            user=self.api_key.user if self.api_key else "TEST_USER",
+            message=f"Bulk created {created} of {len(bodies)} items",
+        )
+        # 207 tells the caller to check each item, since only some of them were created
+        return make_response(
+            {"created": created, "items": results}, 201 if created == len(bodies) else 207
+        )
+
+    def bulk_update(self) -> Response:
+        """
+        Update many objects at once from a json object mapping each ID to its new body.
+        The existing objects are read in one trip and written back with unordered batch
+        updates.  The body's `items` maps each ID to its updated object or an `error`
+        :return: The Flask Response object
+        """
+        bodies = request.get_json(silent=True)
+        if not isinstance(bodies, dict) or not bodies:
+            raise BadRequestError("Expected a json object mapping each id to its new body")
+        if len(bodies) > BULK_MAX_ITEMS:
+            raise BadRequestError(f"Expected at most {BULK_MAX_ITEMS} items, got {len(bodies)}")
+        results: JsonData = {}
+        updates: JsonData = {}
+        with defer_tag_creation() as missing_tags:
+            for item_id, body in bodies.items():
+                try:
+                    if not isinstance(body, dict):
+                        raise BadRequestError("Expected each item to be a json object")
+                    updates[item_id] = self.category.from_request(body)
+                except HttpError as e:
+                    results[item_id] = {"error": e.msg}
+        self.create_missing_tags(missing_tags)
+        with connector_for(self.category, is_test=self.is_test) as db:
+            old_items = {item.id: item for item in db.find_many(list(updates))} if updates else {}
+            found = {i: item for i, item in updates.items() if i in old_items}
+            errors = db.update_many(found, chunk_size=BULK_CHUNK_SIZE) if found else {}
+        changed: List[Tuple[Category, Category]] = []
+        for item_id, item in updates.items():
+            if item_id not in old_items:
+                results[item_id] = self.item_not_found_error(item_id)
+            elif item_id in errors:
+                results[item_id] = {"error": errors[item_id]}
+            else:
+                results[item_id] = {**item.to_response(), "_id": item_id}
+                changed.append((old_items[item_id], item))
+        if changed:
+            self.hooks.after_bulk_update(changed)
+        info(
+            request,
+            user=self.api_key.user if self.api_key else "TEST_USER",
+            message=f"Bulk updated {len(changed)} of {len(bodies)} items",
+        )
+        return make_response(
+            {"updated": len(changed), "items": results}, 200 if len(changed) == len(bodies) else 207
+        )
+
+    def bulk_delete(self) -> Response:
+        """
+        Delete many objects at once from a json array of IDs.  The objects are read in one
+        trip (for the hooks) and deleted in another.  The body's `items` maps each ID to
+        whether it was deleted, or an `error` if it wasn't found
+        :return: The Flask Response object
+        """
+        item_ids = request.get_json(silent=True)
+        if not isinstance(item_ids, list) or not item_ids:
+            raise BadRequestError("Expected a json array of ids")
+        if not all(isinstance(item_id, str) for item_id in item_ids):
+            raise BadRequestError("Expected every id to be a string")
+        if len(item_ids) > BULK_MAX_ITEMS:
+            raise BadRequestError(f"Expected at most {BULK_MAX_ITEMS} ids, got {len(item_ids)}")
+        item_ids = list(dict.fromkeys(item_ids))
+        with connector_for(self.category, is_test=self.is_test) as db:
+            old_items = db.find_many(item_ids)
+            deleted = db.delete_many([item.id for item in old_items]) if old_items else 0
+        found = {item.id for item in old_items}
+        results = {
+            item_id: {"deleted": True} if item_id in found else self.item_not_found_error(item_id)
+            for item_id in item_ids
+        }
+        if old_items:
+            self.hooks.after_bulk_delete(old_items)
+        info(
+            request,
+            user=self.api_key.user if self.api_key else "TEST_USER",
+            message=f"Bulk deleted {deleted} of {len(item_ids)} items",
+            details={"deleted": [item.to_response() for item in old_items]},
+        )
+        return make_response(
+            {"deleted": deleted, "items": results}, 200 if deleted == len(item_ids) else 207
+        )
+
+    def bulk_items(self) -> Response:
+        """
+        A function that manages the "bulk" endpoints -- /objects/bulk
+        POST:  Create many new objects of a given type from a json array (or NDJSON)
+        PUT:  Update many objects of a given type from a json object of ID -> new body
+        DELETE:  Delete many objects of a given type from a json array of IDs
+        Items are handled independently, so one bad item doesn't fail the whole batch.
+        The response is a 207 when only some of the items succeeded
+        :return: The Flask Response object after the endpoint is called
+        """
+        try:
+            if not self.is_test:
+                self.api_key: ApiKey = validate_key(request.headers.get("x-api-key", None))
+            if request.method == "POST":
+                return self.bulk_create()
+            elif request.method == "PUT":
+                return self.bulk_update()
+            elif request.method == "DELETE":
+                return self.bulk_delete()
+        except HttpError as e:
+            Route.log_http_error(self.api_key, e)
+            return make_response({"error": e.msg}, e.code)
+
     def all_items(self) -> Response:
         """
         A function that manages the "all" endpoints -- /objects
-        GET:  Get the (possibly paginated) list of objects of a given type
+        GET:  Get the (possibly paginated) list of objects of a given type.  Pass `fields`
+              (e.g. `?fields=name,recipe_type`) to only get some of each object.  The body's
+              `total` is the number of objects (pass `estimate=1` for a cheaper, approximate
+              count on huge collections) and `next` is the link to the following page, or
+              null on the last one.  Pass `after` (empty for the first page) to page with
+              cursors instead; `next` is then the cursor for the following page.
+              Pass `stream=1` (or `all=1` with `Accept: application/x-ndjson`) to stream
+              everything as NDJSON.  Responses carry an ETag, and `If-None-Match` gets a 304
+              if nothing in the collection has changed.
         POST:  Create a new instance of an object of a given type
         :return: The Flask Response object after the endpoint is called
         """
         try:
             if not self.is_test:
                 self.api_key: ApiKey = validate_key(request.headers.get("x-api-key", None))
-            with MongoConnector(self.category, is_test=self.is_test) as db:
+            if request.method == "GET" and self.wants_stream():
+                return self.stream_items()
+            with connector_for(self.category, is_test=self.is_test) as db:
                 if request.method == "GET":
                     try:
                         page_num = int(request.args.get("page", 1))
                         num_per_page = int(request.args.get("count", 10))
                     except ValueError:
                         raise BadRequestError("'page' and 'count' must be integers if provided")
+                    if page_num < 1 or num_per_page < 1:
+                        raise BadRequestError("'page' and 'count' must be at least 1")
+                    fields = self.requested_fields()
                     no_limit = request.args.get("all", None)
+                    # An empty "after" starts cursor pagination from the first page
+                    after = request.args.get("after", None)
+                    # Any write to the collection changes the ETag of every list of it
+                    etag = list_etag(
+                        db.collection_version(), sorted(request.args.items(multi=True))
+                    )
+                    if request.if_none_match.contains_weak(etag):
+                        return self.not_modified(etag)
                     if no_limit:
-                        found_items = db.find_all_no_limit()
+                        found_items = db.find_all_no_limit(fields=fields, raw=True)
+                        resp_body = {"total": len(found_items), "next": None}
+                    elif after is not None:
+                        found_items, next_cursor = db.find_page_after(
+                            after=after or None, count=num_per_page, fields=fields, raw=True
+                        )
+                        resp_body = {"next": next_cursor}
                     else:
-                        found_items = db.find_all(page=page_num, count=num_per_page)
-                    resp_body = {self.multi: [i.__dict__() for i in found_items]}
+                        found_items, total = db.find_page(
+                            page=page_num,
+                            count=num_per_page,
+                            fields=fields,
+                            estimate_total=bool(request.args.get("estimate", None)),
+                            raw=True,
+                        )
+                        resp_body = {
+                            "total": total,
+                            "next": self.next_page_url(page_num, num_per_page, total),
+                        }
+                    # Passthrough reads -- these are already the response bodies
+                    resp_body[self.multi] = found_items
                     info(
                         request,
                         user=self.api_key.user if self.api_key else "TEST_USER",
                         message=f"Found {len(found_items)} items",
                         details=resp_body,
                     )
-                    return make_response(resp_body, 200)
+                    response = make_response(resp_body, 200)
+                    response.set_etag(etag)
+                    return response
                 elif request.method == "POST":
                     if not request.json:
                         raise BadRequestError("Expected a json body but received none")
-                    self.category.verify_request_body(request.json)
                     item = self.category.from_request(request.json)
                     try:
                         item_id = db.create(item)
                     except DuplicateKeyError as e:
                         raise BadRequestError(str(e))
+                    self.hooks.after_create(item)
                     info(
                         request,
                         user=self.api_key.user if self.api_key else "TEST_USER",
@@ -151,59 +523,97 @@ class Route:
     def item_by_id(self, item_id: str) -> Response:
         """
         A function that manages the "by ID" endpoints -- /objects/<object_od>
-        GET:  Get a single object of a given type by ID
+        GET:  Get a single object of a given type by ID (or just some of it with `fields`)
         PUT:  Update a single object of a given type by ID with values
+        PATCH:  Update only the given fields of a single object of a given type by ID
+                (see `Category.patch_from_request` for the body)
         DELETE:  Delete a single object of a given type by ID
+        GET responses carry an ETag, and `If-None-Match` gets a 304 if the object hasn't
+        changed.  PUT, PATCH and DELETE honour `If-Match`, with a 412 if the object has
+        changed since the client read it.
         :param item_id: The unique ID of the object to handle
         :return: The Flask Response object after the endpoint is called
         """
         try:
             if not self.is_test:
                 self.api_key: ApiKey = validate_key(request.headers.get("x-api-key", None))
-            with MongoConnector(self.category, is_test=self.is_test) as db:
+            with connector_for(self.category, is_test=self.is_test) as db:
                 if request.method == "GET":
-                    item = db.find_one(item_id)
-                    if item:
+                    fields = self.requested_fields()
+                    # Unchanged objects get a 304 before they are ever built
+                    item, version = db.find_one_with_version(
+                        item_id,
+                        fields=fields,
+                        unchanged=lambda v: request.if_none_match.contains_weak(
+                            item_etag(item_id, v, fields)
+                        ),
+                    )
+                    if version is None:
+                        return self.item_not_found(item_id)
+                    etag = item_etag(item_id, version, fields)
+                    if item is None:
+                        return self.not_modified(etag)
+                    info(
+                        request,
+                        user=self.api_key.user if self.api_key else "TEST_USER",
+                        message=f"Found {item_id}",
+                        details=serialize(item),
+                    )
+                    response = make_response(serialize(item), 200)
+                    response.set_etag(etag)
+                    return response
+                elif request.method == "PUT":
+                    updated_item = self.category.from_request(request.json)
+                    # One atomic operation that also hands back the old values for the hooks
+                    try:
+                        old_item = db.find_one_and_update(
+                            item_id, updated_item, versions=self.expected_versions(item_id)
+                        )
+                    except DuplicateKeyError as e:
+                        raise BadRequestError(str(e))
+                    if old_item:
+                        self.hooks.after_update(old_item, updated_item)
+                        # The update is a full replace, so the new values are exactly what was sent
+                        result = {**serialize(updated_item), "_id": item_id}
                         info(
                             request,
                             user=self.api_key.user if self.api_key else "TEST_USER",
-                            message=f"Found {item_id}",
-                            details=item.__dict__(),
+                            message=f"Updated {item_id}",
+                            details={"old": serialize(old_item), "new": result},
                         )
-                        return make_response(item.__dict__(), 200)
-                    return self.item_not_found(item_id)
-                elif request.method == "PUT":
-                    old_item = db.find_one(item_id)
-                    if not old_item:
-                        return self.item_not_found(item_id)
-                    updated_item = self.category.from_request(request.json)
+                        return make_response(result, 200)
+                    return self.write_failed(db, item_id)
+                elif request.method == "PATCH":
+                    patch = self.category.patch_from_request(request.get_json(silent=True))
                     try:
-                        result = db.update_one(item_id, updated_item)
+                        old_item = db.patch_one(
+                            item_id, patch, versions=self.expected_versions(item_id)
+                        )
                     except DuplicateKeyError as e:
                         raise BadRequestError(str(e))
-                    if result:
+                    if old_item:
+                        updated_item = patch.apply(old_item)
                         self.hooks.after_update(old_item, updated_item)
                         info(
                             request,
                             user=self.api_key.user if self.api_key else "TEST_USER",
-                            message=f"Updated {item_id}",
-                            details={"old": old_item.__dict__(), "new": result.__dict__()},
+                            message=f"Patched {item_id}",
+                            details={"patch": patch.to_response()},
                         )
-                        return make_response(result.__dict__(), 200)
-                    return self.item_not_found(item_id)
+                        return make_response(serialize(updated_item), 200)
+                    return self.write_failed(db, item_id)
                 elif request.method == "DELETE":
-                    item = db.find_one(item_id)
-                    if db.delete_one(item_id) > 0:
-                        if item:
-                            self.hooks.after_delete(item)
+                    item = db.find_one_and_delete(item_id, versions=self.expected_versions(item_id))
+                    if item:
+                        self.hooks.after_delete(item)
                         info(
                             request,
                             user=self.api_key.user if self.api_key else "TEST_USER",
                             message=f"Deleted {item_id}",
-                            details={"deleted": item.__dict__()},
+                            details={"deleted": serialize(item)},
                         )
                         return make_response({}, 204)
-                    return self.item_not_found(item_id)
+                    return self.write_failed(db, item_id)
         except HttpError as e:
             Route.log_http_error(self.api_key, e)
             return make_response({"error": e.msg}, e.code)
@@ -231,27 +641,128 @@ def create_app(test_config=None):
     except OSError:
         pass
 
+    # Indexes are created idempotently, so this is safe on every startup
+    if app.config.get("ENSURE_INDEXES", not is_test):
+        try:
+            ensure_indexes(STORED_TYPES)
+        except PyMongoError as e:
+            app.logger.warning(f"Could not ensure indexes on startup: {str(e)}")
+    # Finish off any tag cascades that were interrupted by the last shutdown
+    if app.config.get("RESUME_CASCADES", not is_test):
+        try:
+            resume_tag_cascades(TAGGED_TYPES)
+        except PyMongoError as e:
+            app.logger.warning(f"Could not resume tag cascades on startup: {str(e)}")
+
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create any missing indexes and report queries that still scan a collection"""
+        for coll_name, index_names in ensure_indexes(STORED_TYPES).items():
+            print(f"{coll_name}: {', '.join(index_names)}")
+        unindexed = find_unindexed_queries(STORED_TYPES)
+        for query in unindexed:
+            print(f"[COLLSCAN]  {query}")
+        if not unindexed:
+            print("No queries fall back to a collection scan")
+
+    @app.cli.command("resume-cascades")
+    def resume_cascades_command():
+        """Finish any tag cascades that were interrupted or had a collection fail"""
+        for cascade in resume_tag_cascades(TAGGED_TYPES):
+            print(f"{cascade.action} '{cascade.old_name}': {cascade.status}")
+
+    # Keep this worker's caches in step with writes made by every other process
+    if cache_watcher is not None:
+        app.before_request(cache_watcher.ensure_started)
+    # Every request shares a single DataSession for all of its datastore access
+    app.before_request(open_session)
+    app.teardown_request(close_session)
+
+    @app.after_request
+    def report_round_trips(response: Response) -> Response:
+        session = current_session()
+        if is_test and session is not None:
+            response.headers["X-Round-Trips"] = str(session.round_trips)
+        cascades = g.get("tag_cascades", [])
+        if cascades:
+            response.headers["X-Cascade-Id"] = ", ".join(cascade.id for cascade in cascades)
+        return response
+
+    @app.route(f"{URL_BASE}/stats", methods=["GET"])
+    def stats():
+        """How well the caches, the log writer and conditional requests are doing"""
+        api_key: Maybe[ApiKey] = None
+        try:
+            if not is_test:
+                api_key = validate_key(request.headers.get("x-api-key", None))
+            return make_response(
+                {
+                    "not_modified": not_modified_counter.stats(),
+                    "api_keys": key_cache_stats(),
+                    "items": item_cache.stats() if item_cache is not None else None,
+                    "cache_watcher": cache_watcher.stats() if cache_watcher is not None else None,
+                    "log_writer": log_writer.stats(),
+                },
+                200,
+            )
+        except HttpError as e:
+            Route.log_http_error(api_key, e)
+            return make_response({"error": e.msg}, e.code)
+
     # region TAG ROUTES
     @app.route(f"{URL_BASE}/tags", methods=["GET", "POST"])
     def all_tags():
-        return Route.build(Tag, is_test).all_items()
-
-    def cascade_delete_tag(tag: Tag):
-        for item_type in [t for t in ALL_TYPES if t != Tag]:
-            with MongoConnector(item_type, is_test) as db:
-                db.cascade_tag_delete(tag.name)
-
-    def cascade_update_tag(old_tag: Tag, new_tag: Tag):
-        for item_type in [t for t in ALL_TYPES if t != Tag]:
-            with MongoConnector(item_type, is_test) as db:
-                db.cascade_tag_update(old_tag.name, new_tag.name)
-
-    @app.route(f"{URL_BASE}/tags/<string:tag_id>", methods=["GET", "PUT", "DELETE"])
+        return Route.build(
+            Tag, is_test, hooks={"after_create": lambda tag: tag_cache.invalidate()}
+        ).all_items()
+
+    # Cascades run across collections concurrently.  Pass `?async=1` to get the response
+    # back straight away and poll the cascades from the X-Cascade-Id header instead
+    def cascade_tags(action: str, renames: List[Tuple[str, str]]):
+        tag_cache.invalidate()
+        g.tag_cascades = [
+            start_tag_cascade(
+                action,
+                old_name,
+                new_name,
+                TAGGED_TYPES,
+                is_test=is_test,
+                run_async=bool(request.args.get("async", None)),
+            )
+            for old_name, new_name in renames
+        ]
+
+    def cascade_delete_tags(tags: List[Tag]):
+        cascade_tags(DELETE, [(tag.name, "") for tag in tags])
+
+    def cascade_update_tags(changes: List[Tuple[Tag, Tag]]):
+        cascade_tags(UPDATE, [(old_tag.name, new_tag.name) for old_tag, new_tag in changes])
+
+    @app.route(f"{URL_BASE}/tags/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_tags():
+        return Route.build(
+            Tag,
+            is_test,
+            hooks={
+                "after_create": lambda tag: tag_cache.invalidate(),
+                "after_bulk_delete": cascade_delete_tags,
+                "after_bulk_update": cascade_update_tags,
+            },
+        ).bulk_items()
+
+    @app.route(f"{URL_BASE}/tags/cascades/<string:cascade_id>", methods=["GET"])
+    def tag_cascade_by_id(cascade_id: str):
+        return Route.build(TagCascade, is_test).item_by_id(item_id=cascade_id)
+
+    @app.route(f"{URL_BASE}/tags/<string:tag_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def tag_by_id(tag_id: str):
         return Route.build(
             Tag,
             is_test,
-            hooks={"after_delete": cascade_delete_tag, "after_update": cascade_update_tag},
+            hooks={
+                "after_delete": lambda tag: cascade_delete_tags([tag]),
+                "after_update": lambda old_tag, new_tag: cascade_update_tags([(old_tag, new_tag)]),
+            },
         ).item_by_id(item_id=tag_id)
 
     # endregion
@@ -261,7 +772,11 @@ def create_app(test_config=None):
     def all_notes():
         return Route.build(Note, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/notes/<string:note_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/notes/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_notes():
+        return Route.build(Note, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/notes/<string:note_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def note_by_id(note_id: str):
         return Route.build(Note, is_test).item_by_id(item_id=note_id)
 
@@ -272,7 +787,11 @@ def create_app(test_config=None):
     def all_login():
         return Route.build(Login, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/logins/<string:login_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/logins/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_logins():
+        return Route.build(Login, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/logins/<string:login_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def login_by_id(login_id: str):
         return Route.build(Login, is_test).item_by_id(item_id=login_id)
 
@@ -283,6 +802,10 @@ def create_app(test_config=None):
     def all_dates():
         return Route.build(Date, is_test).all_items()
 
+    @app.route(f"{URL_BASE}/dates/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_dates():
+        return Route.build(Date, is_test).bulk_items()
+
     # This must be before "by id" to avoid path conflicts!
     @app.route(f"{URL_BASE}/dates/today", methods=["GET"])
     def get_today_events():
@@ -291,23 +814,29 @@ def create_app(test_config=None):
             if not is_test:
                 api_key = validate_key(request.headers.get("x-api-key", None))
             if request.method == "GET":
-                with MongoConnector(Date, is_test) as db:
+                with connector_for(Date, is_test) as db:
+                    # Changes with the date, as well as with every write to the collection
+                    etag = list_etag(db.collection_version(), date.today().isoformat())
+                    if request.if_none_match.contains_weak(etag):
+                        return Route.not_modified(etag)
                     dates: Maybe[List[Date]] = db.get_today_events()
                     if not dates:
                         raise NotFoundError("No events in the database occur today")
-                    resp_body = {"dates": [d.__dict__() for d in dates]}
+                    resp_body = {"dates": [d.to_response() for d in dates]}
                     info(
                         request,
                         user=api_key.user if api_key else "TEST_USER",
                         message=f"Found {len(dates)} events",
                         details=resp_body,
                     )
-                    return make_response(resp_body, 200)
+                    response = make_response(resp_body, 200)
+                    response.set_etag(etag)
+                    return response
         except HttpError as e:
             Route.log_http_error(api_key, e)
             return make_response({"error": e.msg}, e.code)
 
-    @app.route(f"{URL_BASE}/dates/<string:date_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/dates/<string:date_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def date_by_id(date_id: str):
         return Route.build(Date, is_test).item_by_id(item_id=date_id)
 
@@ -318,7 +847,11 @@ def create_app(test_config=None):
     def all_links():
         return Route.build(Link, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/links/<string:link_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/links/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_links():
+        return Route.build(Link, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/links/<string:link_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def link_by_id(link_id: str):
         return Route.build(Link, is_test).item_by_id(item_id=link_id)
 
@@ -329,7 +862,11 @@ def create_app(test_config=None):
     def all_housing():
         return Route.build(Housing, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/housings/<string:house_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/housings/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_housings():
+        return Route.build(Housing, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/housings/<string:house_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def house_by_id(house_id: str):
         return Route.build(Housing, is_test).item_by_id(item_id=house_id)
 
@@ -340,7 +877,11 @@ def create_app(test_config=None):
     def all_employment():
         return Route.build(Employment, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/employments/<string:job_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/employments/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_employments():
+        return Route.build(Employment, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/employments/<string:job_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def employment_by_id(job_id: str):
         return Route.build(Employment, is_test).item_by_id(item_id=job_id)
 
@@ -351,7 +892,11 @@ def create_app(test_config=None):
     def all_recipes():
         return Route.build(Recipe, is_test).all_items()
 
-    @app.route(f"{URL_BASE}/recipes/<string:recipe_id>", methods=["GET", "PUT", "DELETE"])
+    @app.route(f"{URL_BASE}/recipes/bulk", methods=["POST", "PUT", "DELETE"])
+    def bulk_recipes():
+        return Route.build(Recipe, is_test).bulk_items()
+
+    @app.route(f"{URL_BASE}/recipes/<string:recipe_id>", methods=["GET", "PUT", "PATCH", "DELETE"])
     def recipe_by_id(recipe_id: str):
         return Route.build(Recipe, is_test).item_by_id(item_id=recipe_id)
 
@@ -364,7 +909,7 @@ def create_app(test_config=None):
             api_key: Maybe[ApiKey] = None
             if not is_test:
                 api_key = validate_key(request.headers.get("x-api-key", None))
-            with MongoConnector(Log, is_test) as db:
+            with connector_for(Log, is_test) as db:
                 # TODO:  Pagination and filtering query params
                 logs: List[Log] = db.get_logs()
                 info(
@@ -372,19 +917,58 @@ def create_app(test_config=None):
                     user=api_key.user if api_key else "TEST_USER",
                     message=f"Found {len(logs)} logs",
                 )
-                return make_response({"logs": [log.__dict__() for log in logs]}, 200)
+                return make_response({"logs": [log.to_response() for log in logs]}, 200)
 
     # endregion
 
     @app.route(f"{URL_BASE}/tagged/<string:tag>", methods=["GET"])
     def get_items_by_tag(tag: str):
-        print("TAG: ", tag)
-        item_map = {}
-        for item_type in ALL_TYPES:
-            with MongoConnector(item_type, is_test) as db:
-                item_map[item_type.__name__.lower() + "s"] = []
-                for item in db.find_all_by_tag(tag):
-                    item_map[item_type.__name__.lower() + "s"].append(item.__dict__())
-        return make_response(item_map, 200)
+        """
+        Everything tagged with the given tag, across every category, from a single query.
+        Pass `page` (and optionally `count`) to paginate; `counts` always holds the totals.
+        Pass `fields` to read only those fields of each category that has them.
+        """
+        api_key: Maybe[ApiKey] = None
+        try:
+            if not is_test:
+                api_key = validate_key(request.headers.get("x-api-key", None))
+            try:
+                page_num = int(request.args["page"]) if "page" in request.args else None
+                num_per_page = int(request.args.get("count", 10))
+            except ValueError:
+                raise BadRequestError("'page' and 'count' must be integers if provided")
+            if (page_num is not None and page_num < 1) or num_per_page < 1:
+                raise BadRequestError("'page' and 'count' must be at least 1")
+            fields = Route.requested_field_names()
+            if fields is not None:
+                if not fields:
+                    raise BadRequestError("Invalid request -- expected at least one field name")
+                # Each name only has to be a field of one of the categories
+                known = set().union(*(attr.fields_dict(t) for t in ALL_TYPES)) - {"id"}
+                for name in fields:
+                    if name not in known:
+                        raise BadRequestError(
+                            f"Invalid request -- '{name}' is not a field of any category"
+                        )
+            first_type, *other_types = ALL_TYPES
+            with connector_for(first_type, is_test) as db:
+                found, counts = db.find_all_by_tag_across(
+                    tag, other_types, page=page_num, count=num_per_page, fields=fields, raw=True
+                )
+            item_map = {
+                item_type.__name__.lower() + "s": items for item_type, items in found.items()
+            }
+            item_map["counts"] = {
+                item_type.__name__.lower() + "s": total for item_type, total in counts.items()
+            }
+            info(
+                request,
+                user=api_key.user if api_key else "TEST_USER",
+                message=f"Found {sum(counts.values())} items tagged '{tag}'",
+            )
+            return make_response(item_map, 200)
+        except HttpError as e:
+            Route.log_http_error(api_key, e)
+            return make_response({"error": e.msg}, e.code)
 
     return app
@@ -2,7 +2,7 @@ from typing import Union
 
 import attr
 
-from .category import Category
+from .category import Category, RequestDecoder
 from ..helpers.custom_types import JsonData
 
 
@@ -12,7 +12,7 @@ def address_converter(address: Union["Address", JsonData]) -> "Address":
     return Address(**address)
 
 
-@attr.s
+@attr.s(slots=True)
 class Address(Category):
     number: str = attr.ib()
     street: str = attr.ib()
@@ -21,7 +21,7 @@ class Address(Category):
     zip_code: str = attr.ib()
     extra: str = attr.ib()  # The "second line" (apt, suite, etc.)
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "number": self.number,
             "street": self.street,
@@ -43,26 +43,21 @@ class Address(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Address":
-        Address.verify_request_body(req)
-        return Address(
-            number=req["number"],
-            street=req["street"],
-            city=req["city"],
-            state=req["state"],
-            zip_code=req["zip_code"],
-            extra=req.get("extra", ""),
-        )
+        return ADDRESS_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["number", "street", "city", "state", "zip_code"],
-            optional_fields=["extra"],
-            category=Address,
-        )
+        ADDRESS_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         # Addresses are not stored directly, but are part of other categories
         raise NotImplemented
+
+
+ADDRESS_DECODER = RequestDecoder(
+    Address,
+    required=["number", "street", "city", "state", "zip_code"],
+    optional=["extra"],
+    defaults={"extra": ""},
+)
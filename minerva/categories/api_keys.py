@@ -1,10 +1,12 @@
+from typing import List
+
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder
 from ..helpers.custom_types import JsonData
 
 
-@attr.s
+@attr.s(slots=True)
 class ApiKey(Category):
     """
     These are not a standard "category" in that they do not have a set of
@@ -21,7 +23,7 @@ class ApiKey(Category):
     user: str = attr.ib()
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {"_id": self.id, "key": self.key, "user": self.user}
 
     def to_json(self) -> JsonData:
@@ -29,15 +31,20 @@ class ApiKey(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "ApiKey":
-        ApiKey.verify_request_body(req)
-        return ApiKey(key=req["key"], user=req["user"])
+        return API_KEY_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body, required_fields=["key", "user"], optional_fields=[], category=ApiKey
-        )
+        API_KEY_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "api_keys"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        # Looked up by key on every authenticated request
+        return [Index(["key"], unique=True)]
+
+
+API_KEY_DECODER = RequestDecoder(ApiKey, required=["key", "user"])
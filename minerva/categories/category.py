@@ -1,16 +1,141 @@
 from abc import ABCMeta, abstractmethod
-from typing import List, Type
+from copy import copy
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Tuple, Type, Union
+
+import attr
 
 from ..helpers.exceptions import BadRequestError
-from ..helpers.custom_types import JsonData
+from ..helpers.custom_types import JsonData, Maybe
+
+# Per-Category list of (field name, trusted_loader, default), built on first use
+_trusted_plans: Dict[type, List[Tuple[str, Any, Any]]] = {}
+
+# Stands in for a field that isn't in a request body at all
+_MISSING = object()
+
+# Per-Category answer to `served_as_stored()`, worked out on first use
+_served_as_stored: Dict[type, bool] = {}
+
+
+@attr.s
+class Index:
+    """
+    A datastore-agnostic description of an index a Category's queries rely on.
+    Connectors turn these into whatever their store needs (see `ensure_indexes()`).
+    """
+
+    # The fields to index, in order (a compound index if more than one)
+    fields: List[str] = attr.ib()
+    unique: bool = attr.ib(default=False)
+    # If set, records are deleted this many seconds after the (date) field's value
+    expire_after_seconds: Maybe[int] = attr.ib(default=None)
+
+
+# Every taggable Category is searched by tag (`/tagged/<tag>`, tag cascades)
+TAGS_INDEX = Index(["tags"])
+
+# Keys of a PATCH body that add values to, or remove values from, list fields
+PATCH_ADD = "$add"
+PATCH_REMOVE = "$remove"
+
+
+@attr.s(slots=True)
+class Patch:
+    """
+    A datastore-agnostic description of a partial update to a stored Category object,
+    built by `Category.patch_from_request()`.  Connectors send only these paths to the
+    store instead of rewriting the whole object.
+    """
+
+    # Field -> new value, already in its stored (`to_json()`) form
+    set: JsonData = attr.ib(factory=dict)
+    # List field -> values to add to the list, if they aren't already in it
+    add: Dict[str, List[str]] = attr.ib(factory=dict)
+    # List field -> values to remove from the list
+    remove: Dict[str, List[str]] = attr.ib(factory=dict)
+
+    def apply(self, item: "Category") -> "Category":
+        """
+        Build the object as it is after this patch, without another trip to the store
+        :param item: The object as it was before the patch
+        :return: A new object with the patch applied
+        """
+        patched = item.from_trusted({**item.to_json(), **self.set, "id": item.id})
+        for field, values in self.add.items():
+            # Like `$addToSet`, a value is never added to the list twice
+            added = list(getattr(patched, field))
+            for value in values:
+                if value not in added:
+                    added.append(value)
+            object.__setattr__(patched, field, added)
+        for field, values in self.remove.items():
+            current = getattr(patched, field)
+            object.__setattr__(patched, field, [v for v in current if v not in values])
+        return patched
+
+    def to_response(self) -> JsonData:
+        return {"set": self.set, PATCH_ADD: self.add, PATCH_REMOVE: self.remove}
+
+
+@attr.s(slots=True)
+class Partial:
+    """
+    Some of the fields of a stored Category object, read with a projection (`?fields=`).
+    Only the requested fields are hydrated, so nested Category types that weren't asked
+    for are never built.  Stands in for the full object wherever it is only returned.
+    """
+
+    item_type: Type["Category"] = attr.ib()
+    # Field -> hydrated value, for the requested fields the record actually had
+    values: JsonData = attr.ib()
+    id: str = attr.ib(default="")
+
+    def to_response(self) -> JsonData:
+        return {"_id": self.id, **{name: response_value(v) for name, v in self.values.items()}}
+
+
+def response_value(value: Any) -> Any:
+    """
+    Helper function for turning a hydrated field value into the form the API returns it in
+    :param value: The field's value
+    :return: The value as `to_response()` would return it
+    """
+    if isinstance(value, Category):
+        return value.to_response()
+    if isinstance(value, list):
+        return [response_value(v) for v in value]
+    if isinstance(value, Enum):
+        return str(value)
+    return value
+
+
+def stored_value(value: Any) -> Any:
+    """
+    Helper function for turning a converted field value into the form it is stored in
+    :param value: The field's value, after its `attrs` converter has run
+    :return: The value as `to_json()` would store it
+    """
+    if isinstance(value, Category):
+        return value.to_json()
+    if isinstance(value, list):
+        return [stored_value(v) for v in value]
+    if isinstance(value, Enum):
+        return value.value
+    return value
 
 
 class Category(metaclass=ABCMeta):
     """
     Astract base class for all objects that are stored in the database.
-    Implementing these functions allows it to be stored and retrieved easily
+    Implementing these functions allows it to be stored and retrieved easily.
+    Subclasses are slotted `attrs` classes (`@attr.s(slots=True)`), so their objects carry
+    no per-instance `__dict__` -- which is also why the response form is `to_response()`.
     """
 
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         """
         Pretty plain -- ideally new Category objects should use `attrs` to initialize
@@ -19,7 +144,7 @@ class Category(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         """
         This is used to convert the object into a dictionary that can be
         returned as JSON in the API response body
@@ -32,7 +157,7 @@ class Category(metaclass=ABCMeta):
         """
         This is entirely used only by the Mongo connector to make a version
         of the object (without ID) that can be stored in Mongo.  Pretty much
-        just a version of __dict__ but without the `_id` field.
+        just a version of `to_response()` but without the `_id` field.
         :return: A dictionary representation of the object **without** the ID
         """
         return NotImplemented
@@ -42,8 +167,8 @@ class Category(metaclass=ABCMeta):
     def from_request(req: JsonData) -> "Category":
         """
         Convert the Flask request body to the Category object type.
-        This should always start with a call to <Type>.verify_request_body(req)
-        to make sure that all required data exists.
+        This should check the body as it goes, to make sure that all required data exists --
+        usually by handing it to the type's compiled RequestDecoder.
         :param req: The Flask request body
         :return: The newly created object
         """
@@ -62,6 +187,7 @@ class Category(metaclass=ABCMeta):
         incoming request has all of the necessary fields to build the object of the
         given type, as well as not including any additional unexpected fields.
         Will raise HttpErrors when it finds something it doesn't like.
+        The built-in types compile their fields into a RequestDecoder instead.
         **NOTE:  All params require qualification in the call.**
         :param body: The Flask request body to verify
         :param required_fields: A list of the required fields for the object, as strings
@@ -90,6 +216,7 @@ class Category(metaclass=ABCMeta):
         its list of required and optional fields for construction.
         Some creative meta-programming could probably get around needing this,
         but there's enough of that already in this project, so let's favor readability.
+        `from_request()` already checks the body, so there's no need to call both.
         :param body: The incoming Flask request body
         :return: N/A
         """
@@ -106,15 +233,300 @@ class Category(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @staticmethod
+    def indexes() -> List[Index]:
+        """
+        The indexes needed so that none of the queries run against this Category's
+        collection has to scan the whole thing.  Override this to add your own.
+        :return: The list of indexes for the collection
+        """
+        return []
+
+    @classmethod
+    def patch_from_request(cls, req: JsonData) -> Patch:
+        """
+        Convert a PATCH request body into a Patch for this Category type.  Top-level fields
+        are set to the given value after going through the field's own `attrs` converter and
+        validator, and `$add`/`$remove` hold values to add to or remove from list fields,
+        e.g. `{"url": "...", "$add": {"tags": ["New"]}, "$remove": {"tags": ["Old"]}}`.
+        Will raise HttpErrors when it finds something it doesn't like.
+        :param req: The Flask request body
+        :return: The validated Patch
+        """
+        if not isinstance(req, dict) or not req:
+            raise BadRequestError("Expected a json body but received none")
+        fields = {field.name: field for field in attr.fields(cls) if field.name != "id"}
+        patch = Patch()
+        for name, value in req.items():
+            if name in (PATCH_ADD, PATCH_REMOVE):
+                continue
+            field = fields.get(name)
+            if field is None:
+                raise BadRequestError(f"Invalid request -- found unexpected field '{name}'")
+            if field.default is attr.NOTHING and (value is None or value == ""):
+                raise BadRequestError(f"Invalid request -- required field '{name}' is empty")
+            try:
+                if field.converter is not None:
+                    value = field.converter(value)
+                if field.validator is not None:
+                    field.validator(None, field, value)
+            except (TypeError, ValueError) as e:
+                raise BadRequestError(f"Invalid request -- bad value for field '{name}': {e}")
+            patch.set[name] = stored_value(value)
+        for key, changes in ((PATCH_ADD, patch.add), (PATCH_REMOVE, patch.remove)):
+            if not isinstance(req.get(key, {}), dict):
+                raise BadRequestError(f"Invalid request -- '{key}' must map list fields to values")
+            for name, values in req.get(key, {}).items():
+                field = fields.get(name)
+                if field is None or field.type != List[str]:
+                    raise BadRequestError(f"Invalid request -- '{name}' is not a list field")
+                if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                    raise BadRequestError(f"Invalid request -- '{key}.{name}' must be strings")
+                # A single update can't touch the same path twice
+                if name in patch.set or (key == PATCH_REMOVE and name in patch.add):
+                    raise BadRequestError(f"Invalid request -- '{name}' is changed more than once")
+                if key == PATCH_ADD and field.validator is not None:
+                    field.validator(None, field, values)
+                # Repeats are dropped so every store adds a value once, as `$addToSet` does
+                changes[name] = list(dict.fromkeys(values))
+        if not (patch.set or patch.add or patch.remove):
+            raise BadRequestError("Invalid request -- expected at least one field to change")
+        return patch
+
     @classmethod
-    def from_mongo(cls, record: JsonData) -> "Category":
+    def verify_fields(cls, fields: List[str]) -> None:
+        """
+        Makes sure that every one of the given names is a field of this Category type, so
+        that it can be used in a projection.  Will raise an HttpError if it isn't.
+        :param fields: The requested field names
+        :return: N/A
+        """
+        if not fields:
+            raise BadRequestError("Invalid request -- expected at least one field name")
+        known = {field.name for field in attr.fields(cls)}
+        for name in fields:
+            if name not in known or name == "id":
+                raise BadRequestError(
+                    f"Invalid request -- '{name}' is not a field of {cls.__name__}"
+                )
+
+    @classmethod
+    def from_trusted(cls, record: JsonData) -> "Category":
+        """
+        Builds the object straight from data that was already validated when it was
+        stored, skipping every `attrs` validator and converter (and their side effects,
+        like creating Tags).  Nested Category fields are rebuilt with the loader in the
+        field's `trusted_loader` metadata -- see `trusted_list()`.
+        Fields missing from the record get their default; unknown fields are ignored.
+        :param record: The stored record, with the ID already under `id`
+        :return: The newly-created object
+        """
+        plan = _trusted_plans.get(cls)
+        if plan is None:
+            plan = _trusted_plans[cls] = [
+                (field.name, field.metadata.get("trusted_loader"), field.default)
+                for field in attr.fields(cls)
+            ]
+        item = cls.__new__(cls)
+        for name, loader, default in plan:
+            if name in record:
+                value = record[name] if loader is None else loader(record[name])
+            elif default is attr.NOTHING:
+                raise TypeError(f"{cls.__name__} record is missing required field '{name}'")
+            elif isinstance(default, attr.Factory):
+                value = default.factory()
+            else:
+                value = default
+            object.__setattr__(item, name, value)
+        return item
+
+    @classmethod
+    def partial_from_trusted(cls, record: JsonData, fields: List[str]) -> Partial:
+        """
+        Like `from_trusted()`, but only hydrates the given fields
+        :param record: The stored record (possibly projected), with the ID already under `id`
+        :param fields: The fields to hydrate; any others in the record are ignored
+        :return: The partial object
+        """
+        values = {}
+        for field in attr.fields(cls):
+            if field.name in fields and field.name in record:
+                loader = field.metadata.get("trusted_loader")
+                value = record[field.name]
+                values[field.name] = value if loader is None else loader(value)
+        return Partial(cls, values, id=record.get("id", ""))
+
+    @classmethod
+    def from_mongo(
+        cls, record: JsonData, trusted: bool = True, fields: Maybe[List[str]] = None
+    ) -> Union["Category", Partial]:
         """
         This is a mongo-specific wrapper function for handling the weird way that
         Mongo deals with unique IDs to make it work well with the base constructor
         THIS IS NOT NECESSARY FOR NON-MONGO CONSTRUCTORS.
         :param record: The Mongo record
+        :param trusted: Whether to skip validation -- see `from_trusted()`.  Pass False
+                        to run the record back through the full constructor instead.
+        :param fields: If given, only these fields are hydrated, into a Partial object
         :return: The newly-created object from the Mongo record
         """
         record["id"] = str(record["_id"])
         del record["_id"]
+        # The connector's per-record version (see the ETags) isn't part of the object
+        record.pop("_v", None)
+        if fields is not None:
+            return cls.partial_from_trusted(record, fields)
+        if trusted:
+            return cls.from_trusted(record)
         return cls(**record)
+
+
+class RequestDecoder:
+    """
+    A Category type's request schema, compiled once at import.  Checks a request body and
+    builds the object from it in a single pass: the allowed fields are a frozenset, and how
+    each field is handled (required or defaulted, nested or not) is worked out up front.
+    Nested objects go through their own decoders, so each of them is only checked once.
+    The object's own `attrs` converters and validators still run when it is built.
+    """
+
+    def __init__(
+        self,
+        category: Type[Category],
+        required: List[str],
+        optional: List[str] = [],
+        nested: Dict[str, "RequestDecoder"] = {},
+        nested_lists: Dict[str, "RequestDecoder"] = {},
+        defaults: JsonData = {},
+    ) -> None:
+        """
+        :param category: The type of "Category" object to build
+        :param required: The fields that must be in the body, and must not be empty
+        :param optional: The fields that may be left out of the body
+        :param nested: Fields holding a single nested object -> the decoder for it
+        :param nested_lists: Fields holding a list of nested objects -> the decoder for them
+        :param defaults: The value for an optional field that is left out, when it isn't
+                         the field's `attrs` default
+        """
+        self.category = category
+        self.allowed = frozenset(required) | frozenset(optional)
+        required_fields = frozenset(required)
+        attrs_defaults = {field.name: field.default for field in attr.fields(category)}
+        # (name, required, makes the default, nested decoder, holds a list of them)
+        self.plan: List[Tuple[str, bool, Any, Any, bool]] = []
+        for name in dict.fromkeys(required + optional):
+            default = defaults.get(name, attrs_defaults.get(name, attr.NOTHING))
+            if isinstance(default, attr.Factory):
+                make_default = default.factory
+            elif default is attr.NOTHING:
+                make_default = None
+            else:
+                # The `attrs` default may be a (shared) list, so every object gets a copy
+                make_default = lambda default=default: copy(default)
+            decoder = nested.get(name, nested_lists.get(name))
+            self.plan.append(
+                (name, name in required_fields, make_default, decoder, name in nested_lists)
+            )
+
+    def decode(self, body: JsonData) -> Category:
+        """
+        Check the request body and build the object from it.
+        Will raise HttpErrors when it finds something it doesn't like.
+        :param body: The Flask request body
+        :return: The newly created object
+        """
+        return self.category(**self._values(body, build=True))
+
+    def verify(self, body: JsonData) -> None:
+        """
+        Check the request body, without building anything.
+        Will raise HttpErrors when it finds something it doesn't like.
+        :param body: The Flask request body
+        :return: N/A
+        """
+        self._values(body, build=False)
+
+    def _values(self, body: JsonData, build: bool) -> JsonData:
+        if not isinstance(body, dict):
+            raise BadRequestError(
+                f"Invalid request -- expected an object for {self.category.__name__}"
+            )
+        if not self.allowed.issuperset(body):
+            field = next(field for field in body if field not in self.allowed)
+            raise BadRequestError(f"Invalid request -- found unexpected field '{field}'")
+        values = {}
+        for name, required, make_default, decoder, is_list in self.plan:
+            value = body.get(name, _MISSING)
+            if value is _MISSING:
+                if required:
+                    raise BadRequestError(
+                        f"Invalid request -- missing field '{name}' in {self.category.__name__}"
+                    )
+                if build and make_default is not None:
+                    values[name] = make_default()
+                continue
+            if required and (value is None or value == ""):
+                raise BadRequestError(f"Invalid request -- required field '{name}' is empty")
+            if decoder is not None:
+                if not is_list:
+                    value = decoder._build(value, build)
+                elif isinstance(value, list):
+                    value = [decoder._build(v, build) for v in value]
+                else:
+                    raise BadRequestError(f"Invalid request -- '{name}' must be a list")
+            values[name] = value
+        return values
+
+    def _build(self, body: JsonData, build: bool) -> Maybe[Category]:
+        values = self._values(body, build)
+        return self.category(**values) if build else None
+
+
+def _nested_category(field_type: Any) -> Maybe[Type[Category]]:
+    # The Category type held by a field (directly, or as a List[...] of them), if any
+    if getattr(field_type, "__origin__", None) is list:
+        field_type = field_type.__args__[0]
+    if isinstance(field_type, type) and issubclass(field_type, Category):
+        return field_type
+    return None
+
+
+def served_as_stored(cls: Type[Category]) -> bool:
+    """
+    Whether a Category type's stored form (`to_json()`) is already its response form
+    (`to_response()`) apart from the ID, so that read-only requests can send stored records
+    on without building any objects.  It isn't for types with datetime fields, or enums that
+    don't print as their stored value, anywhere in them.
+    :param cls: The type of "Category" object
+    :return: True if stored records only need their ID turned into `_id` to be served
+    """
+    served = _served_as_stored.get(cls)
+    if served is None:
+        served = _served_as_stored[cls] = all(
+            _served_as_stored_field(field.type) for field in attr.fields(cls)
+        )
+    return served
+
+
+def _served_as_stored_field(field_type: Any) -> bool:
+    nested = _nested_category(field_type)
+    if nested is not None:
+        return served_as_stored(nested)
+    if field_type is datetime or datetime in getattr(field_type, "__args__", ()):
+        return False
+    if isinstance(field_type, type) and issubclass(field_type, Enum):
+        return all(str(member) == member.value for member in field_type)
+    return True
+
+
+def trusted_list(item_type: Type[Category]) -> Callable[[List[JsonData]], List[Category]]:
+    """
+    Builds a `trusted_loader` for a field holding a list of nested Category objects
+    :param item_type: The type of the nested Category objects
+    :return: The loader function
+    """
+
+    def loader(records: List[JsonData]) -> List[Category]:
+        return [item_type.from_trusted(record) for record in records]
+
+    return loader
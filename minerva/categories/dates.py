@@ -2,13 +2,13 @@ from typing import List
 
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder, TAGS_INDEX
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list, day_validator, month_validator, year_validator
 from ..helpers.converters import num_padding
 
 
-@attr.s
+@attr.s(slots=True)
 class Date(Category):
     name: str = attr.ib()
     day: str = attr.ib(validator=day_validator, converter=num_padding)
@@ -19,7 +19,7 @@ class Date(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "name": self.name,
@@ -42,25 +42,22 @@ class Date(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Date":
-        Date.verify_request_body(req)
-        return Date(
-            name=req["name"],
-            day=req["day"],
-            month=req["month"],
-            year=req.get("year", ""),
-            notes=req.get("notes", []),
-            tags=req.get("tags", []),
-        )
+        return DATE_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["name", "day", "month"],
-            optional_fields=["year", "notes", "tags"],
-            category=Date,
-        )
+        DATE_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "dates"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        # The month/day index is for `/dates/today`
+        return [TAGS_INDEX, Index(["month", "day"])]
+
+
+DATE_DECODER = RequestDecoder(
+    Date, required=["name", "day", "month"], optional=["year", "notes", "tags"]
+)
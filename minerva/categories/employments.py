@@ -2,8 +2,8 @@ from typing import List, Union
 
 import attr
 
-from .addresses import Address, address_converter
-from .category import Category
+from .addresses import Address, ADDRESS_DECODER, address_converter
+from .category import Category, Index, RequestDecoder, TAGS_INDEX
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list, month_validator, year_validator
 from ..helpers.converters import num_padding
@@ -15,17 +15,19 @@ def employer_converter(employer: Union["Employer", JsonData]) -> "Employer":
     return Employer(**employer)
 
 
-@attr.s
+@attr.s(slots=True)
 class Employer(Category):
     name: str = attr.ib()
-    address: Address = attr.ib(converter=address_converter)
+    address: Address = attr.ib(
+        converter=address_converter, metadata={"trusted_loader": Address.from_trusted}
+    )
     phone: str = attr.ib()
     supervisor: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "name": self.name,
-            "address": self.address.__dict__(),
+            "address": self.address.to_response(),
             "phone": self.phone,
             "supervisor": self.supervisor,
         }
@@ -40,34 +42,32 @@ class Employer(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Employer":
-        Employer.verify_request_body(req)
-        return Employer(
-            name=req["name"],
-            address=Address.from_request(req["address"]),
-            phone=req["phone"],
-            supervisor=req.get("supervisor", ""),
-        )
+        return EMPLOYER_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["name", "address", "phone"],
-            optional_fields=["supervisor"],
-            category=Employer,
-        )
-        Address.verify_request_body(body["address"])
+        EMPLOYER_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return NotImplemented
 
 
-@attr.s
+EMPLOYER_DECODER = RequestDecoder(
+    Employer,
+    required=["name", "address", "phone"],
+    optional=["supervisor"],
+    nested={"address": ADDRESS_DECODER},
+)
+
+
+@attr.s(slots=True)
 class Employment(Category):
     title: str = attr.ib()
     salary: int = attr.ib()
-    employer: Employer = attr.ib(converter=employer_converter)
+    employer: Employer = attr.ib(
+        converter=employer_converter, metadata={"trusted_loader": Employer.from_trusted}
+    )
     start_month: str = attr.ib(validator=month_validator, converter=num_padding)
     start_year: str = attr.ib(validator=year_validator, converter=num_padding)
     end_month: str = attr.ib(default="", converter=num_padding)
@@ -76,12 +76,12 @@ class Employment(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "title": self.title,
             "salary": self.salary,
-            "employer": self.employer.__dict__(),
+            "employer": self.employer.to_response(),
             "start_month": self.start_month,
             "start_year": self.start_year,
             "end_month": self.end_month,
@@ -103,27 +103,24 @@ class Employment(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Employment":
-        Employment.verify_request_body(req)
-        return Employment(
-            title=req["title"],
-            salary=req["salary"],
-            employer=Employer.from_request(req["employer"]),
-            start_month=req["start_month"],
-            start_year=req["start_year"],
-            end_month=req.get("end_month", ""),
-            end_year=req.get("end_year", ""),
-            tags=req.get("tags", []),
-        )
+        return EMPLOYMENT_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["title", "salary", "employer", "start_month", "start_year"],
-            optional_fields=["tags", "end_month", "end_year"],
-            category=Employment,
-        )
+        EMPLOYMENT_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "employments"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+EMPLOYMENT_DECODER = RequestDecoder(
+    Employment,
+    required=["title", "salary", "employer", "start_month", "start_year"],
+    optional=["tags", "end_month", "end_year"],
+    nested={"employer": EMPLOYER_DECODER},
+)
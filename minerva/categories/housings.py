@@ -2,15 +2,17 @@ from typing import List
 
 import attr
 
-from .addresses import Address, address_converter
-from .category import Category
+from .addresses import Address, ADDRESS_DECODER, address_converter
+from .category import Category, Index, RequestDecoder, TAGS_INDEX
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list, month_validator, year_validator
 
 
-@attr.s
+@attr.s(slots=True)
 class Housing(Category):
-    address: Address = attr.ib(converter=address_converter)
+    address: Address = attr.ib(
+        converter=address_converter, metadata={"trusted_loader": Address.from_trusted}
+    )
     start_month: str = attr.ib(validator=month_validator)
     start_year: str = attr.ib(validator=year_validator)
     end_month: str = attr.ib(default="")
@@ -20,10 +22,10 @@ class Housing(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
-            "address": self.address.__dict__(),
+            "address": self.address.to_response(),
             "start_month": self.start_month,
             "start_year": self.start_year,
             "end_month": self.end_month,
@@ -45,27 +47,24 @@ class Housing(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Housing":
-        Housing.verify_request_body(req)
-        return Housing(
-            address=Address.from_request(req["address"]),
-            start_month=req["start_month"],
-            start_year=req["start_year"],
-            end_month=req.get("end_month", ""),
-            end_year=req.get("end_year", ""),
-            monthly_payment=req.get("monthly_payment", 0),
-            tags=req.get("tags", []),
-        )
+        return HOUSING_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["address", "start_month", "start_year"],
-            optional_fields=["end_month", "end_year", "monthly_payment", "tags"],
-            category=Housing,
-        )
-        Address.verify_request_body(body["address"])
+        HOUSING_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "housings"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+HOUSING_DECODER = RequestDecoder(
+    Housing,
+    required=["address", "start_month", "start_year"],
+    optional=["end_month", "end_year", "monthly_payment", "tags"],
+    nested={"address": ADDRESS_DECODER},
+)
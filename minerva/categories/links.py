@@ -2,12 +2,12 @@ from typing import List
 
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder, TAGS_INDEX
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list
 
 
-@attr.s
+@attr.s(slots=True)
 class Link(Category):
     name: str = attr.ib()
     url: str = attr.ib()
@@ -16,7 +16,7 @@ class Link(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "name": self.name,
@@ -30,20 +30,19 @@ class Link(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Link":
-        Link.verify_request_body(req)
-        return Link(
-            name=req["name"], url=req["url"], notes=req.get("notes", []), tags=req.get("tags", [])
-        )
+        return LINK_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["name", "url"],
-            optional_fields=["notes", "tags"],
-            category=Link,
-        )
+        LINK_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "links"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+LINK_DECODER = RequestDecoder(Link, required=["name", "url"], optional=["notes", "tags"])
@@ -2,42 +2,39 @@ from typing import List, Union
 
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder, TAGS_INDEX, trusted_list
 from ..helpers.exceptions import BadRequestError
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list
 
 
-@attr.s
+@attr.s(slots=True)
 class SecurityQuestion(Category):
     question: str = attr.ib()
     answer: str = attr.ib()
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {"question": self.question, "answer": self.answer}
 
     def to_json(self) -> JsonData:
-        return self.__dict__()
+        return self.to_response()
 
     @staticmethod
     def from_request(req: JsonData) -> "SecurityQuestion":
-        SecurityQuestion.verify_request_body(req)
-        return SecurityQuestion(question=req.get("question", ""), answer=req.get("answer", ""))
+        return SECURITY_QUESTION_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["question", "answer"],
-            optional_fields=[],
-            category=SecurityQuestion,
-        )
+        SECURITY_QUESTION_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return NotImplemented
 
 
+SECURITY_QUESTION_DECODER = RequestDecoder(SecurityQuestion, required=["question", "answer"])
+
+
 # Needed for attrs conversion
 def convert_sq_list(inputs: List[Union[JsonData, SecurityQuestion]]) -> List[SecurityQuestion]:
     sq_list = []
@@ -53,19 +50,23 @@ def convert_sq_list(inputs: List[Union[JsonData, SecurityQuestion]]) -> List[Sec
     return sq_list
 
 
-@attr.s
+@attr.s(slots=True)
 class Login(Category):
     application: str = attr.ib()
     password: str = attr.ib()
     url: str = attr.ib(default="")
     username: str = attr.ib(default="")
     email: str = attr.ib(default="")
-    security_questions: List[SecurityQuestion] = attr.ib(default=[], converter=convert_sq_list)
+    security_questions: List[SecurityQuestion] = attr.ib(
+        default=[],
+        converter=convert_sq_list,
+        metadata={"trusted_loader": trusted_list(SecurityQuestion)},
+    )
     # ---
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "application": self.application,
@@ -73,7 +74,7 @@ class Login(Category):
             "url": self.url,
             "username": self.username,
             "email": self.email,
-            "security_questions": [sq.__dict__() for sq in self.security_questions],
+            "security_questions": [sq.to_response() for sq in self.security_questions],
             "tags": self.tags,
         }
 
@@ -90,30 +91,24 @@ class Login(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Login":
-        Login.verify_request_body(req)
-        return Login(
-            application=req["application"],
-            password=req["password"],
-            url=req.get("url", ""),
-            username=req.get("username", ""),
-            email=req.get("email", ""),
-            security_questions=[
-                SecurityQuestion.from_request(sq) for sq in req.get("security_questions", [])
-            ],
-            tags=req.get("tags", []),
-        )
+        return LOGIN_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["application", "username", "password"],
-            optional_fields=["url", "username", "email", "security_questions", "tags"],
-            category=Login,
-        )
-        for sq in body.get("security_questions", []):
-            SecurityQuestion.verify_request_body(sq)
+        LOGIN_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "logins"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+LOGIN_DECODER = RequestDecoder(
+    Login,
+    required=["application", "username", "password"],
+    optional=["url", "username", "email", "security_questions", "tags"],
+    nested_lists={"security_questions": SECURITY_QUESTION_DECODER},
+)
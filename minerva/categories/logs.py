@@ -1,22 +1,25 @@
 import attr
 
 from datetime import datetime
+from typing import List
 
-from .category import Category
+from .category import Category, Index
 from ..helpers.custom_types import JsonData, LogLevel
 
 
-@attr.s
+@attr.s(slots=True)
 class Log(Category):
     created_at: datetime = attr.ib()
     user: str = attr.ib()
-    level: LogLevel = attr.ib(converter=LogLevel.from_str)
+    level: LogLevel = attr.ib(
+        converter=LogLevel.from_str, metadata={"trusted_loader": LogLevel.from_str}
+    )
     message: str = attr.ib()
     details: JsonData = attr.ib(default={})
     # ---
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "created_at": self.created_at.isoformat(),
@@ -48,3 +51,11 @@ class Log(Category):
     @staticmethod
     def collection() -> str:
         return "access_logs"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [
+            # Logs are only kept for 7 days
+            Index(["created_at"], expire_after_seconds=604800),
+            Index(["user", "level"]),
+        ]
@@ -2,12 +2,12 @@ from typing import List
 
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder, TAGS_INDEX
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list
 
 
-@attr.s
+@attr.s(slots=True)
 class Note(Category):
     contents: str = attr.ib()
     url: str = attr.ib(default="")
@@ -15,7 +15,7 @@ class Note(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {"_id": self.id, "contents": self.contents, "url": self.url, "tags": self.tags}
 
     def to_json(self) -> JsonData:
@@ -23,15 +23,19 @@ class Note(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Note":
-        Note.verify_request_body(req)
-        return Note(contents=req["contents"], url=req.get("url", ""), tags=req.get("tags", []))
+        return NOTE_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body, required_fields=["contents"], optional_fields=["url", "tags"], category=Note
-        )
+        NOTE_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "notes"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+NOTE_DECODER = RequestDecoder(Note, required=["contents"], optional=["url", "tags"])
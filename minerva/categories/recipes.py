@@ -3,7 +3,7 @@ from enum import Enum
 
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder, TAGS_INDEX, trusted_list
 from ..helpers.custom_types import JsonData
 from ..helpers.validators import validate_tag_list
 
@@ -35,37 +35,39 @@ class RecipeType(str, Enum):
         return self.value
 
 
-@attr.s
+@attr.s(slots=True)
 class Ingredient(Category):
     amount: str = attr.ib()
     item: str = attr.ib()
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {"amount": self.amount, "item": self.item}
 
     def to_json(self) -> JsonData:
-        return self.__dict__()
+        return self.to_response()
 
     @staticmethod
     def from_request(req: JsonData) -> "Ingredient":
-        Ingredient.verify_request_body(req)
-        return Ingredient(amount=req["amount"], item=req["item"])
+        return INGREDIENT_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body, required_fields=["amount", "item"], optional_fields=[], category=Ingredient
-        )
+        INGREDIENT_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return NotImplemented
 
 
-@attr.s
+INGREDIENT_DECODER = RequestDecoder(Ingredient, required=["amount", "item"])
+
+
+@attr.s(slots=True)
 class Recipe(Category):
     name: str = attr.ib()
-    ingredients: List[Ingredient] = attr.ib(converter=ingredient_converter)
+    ingredients: List[Ingredient] = attr.ib(
+        converter=ingredient_converter, metadata={"trusted_loader": trusted_list(Ingredient)}
+    )
     instructions: List[str] = attr.ib()
     recipe_type: RecipeType = attr.ib()
     url: str = attr.ib(default="")
@@ -75,11 +77,11 @@ class Recipe(Category):
     tags: List[str] = attr.ib(default=[], validator=validate_tag_list)
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {
             "_id": self.id,
             "name": self.name,
-            "ingredients": [i.__dict__() for i in self.ingredients],
+            "ingredients": [i.to_response() for i in self.ingredients],
             "instructions": self.instructions,
             "recipe_type": str(self.recipe_type),
             "url": self.url,
@@ -102,29 +104,24 @@ class Recipe(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Recipe":
-        Recipe.verify_request_body(req)
-        return Recipe(
-            name=req["name"],
-            ingredients=[Ingredient.from_request(i) for i in req["ingredients"]],
-            instructions=req["instructions"],
-            recipe_type=req["recipe_type"],
-            url=req.get("url", ""),
-            source=req.get("source", ""),
-            notes=req.get("notes", []),
-            tags=req.get("tags", []),
-        )
+        return RECIPE_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body,
-            required_fields=["name", "ingredients", "instructions", "recipe_type"],
-            optional_fields=["url", "source", "notes", "tags"],
-            category=Recipe,
-        )
-        for ingredient in body.get("ingredients", []):
-            Ingredient.verify_request_body(ingredient)
+        RECIPE_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "recipes"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [TAGS_INDEX]
+
+
+RECIPE_DECODER = RequestDecoder(
+    Recipe,
+    required=["name", "ingredients", "instructions", "recipe_type"],
+    optional=["url", "source", "notes", "tags"],
+    nested_lists={"ingredients": INGREDIENT_DECODER},
+)
@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import List
+
+import attr
+
+from .category import Category, Index
+from ..helpers.custom_types import JsonData, Maybe
+
+# Cascade actions
+DELETE = "delete"
+UPDATE = "update"
+# Cascade statuses
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Finished cascades are kept this long for clients to poll, then expire
+DONE_RETENTION_SECONDS = 604800
+
+
+@attr.s(slots=True)
+class TagCascade(Category):
+    """
+    Tracks the progress of deleting or renaming a Tag across every other collection.
+    This is not a standard "category" with CRUD endpoints -- it is stored so that
+    clients can poll an asynchronous cascade, and so that an interrupted cascade
+    can be picked back up where it left off.  The worker running a cascade holds a lease
+    on it (`owner` and `heartbeat_at`), so that only abandoned cascades are picked up.
+    """
+
+    action: str = attr.ib()  # DELETE or UPDATE
+    old_name: str = attr.ib()
+    new_name: str = attr.ib(default="")
+    # Names of the Category types that still need the cascade, or that failed it
+    pending: List[str] = attr.ib(default=[])
+    failed: List[str] = attr.ib(default=[])
+    status: str = attr.ib(default=RUNNING)
+    # The worker running the cascade, and when it last reported progress
+    owner: str = attr.ib(default="")
+    heartbeat_at: Maybe[datetime] = attr.ib(default=None)
+    # Set once the cascade is DONE, so that the record expires
+    finished_at: Maybe[datetime] = attr.ib(default=None)
+    # ---
+    id: str = attr.ib(default="")
+
+    def to_response(self) -> JsonData:
+        return {
+            "_id": self.id,
+            "action": self.action,
+            "old_name": self.old_name,
+            "new_name": self.new_name,
+            "pending": self.pending,
+            "failed": self.failed,
+            "status": self.status,
+            "owner": self.owner,
+            "heartbeat_at": self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def to_json(self) -> JsonData:
+        return {
+            "action": self.action,
+            "old_name": self.old_name,
+            "new_name": self.new_name,
+            "pending": self.pending,
+            "failed": self.failed,
+            "status": self.status,
+            "owner": self.owner,
+            "heartbeat_at": self.heartbeat_at,
+            "finished_at": self.finished_at,
+        }
+
+    @staticmethod
+    def from_request(req: JsonData) -> "Category":
+        # Not needed for cascades
+        return NotImplemented
+
+    @staticmethod
+    def verify_request_body(body: JsonData) -> None:
+        # Not needed for cascades
+        return NotImplemented
+
+    @staticmethod
+    def collection() -> str:
+        return "tag_cascades"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [
+            # The status index is for finding unfinished cascades to resume
+            Index(["status"]),
+            Index(["finished_at"], expire_after_seconds=DONE_RETENTION_SECONDS),
+        ]
@@ -1,15 +1,17 @@
+from typing import List
+
 import attr
 
-from .category import Category
+from .category import Category, Index, RequestDecoder
 from ..helpers.custom_types import JsonData
 
 
-@attr.s
+@attr.s(slots=True)
 class Tag(Category):
     name: str = attr.ib()
     id: str = attr.ib(default="")
 
-    def __dict__(self) -> JsonData:
+    def to_response(self) -> JsonData:
         return {"_id": self.id, "name": self.name}
 
     def to_json(self) -> JsonData:
@@ -17,15 +19,19 @@ class Tag(Category):
 
     @staticmethod
     def from_request(req: JsonData) -> "Tag":
-        Tag.verify_request_body(req)
-        return Tag(name=req["name"])
+        return TAG_DECODER.decode(req)
 
     @staticmethod
     def verify_request_body(body: JsonData) -> None:
-        Category.verify_incoming_request(
-            body=body, required_fields=["name"], optional_fields=[], category=Tag
-        )
+        TAG_DECODER.verify(body)
 
     @staticmethod
     def collection() -> str:
         return "tags"
+
+    @staticmethod
+    def indexes() -> List[Index]:
+        return [Index(["name"], unique=True)]
+
+
+TAG_DECODER = RequestDecoder(Tag, required=["name"])
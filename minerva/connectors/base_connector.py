@@ -1,9 +1,11 @@
 from abc import ABCMeta, abstractmethod
-from typing import List, Type
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple, Type
 
 from ..categories.api_keys import ApiKey
 from ..categories.logs import Log
-from ..categories.category import Category
+from ..categories.tag_cascades import TagCascade
+from ..categories.category import Category, Patch
 from ..helpers.custom_types import JsonData, Maybe, LogLevel
 
 
@@ -23,6 +25,8 @@ class BaseConnector(metaclass=ABCMeta):
         """
         self.item_type = item_type
         self.is_test = is_test
+        # Implementations should bump this once for every trip they make to the datastore
+        self.round_trips = 0
 
     @abstractmethod
     def __enter__(self) -> "BaseConnector":
@@ -35,6 +39,25 @@ class BaseConnector(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @abstractmethod
+    def ensure_indexes(self) -> List[str]:
+        """
+        Create every index in the "Category" type's `indexes()` manifest.  This must be
+        idempotent -- indexes that already exist should be left alone.
+        :return: The names of the indexes on the collection after the call
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def find_unindexed_queries(self) -> List[str]:
+        """
+        Check every query shape that this connector runs against the "Category" type's
+        collection (not just the `indexes()` manifest, which would always match its own
+        indexes) and report those that the store would answer by scanning the whole thing
+        :return: A description of each query that falls back to a full scan; can be empty
+        """
+        return NotImplemented
+
     @abstractmethod
     def create(self, item: Category) -> str:
         """
@@ -45,40 +68,196 @@ class BaseConnector(metaclass=ABCMeta):
         return NotImplemented
 
     @abstractmethod
-    def find_all(self, page: int = 1, count: int = 10) -> List[Category]:
+    def create_many(
+        self, items: List[Category], chunk_size: int = 1000
+    ) -> Tuple[List[Maybe[str]], Dict[int, str]]:
+        """
+        Insert a batch of new "Category" objects into the store, in as few trips as the store
+        allows.  The order of the inserts does not matter, and one failed insert must not
+        stop the rest of the batch from being written.
+        :param items: The objects to be created
+        :param chunk_size: The most objects to send to the store in a single trip
+        :return: The unique ID of each object in the order given (None where it failed),
+                 and the error message for each failed object keyed by its position
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def upsert_tags(self, names: List[str]) -> int:
+        """
+        Make sure that a Tag exists for every one of the given names, in a single trip.
+        Only ever called on a connector for the Tag type.
+        :param names: The Tag names that need to exist
+        :return: The number of Tags that had to be created
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def find_all(
+        self, page: int = 1, count: int = 10, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> List[Category]:
         """
         Retrieve a paginated list of all of a single type of "Category" object
         :param page: The **1-indexed** page number to be retrieving
         :param count: The number of items to retrieve in a single page
+        :param fields: If given, only read these fields and return Partial objects
+        :param raw: Passthrough read -- return each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
         :return: A list of "Category" objects retrieved with the query
         """
         return NotImplemented
 
     @abstractmethod
-    def find_all_no_limit(self) -> List[Category]:
+    def find_page(
+        self,
+        page: int = 1,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        estimate_total: bool = False,
+        raw: bool = False,
+    ) -> Tuple[List[Category], int]:
+        """
+        Like find_all(), but also counts every object of the "Category" type, so that a
+        list response can say how many pages there are.  The page and the count should
+        come back in a single trip.
+        :param page: The **1-indexed** page number to be retrieving
+        :param count: The number of items to retrieve in a single page
+        :param fields: If given, only read these fields and return Partial objects
+        :param estimate_total: Whether a cheap, approximate total (from the store's
+                               metadata, say) is good enough
+        :param raw: Passthrough read -- return each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
+        :return: The page of "Category" objects, and the total number of objects
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def find_page_after(
+        self,
+        after: Maybe[str] = None,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        raw: bool = False,
+    ) -> Tuple[List[Category], Maybe[str]]:
+        """
+        Retrieve a page of a single type of "Category" object using keyset (cursor)
+        pagination, so that every page costs the same no matter how deep it is.
+        Results must come back in a stable order.
+        :param after: The opaque cursor returned with the previous page, or None for the first
+        :param count: The number of items to retrieve in a single page
+        :param fields: If given, only read these fields and return Partial objects
+        :param raw: Passthrough read -- return each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
+        :return: The page of "Category" objects, and the cursor for the next page
+                 (None if this is the last page)
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def find_all_no_limit(
+        self, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> List[Category]:
         """
         Like find_all(), but with no pagination.  This would only be used sparingly!
+        :param fields: If given, only read these fields and return Partial objects
+        :param raw: Passthrough read -- return each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
         :return: A list of every single object of a specific "Category" type in the store
         """
         return NotImplemented
 
     @abstractmethod
-    def find_all_by_tag(self, tag: str) -> List[Category]:
+    def iter_all(
+        self, batch_size: int = 100, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> Iterator[Category]:
+        """
+        Like find_all_no_limit(), but lazily yields one object at a time so that
+        memory use stays flat no matter how big the collection is.  Objects come in ID order.
+        :param batch_size: How many records to pull from the store per trip
+        :param fields: If given, only read these fields and yield Partial objects
+        :param raw: Passthrough read -- yield each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
+        :return: An iterator over every object of a specific "Category" type in the store
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def find_all_by_tag_across(
+        self,
+        tag: str,
+        other_types: List[Type[Category]],
+        page: Maybe[int] = None,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        raw: bool = False,
+    ) -> Tuple[Dict[Type[Category], List[Category]], Dict[Type[Category], int]]:
+        """
+        Like find_all_no_limit(), but filtered by the tag provided, and searches this
+        connector's "Category" type and every one of the other types in as few trips to the
+        store as it can manage.
+        Results are ordered by Category type, then by ID, so that pages are stable.
+        :param tag: The tag to filter by
+        :param other_types: The other "Category" types to search alongside this one
+        :param page: The **1-indexed** page number to retrieve, or None for everything
+        :param count: The number of items to retrieve in a single page
+        :param fields: If given, only read these fields and return Partial objects.  Each
+                       type reads the ones it has, so not every name must belong to every type.
+        :param raw: Passthrough read -- return each object's response form (see
+                    `Category.to_response()`) instead, without building it if possible
+        :return: The page of tagged objects, and the total number of tagged objects,
+                 each keyed by "Category" type
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def collection_version(self) -> int:
+        """
+        Every write to a collection must bump a change counter for it, so that list
+        responses can be given ETags and answered with a 304 without being read again
+        :return: The collection's change counter (0 if it has never been written to)
         """
-        Like find_all_no_limit(), but it filters by the tag provided
-        :return: A list of every object of the specified category that contains the tag provided
+        return NotImplemented
+
+    @abstractmethod
+    def find_one_with_version(
+        self,
+        item_id: str,
+        fields: Maybe[List[str]] = None,
+        unchanged: Callable[[int], bool] = lambda version: False,
+    ) -> Tuple[Maybe[Category], Maybe[int]]:
+        """
+        Like find_one(), but also returns the object's version, which must go up on every
+        write to the object.  If `unchanged` says that the client already has this version,
+        the object is not built at all.
+        :param item_id: The unique ID of the object in the store
+        :param fields: If given, only read these fields and return a Partial object
+        :param unchanged: Called with the stored version; return True to skip building it
+        :return: The object (None if it wasn't found or was unchanged), and its version
+                 (None if it wasn't found)
         """
         return NotImplemented
 
     @abstractmethod
-    def find_one(self, item_id: str) -> Maybe[Category]:
+    def find_one(self, item_id: str, fields: Maybe[List[str]] = None) -> Maybe[Category]:
         """
-        Find a single "Category" object by its unique ID
+        Find a single "Category" object by its unique ID.  This may be served from a cache of
+        recently read objects, so every write must drop the cached copies of what it changed.
         :param item_id: The unique ID of the object in the store
+        :param fields: If given, only read these fields and return a Partial object
         :return: The object found with the ID, or None if the ID didn't match an entry
         """
         return NotImplemented
 
+    @abstractmethod
+    def find_many(self, item_ids: List[str]) -> List[Category]:
+        """
+        Retrieve every "Category" object of this type matching the given IDs, in a single trip
+        :param item_ids: The unique IDs of the objects to find
+        :return: The objects that were found, in no particular order; IDs that are not valid
+                 or that match nothing are left out
+        """
+        return NotImplemented
+
     @abstractmethod
     def find_api_key(self, key: str) -> Maybe[ApiKey]:
         """
@@ -100,6 +279,36 @@ class BaseConnector(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @abstractmethod
+    def find_one_and_update(
+        self, item_id: str, updated_item: Category, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        """
+        The same _full_ update as `update_one`, but done as a single atomic operation that
+        hands back the object as it was _before_ the update, so callers that need both
+        the old and new values don't have to look the object up first.
+        :param item_id: The unique ID of the object to update
+        :param updated_item: The new values to update the object with.
+        :param versions: If given, only update the object if it is at one of these versions
+                         (see `find_one_with_version()`)
+        :return: The object as it was before the update if found, otherwise None
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def patch_one(
+        self, item_id: str, patch: Patch, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        """
+        Partially update a single "Category" object in the store, as a single atomic
+        operation that only sends the changed fields (see `Patch`)
+        :param item_id: The unique ID of the object to update
+        :param patch: The fields to set, and the values to add to or remove from list fields
+        :param versions: If given, only update the object if it is at one of these versions
+        :return: The object as it was before the update if found, otherwise None
+        """
+        return NotImplemented
+
     @abstractmethod
     def tag_one(self, item_id: str, tag: str) -> Maybe[Category]:
         """
@@ -122,6 +331,39 @@ class BaseConnector(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @abstractmethod
+    def find_one_and_delete(
+        self, item_id: str, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        """
+        Delete a single "Category" object from the store by ID as a single atomic operation
+        that hands back the deleted object
+        :param item_id: The unique ID of the object to delete
+        :param versions: If given, only delete the object if it is at one of these versions
+        :return: The object that was deleted if found, otherwise None
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def update_many(self, updates: Dict[str, Category], chunk_size: int = 1000) -> Dict[str, str]:
+        """
+        Update a batch of existing "Category" objects in as few trips as the store allows.
+        One failed update must not stop the rest of the batch from being written.
+        :param updates: The new values for each object, keyed by the object's unique ID
+        :param chunk_size: The most updates to send to the store in a single trip
+        :return: The error message for each update that failed, keyed by the object's ID
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def delete_many(self, item_ids: List[str]) -> int:
+        """
+        Delete a batch of "Category" objects in a single trip
+        :param item_ids: The unique IDs of the objects to delete
+        :return: The number of objects that were deleted
+        """
+        return NotImplemented
+
     @abstractmethod
     def delete_all(self) -> int:
         """
@@ -139,6 +381,34 @@ class BaseConnector(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @abstractmethod
+    def iter_today_events(
+        self, batch_size: int = 100, fields: Maybe[List[str]] = None
+    ) -> Iterator[Category]:
+        """
+        Like get_today_events(), but lazily yields one object at a time (see iter_all())
+        :param batch_size: How many records to pull from the store per trip
+        :param fields: If given, only read these fields and yield Partial objects
+        :return: An iterator over the "Date" Category objects that match today's date
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def claim_tag_cascade(
+        self, owner: str, stale_before: datetime, skip_ids: List[str] = []
+    ) -> Maybe[TagCascade]:
+        """
+        A special function for picking up an unfinished "TagCascade", so that no two workers
+        ever run the same one.  In a single atomic step, find a cascade that is FAILED, or
+        RUNNING without a heartbeat since `stale_before`, and mark it RUNNING with the given
+        owner and a fresh heartbeat.
+        :param owner: The worker claiming the cascade
+        :param stale_before: RUNNING cascades with a heartbeat after this are left alone
+        :param skip_ids: IDs of cascades not to claim (ones this worker already ran, say)
+        :return: The claimed cascade, or None if there's nothing to pick up
+        """
+        return NotImplemented
+
     @abstractmethod
     def cascade_tag_delete(self, tag_name: str) -> None:
         """
@@ -177,6 +447,16 @@ class BaseConnector(metaclass=ABCMeta):
         """
         return NotImplemented
 
+    @abstractmethod
+    def add_logs(self, logs: List[Log]) -> int:
+        """
+        Create a batch of Log entries in the database in as few trips as the store allows.
+        Used by the background log writer; the order of the entries does not matter.
+        :param logs: The Log entries to store
+        :return: The number of Log entries that were stored
+        """
+        return NotImplemented
+
     @abstractmethod
     def get_logs(self, users: List[str] = [], levels: List[str] = []) -> List[Log]:
         """
@@ -186,3 +466,31 @@ class BaseConnector(metaclass=ABCMeta):
         :return: A list of the Log entries found, filtered as needed; can be empty
         """
         return NotImplemented
+
+    @abstractmethod
+    def iter_logs(
+        self,
+        users: List[str] = [],
+        levels: List[str] = [],
+        batch_size: int = 100,
+        fields: Maybe[List[str]] = None,
+    ) -> Iterator[Log]:
+        """
+        Like get_logs(), but lazily yields one Log entry at a time (see iter_all())
+        :param users: A list of usernames to filter logs by
+        :param levels: A list of log levels to filter logs by (standard log levels)
+        :param batch_size: How many records to pull from the store per trip
+        :param fields: If given, only read these fields and yield Partial objects
+        :return: An iterator over the Log entries found, filtered as needed
+        """
+        return NotImplemented
+
+    @abstractmethod
+    def delete_logs(self, users: List[str] = [], levels: List[str] = []) -> int:
+        """
+        Delete every Log entry that get_logs() would find with the same filters, in one trip
+        :param users: A list of usernames to filter logs by
+        :param levels: A list of log levels to filter logs by (standard log levels)
+        :return: The number of Log entries deleted from the store
+        """
+        return NotImplemented
@@ -1,112 +1,799 @@
 import os
+import atexit
+import base64
+import binascii
+import threading
 
-from typing import Type, List
+import attr
+from typing import Any, Callable, Type, List, Dict, Iterator, Tuple, Union
 from bson import ObjectId
-from pymongo import MongoClient, ReturnDocument
+from bson.raw_bson import RawBSONDocument
+from bson.errors import InvalidId
+from pymongo import MongoClient, ReturnDocument, IndexModel, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 from pymongo.collection import Collection
 from pymongo.database import Database
 from datetime import date, datetime
 
 from .base_connector import BaseConnector
 from ..categories.api_keys import ApiKey
-from ..categories.category import Category
+from ..categories.category import Category, Index, Patch, served_as_stored, stored_value
 from ..categories.logs import Log
-from ..helpers.exceptions import InternalServerError
+from ..categories.tag_cascades import TagCascade, RUNNING, FAILED
+from ..helpers.caches import ItemCache, item_cache
+from ..helpers.exceptions import BadRequestError, InternalServerError
 from ..helpers.custom_types import JsonData, Maybe, LogLevel
 
 
+# Pooled clients, keyed by (process ID, Mongo URL).  Keying on the PID means that a
+# pre-fork WSGI worker never reuses the sockets it inherited from its parent process.
+_clients: Dict[Tuple[int, str], MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+# Every stored record carries a version that goes up on every write to it (for ETags)
+VERSION_FIELD = "_v"
+# Holds a change counter per collection, bumped on every write to that collection
+VERSIONS_COLLECTION = "collection_versions"
+
+
 def by_id(obj_id: str) -> JsonData:
     """Helper function for building Mongo queries"""
     return {"_id": ObjectId(obj_id)}
 
 
+def by_ids(obj_ids: List[str]) -> JsonData:
+    """Helper function for building Mongo queries that match many IDs, skipping invalid ones"""
+    return {"_id": {"$in": [ObjectId(obj_id) for obj_id in obj_ids if ObjectId.is_valid(obj_id)]}}
+
+
+def by_key(key: str) -> JsonData:
+    """Helper function for building Mongo queries that find an ApiKey"""
+    return {"key": key}
+
+
+def by_tag(tag: str) -> JsonData:
+    """Helper function for building Mongo queries that match records with the tag"""
+    return {"tags": tag}
+
+
+def by_any_tag(tags: List[str]) -> JsonData:
+    """Helper function for building Mongo queries that match records with any of the tags"""
+    return {"tags": {"$in": tags}}
+
+
+def by_day(day: date) -> JsonData:
+    """Helper function for building Mongo queries that match Dates on the same day of the year"""
+    return {"month": day.strftime("%m"), "day": day.strftime("%d")}
+
+
+def by_log_filters(users: List[str], levels: List[str]) -> JsonData:
+    """Helper function for building Mongo queries that match Logs (no filters match them all)"""
+    search_filter = {}
+    if users:
+        search_filter["user"] = {"$in": users}
+    if levels:
+        search_filter["level"] = {"$in": levels}
+    return search_filter
+
+
+def by_claimable_cascade(stale_before: datetime, skip_ids: List[str]) -> JsonData:
+    """
+    Helper function for building Mongo queries that match the TagCascades a worker may pick
+    up: FAILED ones, and RUNNING ones whose worker hasn't reported in since `stale_before`
+    """
+    return {
+        "status": {"$in": [RUNNING, FAILED]},
+        "_id": {"$nin": [ObjectId(cascade_id) for cascade_id in skip_ids]},
+        "$or": [
+            {"status": FAILED},
+            {"heartbeat_at": {"$lt": stale_before}},
+            # Also matches cascades recorded before they had a heartbeat
+            {"heartbeat_at": None},
+        ],
+    }
+
+
+def at_version(versions: Maybe[List[int]]) -> JsonData:
+    """Helper function for only matching records at one of the given versions"""
+    if versions is None:
+        return {}
+    # Records written before versioning have no version field, and so are at version 0
+    return {VERSION_FIELD: {"$in": [v or None for v in versions]}}
+
+
+def projection(fields: Maybe[List[str]]) -> Maybe[JsonData]:
+    """Helper function for turning requested field names into a Mongo projection"""
+    if fields is None:
+        return None
+    return {**{field: 1 for field in fields}, VERSION_FIELD: 1}
+
+
+def response_projection(item_type: Type[Category], fields: Maybe[List[str]]) -> Maybe[JsonData]:
+    """
+    Helper function for a $project stage that turns stored records straight into the
+    response form of the Category type (see `Category.to_response()`), filling in defaults
+    for missing top-level fields the way `from_trusted()` would
+    :return: The stage's spec, or None if the response form can't be built in the store
+    """
+    if not served_as_stored(item_type):
+        return None
+    stage: JsonData = {"_id": {"$toString": "$_id"}}
+    for field in attr.fields(item_type):
+        if field.name == "id" or (fields is not None and field.name not in fields):
+            continue
+        if fields is not None or field.default is attr.NOTHING:
+            # Partial objects only have the fields the record had
+            stage[field.name] = 1
+            continue
+        default = field.default
+        if isinstance(default, attr.Factory):
+            default = default.factory()
+        stage[field.name] = {"$ifNull": [f"${field.name}", {"$literal": stored_value(default)}]}
+    return stage
+
+
+def read_stages(item_type: Type[Category], fields: Maybe[List[str]], raw: bool) -> List[JsonData]:
+    """
+    Helper function for the last stages of an aggregation that reads records: straight into
+    their response form for passthrough (`raw`) reads if the store can build it, otherwise
+    just the requested fields
+    """
+    if raw:
+        stage = response_projection(item_type, fields)
+        if stage is not None:
+            return [{"$project": stage}]
+    return [{"$project": projection(fields)}] if fields is not None else []
+
+
+def record_loader(
+    item_type: Type[Category], fields: Maybe[List[str]], raw: bool
+) -> Callable[[JsonData], Any]:
+    """
+    Helper function for turning each record a read gets back into what the read returns:
+    a Category (or Partial) object, or for passthrough (`raw`) reads, its response form --
+    as it came from the store if `read_stages()` could build it there
+    """
+    if not raw:
+        return lambda record: item_type.from_mongo(record, fields=fields)
+    if served_as_stored(item_type):
+        return lambda record: record
+    return lambda record: item_type.from_mongo(record, fields=fields).to_response()
+
+
+def encode_cursor(obj_id: str) -> str:
+    """Helper function for turning the last ID on a page into an opaque page cursor"""
+    return base64.urlsafe_b64encode(ObjectId(obj_id).binary).decode()
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    """Helper function for turning an opaque page cursor back into the ID to start after"""
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise BadRequestError(f"Invalid page cursor '{cursor}'")
+
+
+def index_model(index: Index) -> IndexModel:
+    """Helper function for turning a Category's Index into the Mongo equivalent"""
+    options = {"unique": index.unique}
+    if index.expire_after_seconds is not None:
+        options["expireAfterSeconds"] = index.expire_after_seconds
+    return IndexModel([(field, ASCENDING) for field in index.fields], **options)
+
+
+def plan_stages(plan: JsonData) -> List[str]:
+    """Helper function for listing every stage in a Mongo query plan"""
+    # Newer servers using the slot-based engine nest the classic plan one level down
+    plan = plan.get("queryPlan", plan)
+    stages = [plan.get("stage", "")]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages.extend(plan_stages(child))
+    return stages
+
+
+def collection_name(item_type: Type[Category], is_test: bool) -> str:
+    """Helper function for getting the name of the collection a Category type is stored in"""
+    if is_test:
+        return f"unittest_{item_type.collection()}"
+    return item_type.collection()
+
+
+def mongo_url() -> str:
+    """Helper function for reading the Mongo URL out of the environment"""
+    url = os.getenv("MONGO_URL")
+    if url == "":
+        raise InternalServerError("MONGO_URL not set correctly")
+    return url
+
+
+def client_options() -> JsonData:
+    """
+    Builds the MongoClient pool/timeout options from the environment.
+    Anything left unset falls back to the pymongo defaults.
+    :return: The keyword arguments to hand to the MongoClient constructor
+    """
+    env_options = {
+        "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+        "minPoolSize": "MONGO_MIN_POOL_SIZE",
+        "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+        "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+        "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+        "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+        "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    }
+    options = {}
+    for option, env_var in env_options.items():
+        value = os.getenv(env_var)
+        if value:
+            try:
+                options[option] = int(value)
+            except ValueError:
+                raise InternalServerError(f"{env_var} must be an integer, got '{value}'")
+    return options
+
+
+def pooled_client(url: str) -> MongoClient:
+    """
+    Gets the process-wide MongoClient for the given URL, building it on first use.
+    The client is created with `connect=False` so that nothing touches the network
+    until the first operation, which keeps it safe to build before a fork.
+    :param url: The Mongo URL to connect to
+    :return: The shared MongoClient for this process
+    """
+    key = (os.getpid(), url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = MongoClient(url, connect=False, **client_options())
+                _clients[key] = client
+    return client
+
+
+def close_pooled_clients() -> None:
+    """
+    Closes every pooled MongoClient owned by this process.
+    Clients inherited from a parent process are dropped without being closed.
+    :return: N/A
+    """
+    pid = os.getpid()
+    with _clients_lock:
+        for key in list(_clients):
+            client = _clients.pop(key)
+            if key[0] == pid:
+                client.close()
+
+
+def _forget_inherited_clients() -> None:
+    # Runs in the child after a fork; the parent still owns these sockets
+    _clients.clear()
+
+
+atexit.register(close_pooled_clients)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_inherited_clients)
+
+
 class MongoConnector(BaseConnector):
-    def __init__(self, item_type: Type[Category], is_test=False) -> None:
+    def __init__(self, item_type: Type[Category], is_test=False, pooled=True) -> None:
+        """
+        :param item_type: The type of "Category" object
+        :param is_test: Whether or not this is being created during tests
+        :param pooled: Whether to share the process-wide MongoClient (the default), or to
+                       build a dedicated client that is closed again on exit
+        """
         super().__init__(item_type, is_test)
-        self.coll_name = item_type.collection()
-        if is_test:
-            self.coll_name = f"unittest_{self.coll_name}"
+        self.pooled = pooled
+        self.coll_name = collection_name(item_type, is_test)
+        # A cascade's progress is read while another worker is writing it, so it's never cached
+        self.cache: Maybe[ItemCache] = None if issubclass(item_type, TagCascade) else item_cache
 
     def __enter__(self) -> "MongoConnector":
-        mongo_url = os.getenv("MONGO_URL")
-        if mongo_url == "":
-            raise InternalServerError("MONGO_URL not set correctly")
-        self.client: MongoClient = MongoClient(mongo_url)
+        url = mongo_url()
+        if self.pooled:
+            self.client: MongoClient = pooled_client(url)
+        else:
+            self.client: MongoClient = MongoClient(url, **client_options())
         self.db: Database = self.client.minerva
         self.collection: Collection = self.db[self.coll_name]
+        self.versions: Collection = self.db[VERSIONS_COLLECTION]
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        self.client.close()
+        if not self.pooled:
+            self.client.close()
+
+    def ensure_indexes(self) -> List[str]:
+        indexes = self.item_type.indexes()
+        if indexes:
+            self.round_trips += 1
+            self.collection.create_indexes([index_model(index) for index in indexes])
+        self.round_trips += 1
+        return list(self.collection.index_information())
+
+    def find_unindexed_queries(self) -> List[str]:
+        unindexed = []
+        for query in self.query_shapes():
+            self.round_trips += 1
+            plan = self.collection.find(query).explain()["queryPlanner"]["winningPlan"]
+            if "COLLSCAN" in plan_stages(plan):
+                unindexed.append(f"{self.coll_name}: {sorted(query)}")
+        return unindexed
+
+    def query_shapes(self) -> List[JsonData]:
+        """
+        The filters that this connector's reads and writes actually run against the
+        collection, other than look-ups by ID, built by the same helpers with placeholder
+        values -- only the shape of a query is planned.  The `$unionWith` tag search runs
+        `by_tag()` on each collection, so it is covered by that collection's own check.
+        :return: The filters, for every query that applies to the Category type
+        """
+        fields = {field.name for field in attr.fields(self.item_type)}
+        shapes = []
+        if "tags" in fields:
+            # find_all_by_tag_across(), and the cascades
+            shapes += [by_tag(""), by_any_tag([""])]
+        if {"month", "day"} <= fields:
+            shapes.append(by_day(date.today()))  # get_today_events()
+        if issubclass(self.item_type, ApiKey):
+            shapes.append(by_key(""))  # find_api_key()
+        if issubclass(self.item_type, TagCascade):
+            shapes.append(by_claimable_cascade(datetime.now(), []))  # claim_tag_cascade()
+        if issubclass(self.item_type, Log):
+            # get_logs() by user, and by user and level
+            shapes += [by_log_filters([""], []), by_log_filters([""], [""])]
+        return shapes
+
+    def _after_write(self, item_ids: Maybe[List[str]]) -> None:
+        # Called after every successful write with the IDs of the records it changed (None if
+        # it can't know them).  List ETags are built from the collection's change counter,
+        # and `find_one` may be served from the item cache, so both need to hear about it.
+        # Reading one small document keeps every list ETag cheap, at the cost of this second
+        # write -- if it is lost, lists can be answered with a 304 until the next write.
+        self.round_trips += 1
+        self.versions.update_one({"_id": self.coll_name}, {"$inc": {"version": 1}}, upsert=True)
+        if self.cache is not None and item_ids != []:
+            self.cache.invalidate(self.coll_name, item_ids)
+
+    def collection_version(self) -> int:
+        self.round_trips += 1
+        record = self.versions.find_one({"_id": self.coll_name})
+        return record["version"] if record else 0
 
     def create(self, item: Category) -> str:
-        return str(self.collection.insert_one(item.to_json()).inserted_id)
+        self.round_trips += 1
+        item_id = str(self.collection.insert_one({**item.to_json(), VERSION_FIELD: 1}).inserted_id)
+        self._after_write([])
+        return item_id
+
+    def create_many(
+        self, items: List[Category], chunk_size: int = 1000
+    ) -> Tuple[List[Maybe[str]], Dict[int, str]]:
+        documents = [{**item.to_json(), VERSION_FIELD: 1} for item in items]
+        ids: List[Maybe[str]] = [None] * len(documents)
+        errors: Dict[int, str] = {}
+        for start in range(0, len(documents), chunk_size):
+            chunk = documents[start : start + chunk_size]
+            self.round_trips += 1
+            try:
+                self.collection.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    errors[start + write_error["index"]] = write_error.get("errmsg", str(e))
+            # The driver assigns each document its _id before sending it
+            for offset, document in enumerate(chunk):
+                if start + offset not in errors:
+                    ids[start + offset] = str(document["_id"])
+        if len(errors) < len(documents):
+            self._after_write([])
+        return ids, errors
+
+    def upsert_tags(self, names: List[str]) -> int:
+        if not names:
+            return 0
+        self.round_trips += 1
+        try:
+            result = self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"name": n}, {"$setOnInsert": {"name": n, VERSION_FIELD: 1}}, upsert=True
+                    )
+                    for n in names
+                ],
+                ordered=False,
+            )
+            upserted = result.upserted_count
+        except BulkWriteError as e:
+            # Racing upserts on the unique name index -- the Tag exists either way
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+            upserted = e.details.get("nUpserted", 0)
+        if upserted:
+            self._after_write([])
+        return upserted
+
+    def find_all(
+        self, page: int = 1, count: int = 10, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> List[Category]:
+        self.round_trips += 1
+        load = record_loader(self.item_type, fields, raw)
+        if raw:
+            pipeline = [{"$sort": {"_id": 1}}, {"$skip": (page - 1) * count}, {"$limit": count}]
+            results = self.collection.aggregate(pipeline + read_stages(self.item_type, fields, raw))
+        else:
+            results = (
+                self.collection.find({}, projection(fields))
+                .sort("_id", 1)
+                .skip((page - 1) * count)
+                .limit(count)
+            )
+        return [load(item) for item in results]
+
+    def find_page(
+        self,
+        page: int = 1,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        estimate_total: bool = False,
+        raw: bool = False,
+    ) -> Tuple[List[Category], int]:
+        if estimate_total:
+            # Read from the collection metadata, so this costs the same at any size
+            items = self.find_all(page=page, count=count, fields=fields, raw=raw)
+            self.round_trips += 1
+            return items, self.collection.estimated_document_count()
+        records = [{"$sort": {"_id": 1}}, {"$skip": (page - 1) * count}, {"$limit": count}]
+        records += read_stages(self.item_type, fields, raw)
+        self.round_trips += 1
+        result = next(
+            self.collection.aggregate(
+                [{"$facet": {"total": [{"$count": "count"}], "records": records}}]
+            )
+        )
+        total = result["total"][0]["count"] if result["total"] else 0
+        load = record_loader(self.item_type, fields, raw)
+        return [load(item) for item in result["records"]], total
+
+    def find_page_after(
+        self,
+        after: Maybe[str] = None,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        raw: bool = False,
+    ) -> Tuple[List[Category], Maybe[str]]:
+        self.round_trips += 1
+        search_filter = {"_id": {"$gt": decode_cursor(after)}} if after else {}
+        # Grab one extra record to find out whether there is a next page
+        if raw:
+            pipeline = [{"$match": search_filter}, {"$sort": {"_id": 1}}, {"$limit": count + 1}]
+            results = self.collection.aggregate(pipeline + read_stages(self.item_type, fields, raw))
+        else:
+            results = (
+                self.collection.find(search_filter, projection(fields))
+                .sort("_id", 1)
+                .limit(count + 1)
+            )
+        load = record_loader(self.item_type, fields, raw)
+        items = [load(item) for item in results]
+        if len(items) <= count:
+            return items, None
+        items = items[:count]
+        return items, encode_cursor(items[-1]["_id"] if raw else items[-1].id)
+
+    def find_all_no_limit(
+        self, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> List[Category]:
+        self.round_trips += 1
+        if raw:
+            results = self.collection.aggregate(read_stages(self.item_type, fields, raw))
+        else:
+            results = self.collection.find({}, projection(fields))
+        load = record_loader(self.item_type, fields, raw)
+        return [load(item) for item in results]
 
-    def find_all(self, page: int = 1, count: int = 10) -> List[Category]:
-        results = self.collection.find().skip((page - 1) * count).limit(count)
-        return [self.item_type.from_mongo(item) for item in results]
+    def iter_all(
+        self, batch_size: int = 100, fields: Maybe[List[str]] = None, raw: bool = False
+    ) -> Iterator[Category]:
+        return self._iter({}, batch_size, fields, raw=raw, ordered=True)
 
-    def find_all_no_limit(self) -> List[Category]:
-        results = self.collection.find()
-        return [self.item_type.from_mongo(item) for item in results]
+    def _iter(
+        self,
+        search_filter: JsonData,
+        batch_size: int,
+        fields: Maybe[List[str]],
+        raw: bool = False,
+        ordered: bool = False,
+    ) -> Iterator[Category]:
+        # Lazily reads every matching record, `batch_size` of them per trip to the store.
+        # Not a generator, so the query is issued (and counted) by the call itself, whether
+        # or not the caller ever reads from the iterator.
+        self.round_trips += 1
+        if raw:
+            pipeline = [{"$match": search_filter}]
+            if ordered:
+                pipeline.append({"$sort": {"_id": 1}})
+            pipeline += read_stages(self.item_type, fields, raw)
+            results = self.collection.aggregate(pipeline, batchSize=batch_size)
+        else:
+            results = self.collection.find(search_filter, projection(fields))
+            if ordered:
+                results = results.sort("_id", 1)
+            results = results.batch_size(batch_size)
+        return map(record_loader(self.item_type, fields, raw), results)
 
-    def find_all_by_tag(self, tag: str) -> List[Category]:
-        results = self.collection.find({"tags": tag})
-        return [self.item_type.from_mongo(item) for item in results]
+    def find_all_by_tag_across(
+        self,
+        tag: str,
+        other_types: List[Type[Category]],
+        page: Maybe[int] = None,
+        count: int = 10,
+        fields: Maybe[List[str]] = None,
+        raw: bool = False,
+    ) -> Tuple[Dict[Type[Category], List[Category]], Dict[Type[Category], int]]:
+        def fields_of(item_type: Type[Category]) -> Maybe[List[str]]:
+            # Each type only reads the requested fields that it actually has
+            if fields is None:
+                return None
+            return [name for name in fields if name in attr.fields_dict(item_type)]
 
-    def find_one(self, item_id: str) -> Maybe[Category]:
-        result = self.collection.find_one(by_id(item_id))
+        def tagged(item_type: Type[Category], coll_name: str) -> List[JsonData]:
+            # Every record is marked with the collection it came from
+            stage = response_projection(item_type, fields_of(item_type)) if raw else None
+            if stage is None:
+                stage = projection(fields_of(item_type))
+            if stage is None:
+                return [{"$match": by_tag(tag)}, {"$addFields": {"_coll": coll_name}}]
+            return [
+                {"$match": by_tag(tag)},
+                {"$project": {**stage, "_coll": {"$literal": coll_name}}},
+            ]
+
+        # One aggregation: this collection, plus every other collection via $unionWith
+        types_by_coll = {self.coll_name: self.item_type}
+        pipeline = tagged(self.item_type, self.coll_name)
+        for item_type in other_types:
+            coll_name = collection_name(item_type, self.is_test)
+            types_by_coll[coll_name] = item_type
+            pipeline.append(
+                {"$unionWith": {"coll": coll_name, "pipeline": tagged(item_type, coll_name)}}
+            )
+        pipeline.append({"$sort": {"_coll": 1, "_id": 1}})
+        self.round_trips += 1
+        if page is None:
+            records = list(self.collection.aggregate(pipeline))
+            totals = {}
+            for record in records:
+                totals[record["_coll"]] = totals.get(record["_coll"], 0) + 1
+        else:
+            pipeline.append(
+                {
+                    "$facet": {
+                        "totals": [{"$group": {"_id": "$_coll", "count": {"$sum": 1}}}],
+                        "records": [{"$skip": (page - 1) * count}, {"$limit": count}],
+                    }
+                }
+            )
+            result = next(self.collection.aggregate(pipeline))
+            records = result["records"]
+            totals = {total["_id"]: total["count"] for total in result["totals"]}
+        found = {item_type: [] for item_type in types_by_coll.values()}
+        loaders = {
+            item_type: record_loader(item_type, fields_of(item_type), raw)
+            for item_type in types_by_coll.values()
+        }
+        for record in records:
+            item_type = types_by_coll[record.pop("_coll")]
+            found[item_type].append(loaders[item_type](record))
+        counts = {item_type: totals.get(coll, 0) for coll, item_type in types_by_coll.items()}
+        return found, counts
+
+    def find_one_with_version(
+        self,
+        item_id: str,
+        fields: Maybe[List[str]] = None,
+        unchanged: Callable[[int], bool] = lambda version: False,
+    ) -> Tuple[Maybe[Category], Maybe[int]]:
+        result = self._find_record(item_id, fields)
+        if not result:
+            return None, None
+        version = result.get(VERSION_FIELD, 0)
+        if unchanged(version):
+            return None, version
+        return self.item_type.from_mongo(result, fields=fields), version
+
+    def find_one(self, item_id: str, fields: Maybe[List[str]] = None) -> Maybe[Category]:
+        result = self._find_record(item_id, fields)
         if not result:
             return None
-        return self.item_type.from_mongo(result)
+        return self.item_type.from_mongo(result, fields=fields)
+
+    def _find_record(self, item_id: str, fields: Maybe[List[str]]) -> Maybe[JsonData]:
+        # Read-through the item cache.  Only whole records are cached, but a projection can
+        # still be served from one.  Misses aren't cached, since creates don't invalidate.
+        if self.cache is None:
+            self.round_trips += 1
+            return self.collection.find_one(by_id(item_id), projection(fields))
+        record, stamp = self.cache.get(self.coll_name, item_id)
+        if record is not None:
+            return record
+        self.round_trips += 1
+        record = self.collection.find_one(by_id(item_id), projection(fields))
+        if record is not None and fields is None:
+            self.cache.put(self.coll_name, item_id, record, stamp)
+        return record
+
+    def find_many(self, item_ids: List[str]) -> List[Category]:
+        self.round_trips += 1
+        return [self.item_type.from_mongo(item) for item in self.collection.find(by_ids(item_ids))]
 
     def find_api_key(self, key: str) -> Maybe[ApiKey]:
-        result = self.collection.find_one({"key": key})
+        self.round_trips += 1
+        result = self.collection.find_one(by_key(key))
         if not result:
             return None
         return ApiKey.from_mongo(result)
 
     def update_one(self, item_id: str, updated_item: Category) -> Maybe[Category]:
+        self.round_trips += 1
         result = self.collection.find_one_and_update(
-            by_id(item_id), {"$set": updated_item.to_json()}, return_document=ReturnDocument.AFTER,
+            by_id(item_id),
+            {"$set": updated_item.to_json(), "$inc": {VERSION_FIELD: 1}},
+            return_document=ReturnDocument.AFTER,
         )
         if result is None:
             return result
+        self._after_write([item_id])
+        return self.item_type.from_mongo(result)
+
+    def find_one_and_update(
+        self, item_id: str, updated_item: Category, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        self.round_trips += 1
+        result = self.collection.find_one_and_update(
+            {**by_id(item_id), **at_version(versions)},
+            {"$set": updated_item.to_json(), "$inc": {VERSION_FIELD: 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if result is None:
+            return result
+        self._after_write([item_id])
+        return self.item_type.from_mongo(result)
+
+    def patch_one(
+        self, item_id: str, patch: Patch, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        self.round_trips += 1
+        update: JsonData = {"$inc": {VERSION_FIELD: 1}}
+        if patch.set:
+            update["$set"] = patch.set
+        if patch.add:
+            update["$addToSet"] = {field: {"$each": values} for field, values in patch.add.items()}
+        if patch.remove:
+            update["$pull"] = {field: {"$in": values} for field, values in patch.remove.items()}
+        result = self.collection.find_one_and_update(
+            {**by_id(item_id), **at_version(versions)},
+            update,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if result is None:
+            return result
+        self._after_write([item_id])
         return self.item_type.from_mongo(result)
 
     def tag_one(self, item_id: str, tag: str) -> Maybe[Category]:
+        self.round_trips += 1
         # If the tag already exists, a new one is not added
-        result = self.collection.find_one_and_update(by_id(item_id), {"$addToSet": {"tags": tag}})
+        result = self.collection.find_one_and_update(
+            by_id(item_id), {"$addToSet": {"tags": tag}, "$inc": {VERSION_FIELD: 1}}
+        )
         if result is None:
             return result
+        self._after_write([item_id])
         return self.item_type.from_mongo(result)
 
     def delete_one(self, item_id: str) -> bool:
-        return self.collection.delete_one(by_id(item_id)).deleted_count > 0
+        self.round_trips += 1
+        deleted = self.collection.delete_one(by_id(item_id)).deleted_count > 0
+        if deleted:
+            self._after_write([item_id])
+        return deleted
+
+    def update_many(self, updates: Dict[str, Category], chunk_size: int = 1000) -> Dict[str, str]:
+        item_ids = list(updates)
+        errors: Dict[str, str] = {}
+        for start in range(0, len(item_ids), chunk_size):
+            chunk = item_ids[start : start + chunk_size]
+            self.round_trips += 1
+            try:
+                self.collection.bulk_write(
+                    [
+                        UpdateOne(
+                            by_id(i), {"$set": updates[i].to_json(), "$inc": {VERSION_FIELD: 1}}
+                        )
+                        for i in chunk
+                    ],
+                    ordered=False,
+                )
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    errors[chunk[write_error["index"]]] = write_error.get("errmsg", str(e))
+        if len(errors) < len(item_ids):
+            self._after_write(item_ids)
+        return errors
+
+    def delete_many(self, item_ids: List[str]) -> int:
+        self.round_trips += 1
+        deleted = self.collection.delete_many(by_ids(item_ids)).deleted_count
+        if deleted:
+            self._after_write(item_ids)
+        return deleted
+
+    def find_one_and_delete(
+        self, item_id: str, versions: Maybe[List[int]] = None
+    ) -> Maybe[Category]:
+        self.round_trips += 1
+        result = self.collection.find_one_and_delete({**by_id(item_id), **at_version(versions)})
+        if result is None:
+            return result
+        self._after_write([item_id])
+        return self.item_type.from_mongo(result)
 
     def delete_all(self) -> int:
-        return self.collection.delete_many({}).deleted_count
+        self.round_trips += 1
+        deleted = self.collection.delete_many({}).deleted_count
+        if deleted:
+            self._after_write(None)
+        return deleted
 
     def get_today_events(self) -> List[Category]:
-        today = date.today()
-        result = self.collection.find({"month": today.strftime("%m"), "day": today.strftime("%d")})
+        return list(self.iter_today_events())
+
+    def iter_today_events(
+        self, batch_size: int = 100, fields: Maybe[List[str]] = None
+    ) -> Iterator[Category]:
+        return self._iter(by_day(date.today()), batch_size, fields)
+
+    def claim_tag_cascade(
+        self, owner: str, stale_before: datetime, skip_ids: List[str] = []
+    ) -> Maybe[TagCascade]:
+        self.round_trips += 1
+        result = self.collection.find_one_and_update(
+            by_claimable_cascade(stale_before, skip_ids),
+            {
+                "$set": {"owner": owner, "heartbeat_at": datetime.now(), "status": RUNNING},
+                "$inc": {VERSION_FIELD: 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
         if result is None:
-            return []
-        return [self.item_type.from_mongo(event) for event in result]
+            return None
+        self._after_write([str(result["_id"])])
+        return TagCascade.from_mongo(result)
 
     def cascade_tag_delete(self, tag_name: str) -> None:
-        self.collection.update_many(
-            filter={"tags": {"$in": [tag_name]}}, update={"$pullAll": {"tags": [tag_name]}}
+        self.round_trips += 1
+        result = self.collection.update_many(
+            filter=by_any_tag([tag_name]),
+            update={"$pullAll": {"tags": [tag_name]}, "$inc": {VERSION_FIELD: 1}},
         )
+        if result.modified_count:
+            self._after_write(None)
 
     def cascade_tag_update(self, old_tag_name: str, new_tag_name: str) -> None:
-        self.collection.update_many(
-            filter={"tags": {"$in": [old_tag_name]}},
-            update={"$set": {"tags.$[elem]": new_tag_name}},
+        self.round_trips += 1
+        result = self.collection.update_many(
+            filter=by_any_tag([old_tag_name]),
+            update={"$set": {"tags.$[elem]": new_tag_name}, "$inc": {VERSION_FIELD: 1}},
             array_filters=[{"elem": {"$eq": old_tag_name}}],
         )
+        if result.modified_count:
+            self._after_write(None)
 
     def add_log(self, user: str, level: LogLevel, message: str, details: JsonData = {}) -> None:
+        self.round_trips += 1
         self.collection.insert_one(
             {
                 "created_at": datetime.now(),
@@ -117,11 +804,28 @@ class MongoConnector(BaseConnector):
             }
         )
 
+    def add_logs(self, logs: List[Union[Log, RawBSONDocument]]) -> int:
+        if not logs:
+            return 0
+        self.round_trips += 1
+        # The log writer hands over records that it already encoded, which are sent as they are
+        records = [log if isinstance(log, RawBSONDocument) else log.to_json() for log in logs]
+        # Any record that can't be inserted raises, so reaching here means all of them were
+        self.collection.insert_many(records, ordered=False)
+        return len(records)
+
     def get_logs(self, users: List[str] = [], levels: List[str] = []) -> List[Log]:
-        search_filter = {}
-        if users:
-            search_filter["user"] = {"$in": users}
-        if levels:
-            search_filter["level"] = {"$in": levels}
-        results = self.collection.find(search_filter)
-        return [Log.from_mongo(log) for log in results]
+        return list(self.iter_logs(users, levels))
+
+    def iter_logs(
+        self,
+        users: List[str] = [],
+        levels: List[str] = [],
+        batch_size: int = 100,
+        fields: Maybe[List[str]] = None,
+    ) -> Iterator[Log]:
+        return self._iter(by_log_filters(users, levels), batch_size, fields)
+
+    def delete_logs(self, users: List[str] = [], levels: List[str] = []) -> int:
+        self.round_trips += 1
+        return self.collection.delete_many(by_log_filters(users, levels)).deleted_count
@@ -1,20 +1,68 @@
-from ..connectors.mongo import MongoConnector
+import os
+
 from ..categories.api_keys import ApiKey
-from .custom_types import Maybe
+from .caches import LruCache
+from .custom_types import JsonData, Maybe
 from .exceptions import UnauthorizedError
+from .session import connector_for
+
+# Keys that matched the datastore, so that repeat visitors don't cost a trip to it
+valid_keys = LruCache(
+    max_size=int(os.getenv("API_KEY_CACHE_SIZE", 1024)),
+    ttl_seconds=float(os.getenv("API_KEY_CACHE_TTL_SECONDS", 300)),
+)
+# Keys that didn't, kept briefly and in a small cache of their own so that bad keys can
+# never push valid ones out.  This only helps when the same bad key is sent again -- a
+# flood of distinct bad keys still costs one datastore lookup per key.
+unknown_keys = LruCache(
+    max_size=int(os.getenv("API_KEY_NEGATIVE_CACHE_SIZE", 256)),
+    ttl_seconds=float(os.getenv("API_KEY_NEGATIVE_TTL_SECONDS", 5)),
+)
 
 
 def validate_key(key: Maybe[str]) -> Maybe[ApiKey]:
     """
     Validates the API key provided to make sure it exists in the DB
+    Results are cached (see `valid_keys`/`unknown_keys`), so call `forget_keys()`
+    after rotating or deleting keys.  Unknown keys are only remembered for a few seconds,
+    and distinct unknown keys are each looked up once, so this is no defense against a
+    flood of random keys.
     TODO:  This needs to stop using the MongoConnector explicitly
     :param key: The API key value passed by the API user as an x-api-key header
     :return: The created ApiKey object if it matches the datastore, otherwise None
     """
     if not key:
         raise UnauthorizedError()
-    with MongoConnector(ApiKey, is_test=False) as db:
+    api_key = valid_keys.get(key)
+    if api_key is not None:
+        return api_key
+    if unknown_keys.get(key, False):
+        raise UnauthorizedError()
+    with connector_for(ApiKey, is_test=False) as db:
         api_key = db.find_api_key(key)
         if not api_key:
+            unknown_keys.put(key, True)
             raise UnauthorizedError()
+    valid_keys.put(key, api_key)
     return api_key
+
+
+def forget_keys(*keys: str) -> None:
+    """
+    Drop API keys from the cache -- use this when keys are rotated or deleted
+    :param keys: The key values to forget.  If none are given, every cached key is dropped
+    :return: N/A
+    """
+    if not keys:
+        valid_keys.clear()
+        unknown_keys.clear()
+    for key in keys:
+        valid_keys.invalidate(key)
+        unknown_keys.invalidate(key)
+
+
+def key_cache_stats() -> JsonData:
+    """
+    :return: Hit/miss counters for the valid and unknown API key caches
+    """
+    return {"valid": valid_keys.stats(), "unknown": unknown_keys.stats()}
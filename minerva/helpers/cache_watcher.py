@@ -0,0 +1,238 @@
+import os
+import atexit
+import threading
+
+from typing import Callable, Dict
+from pymongo.change_stream import ChangeStream
+from pymongo.errors import OperationFailure, PyMongoError
+
+from ..categories.api_keys import ApiKey
+from ..categories.dates import Date
+from ..categories.employments import Employment
+from ..categories.housings import Housing
+from ..categories.links import Link
+from ..categories.logins import Login
+from ..categories.notes import Note
+from ..categories.recipes import Recipe
+from ..categories.tags import Tag
+from ..connectors.mongo import VERSIONS_COLLECTION, collection_name, mongo_url, pooled_client
+from .authorization import forget_keys
+from .caches import item_cache, tag_cache
+from .custom_types import JsonData, Maybe
+
+# How the watcher finds out about changes
+AUTO = "auto"  # Change streams if the server supports them, otherwise polling
+CHANGE_STREAM = "change_stream"
+POLL = "poll"
+
+# The Category types whose records a worker may cache.  Logs and tag cascades are never
+# cached, and are written far too often to send every one of those writes to every worker.
+WATCHED_TYPES = [ApiKey, Date, Employment, Housing, Link, Login, Note, Recipe, Tag]
+WATCHED_COLLECTIONS = [
+    collection_name(item_type, is_test) for item_type in WATCHED_TYPES for is_test in (False, True)
+]
+# The changes to a watched collection that can leave a cache stale
+WATCHED_OPERATIONS = ["insert", "update", "replace", "delete", "drop", "rename"]
+
+# The server errors that mean change streams aren't available (no replica set, too old)
+_NO_CHANGE_STREAMS = {40573, 40324}
+
+
+def invalidate_local_caches(coll_name: Maybe[str], item_id: Maybe[str] = None) -> None:
+    """
+    The default CacheWatcher listener -- drops whatever this process has cached from a
+    collection that was changed somewhere else
+    :param coll_name: The collection that changed, or None if anything may have changed
+    :param item_id: The record that changed, or None if any record in it may have changed
+    :return: N/A
+    """
+    if item_cache is not None:
+        if coll_name is None:
+            item_cache.clear()
+        else:
+            item_cache.invalidate(coll_name, None if item_id is None else [item_id])
+    if coll_name is None or coll_name in (collection_name(Tag, False), collection_name(Tag, True)):
+        tag_cache.invalidate()
+    if coll_name is None or coll_name in (
+        collection_name(ApiKey, False),
+        collection_name(ApiKey, True),
+    ):
+        forget_keys()
+
+
+def change_filter() -> JsonData:
+    """
+    :return: The `$match` filter for the change events that a CacheWatcher acts on
+    """
+    return {
+        "$or": [
+            {
+                "ns.coll": {"$in": WATCHED_COLLECTIONS},
+                "operationType": {"$in": WATCHED_OPERATIONS},
+            },
+            # These have no collection, and mean that anything may have changed
+            {"operationType": {"$in": ["dropDatabase", "invalidate"]}},
+        ]
+    }
+
+
+class CacheWatcher:
+    """
+    Watches the datastore from a background thread and tells a listener about every change,
+    so that the in-process caches of every worker stay in step with writes made by other
+    workers, or by anything else (`clean_unit_tests.py`, a mongo shell, etc.).
+    Change streams name the exact record that changed, but need a replica set.  Without one,
+    the watcher falls back to polling the collection change counters and drops whole
+    collections -- only writes made through a MongoConnector bump those counters, though.
+    Whenever the watcher loses track (an error, a dropped database), everything is dropped.
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[Maybe[str], Maybe[str]], None] = invalidate_local_caches,
+        mode: str = AUTO,
+        poll_interval_ms: int = 1000,
+    ) -> None:
+        if mode not in (AUTO, CHANGE_STREAM, POLL):
+            raise ValueError(f"Unknown cache watcher mode '{mode}'")
+        self.on_change = on_change
+        self.mode = mode
+        self.poll_interval = poll_interval_ms / 1000
+        self.running_mode: Maybe[str] = None  # Which of the two is actually in use
+        self.changes = 0  # Changes passed on to the listener
+        self.resyncs = 0  # Times everything was dropped because changes may have been missed
+        self.errors = 0  # Datastore errors while watching
+        self._stopping = threading.Event()
+        self._thread: Maybe[threading.Thread] = None
+        self._pid: Maybe[int] = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        """
+        Start watching, if this process isn't already.  Safe to call on every request, so
+        it's used as a `before_request` handler -- it must not return anything.
+        :return: N/A
+        """
+        # Threads don't survive a fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="minerva-cache-watcher", daemon=True
+                )
+                self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stop watching
+        :param timeout: How long to wait on the background thread, in seconds
+        :return: N/A
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        self._stopping.set()
+        if thread is not None and self._pid == os.getpid():
+            thread.join(timeout)
+
+    def stats(self) -> JsonData:
+        """
+        :return: The mode in use and the watcher's counters
+        """
+        return {
+            "mode": self.running_mode,
+            "changes": self.changes,
+            "resyncs": self.resyncs,
+            "errors": self.errors,
+        }
+
+    def _run(self) -> None:
+        mode = self.mode
+        while not self._stopping.is_set():
+            try:
+                if mode == POLL:
+                    self._poll()
+                else:
+                    self._watch()
+            except OperationFailure as e:
+                if mode == AUTO and e.code in _NO_CHANGE_STREAMS:
+                    mode = POLL
+                    continue
+                self.errors += 1
+            except PyMongoError:
+                self.errors += 1
+            if self._stopping.wait(self.poll_interval):
+                return
+            # Anything could have changed while the watcher wasn't looking
+            self._resync()
+
+    def _watch(self) -> None:
+        with self._open_stream() as stream:
+            self.running_mode = CHANGE_STREAM
+            while not self._stopping.is_set():
+                change = stream.try_next()
+                if change is not None:
+                    self._dispatch(change)
+
+    def _poll(self) -> None:
+        versions = self._read_versions()
+        self.running_mode = POLL
+        while not self._stopping.wait(self.poll_interval):
+            latest = self._read_versions()
+            for coll_name, version in latest.items():
+                if versions.get(coll_name) != version:
+                    self._notify(coll_name, None)
+            versions = latest
+
+    def _dispatch(self, change: JsonData) -> None:
+        operation = change["operationType"]
+        coll_name = change.get("ns", {}).get("coll")
+        if operation in ("insert", "update", "replace", "delete"):
+            self._notify(coll_name, str(change["documentKey"]["_id"]))
+        elif operation in ("drop", "rename"):
+            self._notify(coll_name, None)
+        elif operation in ("dropDatabase", "invalidate"):
+            self._resync()
+
+    def _notify(self, coll_name: str, item_id: Maybe[str]) -> None:
+        self.changes += 1
+        self.on_change(coll_name, item_id)
+
+    def _resync(self) -> None:
+        self.resyncs += 1
+        self.on_change(None, None)
+
+    def _open_stream(self) -> ChangeStream:
+        # Filtered on the server, so unwatched writes (logs, cascade heartbeats, the change
+        # counters) never reach a worker at all
+        pipeline = [{"$match": change_filter()}]
+        max_await_time_ms = int(self.poll_interval * 1000)
+        return pooled_client(mongo_url()).minerva.watch(
+            pipeline, max_await_time_ms=max_await_time_ms
+        )
+
+    def _read_versions(self) -> Dict[str, int]:
+        db = pooled_client(mongo_url()).minerva
+        versions = db[VERSIONS_COLLECTION].find({"_id": {"$in": WATCHED_COLLECTIONS}})
+        return {record["_id"]: record["version"] for record in versions}
+
+
+def cache_watcher_from_env() -> Maybe[CacheWatcher]:
+    """
+    Build the CacheWatcher configured by the environment.  CACHE_WATCHER is one of "off"
+    (the default), "auto", "change_stream", or "poll".
+    :return: The CacheWatcher, or None if it's turned off
+    """
+    mode = os.getenv("CACHE_WATCHER", "off")
+    if mode == "off":
+        return None
+    return CacheWatcher(
+        mode=mode, poll_interval_ms=int(os.getenv("CACHE_WATCHER_POLL_INTERVAL_MS", 1000))
+    )
+
+
+cache_watcher = cache_watcher_from_env()
+if cache_watcher is not None:
+    atexit.register(cache_watcher.close)
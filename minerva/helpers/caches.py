@@ -0,0 +1,479 @@
+import os
+import socket
+import threading
+import time
+
+import bson
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Set, Tuple, Union
+
+from .custom_types import JsonData, Maybe
+
+
+class TagCache:
+    """
+    An in-process cache of every Tag name in the datastore, so that validating the tags
+    on a Category is a set membership test instead of a full scan of the tags collection.
+    The set is reloaded once it is older than the TTL, or after it has been invalidated.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._names: Maybe[Set[str]] = None
+        self._loaded_at: float = 0.0
+        self._lock = threading.Lock()
+
+    def names(self, load: Callable[[], Iterable[str]]) -> Set[str]:
+        """
+        Get the cached set of Tag names, reloading it first if it is stale
+        :param load: Called to read every Tag name from the datastore when a reload is needed
+        :return: The set of known Tag names
+        """
+        names = self._names
+        if names is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            with self._lock:
+                if self._names is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                    self._names = set(load())
+                    self._loaded_at = time.monotonic()
+                names = self._names
+        return names
+
+    def add(self, name: str) -> None:
+        """
+        Record a Tag name that was just created, without forcing a reload.  The set is
+        replaced rather than changed, since callers may still be reading the one they got.
+        :param name: The name of the new Tag
+        :return: N/A
+        """
+        with self._lock:
+            if self._names is not None and name not in self._names:
+                self._names = self._names | {name}
+
+    def invalidate(self) -> None:
+        """
+        Drop the cached names so that the next lookup reloads them from the datastore.
+        Call this whenever Tags are created, renamed, or deleted outside of validation.
+        :return: N/A
+        """
+        with self._lock:
+            self._names = None
+
+
+class LruCache:
+    """
+    A bounded, thread-safe key/value cache.  Entries expire after the TTL, and once the
+    cache is full the least recently used entry is evicted to make room.
+    Keeps hit/miss counters so that it's easy to tell whether the cache is earning its keep.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 300.0,
+        sizeof: Maybe[Callable[[Any], int]] = None,
+    ) -> None:
+        """
+        :param max_size: The most entries to hold at once
+        :param ttl_seconds: How long an entry may be served for after it was cached
+        :param sizeof: If given, used to keep a running total of the memory held by the values
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        :param key: The key to look up
+        :param default: What to return if the key isn't cached (or has expired)
+        :return: The cached value, or the default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+            self.misses += 1
+            return default
+
+    def get_many(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        """
+        :param keys: The keys to look up
+        :return: The cached value for each of the keys that is cached (and hasn't expired)
+        """
+        missing = object()
+        values = {key: self.get(key, missing) for key in keys}
+        return {key: value for key, value in values.items() if value is not missing}
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Cache a value, evicting the least recently used entry if the cache is full
+        :param key: The key to cache the value under
+        :param value: The value to cache
+        :return: N/A
+        """
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            if self.sizeof is not None:
+                self.bytes += self.sizeof(value)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def add(self, key: Hashable, value: Any) -> bool:
+        """
+        Cache a value, but only if the key isn't already cached
+        :param key: The key to cache the value under
+        :param value: The value to cache
+        :return: Whether the value was cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return False
+        self.put(key, value)
+        return True
+
+    def incr(self, key: Hashable) -> Maybe[int]:
+        """
+        Add one to a cached counter.  Counters are stored as ASCII digits, like memcached's.
+        :param key: The key of the counter
+        :return: The new value of the counter, or None if it isn't cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            value = str(int(entry[0]) + 1).encode()
+            if self.sizeof is not None:
+                self.bytes += self.sizeof(value) - self.sizeof(entry[0])
+            self._entries[key] = (value, entry[1])
+            return int(value)
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a single entry, if it is cached
+        :param key: The key to drop
+        :return: N/A
+        """
+        with self._lock:
+            self._drop(key)
+
+    def clear(self) -> None:
+        """
+        Drop every entry
+        :return: N/A
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> JsonData:
+        """
+        :return: The cache's hit/miss counters and current size
+        """
+        stats = {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+        if self.sizeof is not None:
+            stats["bytes"] = self.bytes
+        return stats
+
+    def _drop(self, key: Hashable) -> None:
+        # Only ever called with the lock held
+        entry = self._entries.pop(key, None)
+        if entry is not None and self.sizeof is not None:
+            self.bytes -= self.sizeof(entry[0])
+
+
+class MemcachedCache:
+    """
+    The same interface as the LruCache, but kept out-of-process by a memcached server (or
+    anything else that speaks its text protocol), so that every worker shares one cache.
+    Values must be bytes.  The cache is only ever an optimization, so if the server can't
+    be reached, lookups miss and writes are dropped -- both are counted in `errors`.
+    """
+
+    def __init__(self, address: str, ttl_seconds: float = 300.0, timeout: float = 0.5) -> None:
+        """
+        :param address: The server's "host:port"
+        :param ttl_seconds: How long an entry may be served for after it was cached
+        :param timeout: How long to wait on the server before giving up, in seconds
+        """
+        host, _, port = address.rpartition(":")
+        self.address = (host or "localhost", int(port))
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._sock: Maybe[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        :param key: The key to look up
+        :param default: What to return if the key isn't cached (or has expired)
+        :return: The cached value, or the default
+        """
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        :param keys: The keys to look up, all in a single trip
+        :return: The cached value for each of the keys that is cached (and hasn't expired)
+        """
+        values: Dict[str, bytes] = {}
+
+        def read(reader) -> None:
+            while True:
+                line = reader.readline().rstrip(b"\r\n")
+                if not line.startswith(b"VALUE "):
+                    return
+                _, key, _, length = line.split(b" ")[:4]
+                values[key.decode()] = reader.read(int(length) + 2)[:-2]
+
+        if self._command(f"get {' '.join(keys)}", read=read) is not None:
+            self.hits += len(values)
+            self.misses += len(keys) - len(values)
+        return values
+
+    def put(self, key: str, value: bytes) -> None:
+        """
+        Cache a value
+        :param key: The key to cache the value under
+        :param value: The value to cache
+        :return: N/A
+        """
+        self._store("set", key, value)
+
+    def add(self, key: str, value: bytes) -> bool:
+        """
+        Cache a value, but only if the key isn't already cached
+        :param key: The key to cache the value under
+        :param value: The value to cache
+        :return: Whether the value was cached
+        """
+        return self._store("add", key, value) == b"STORED"
+
+    def incr(self, key: str) -> Maybe[int]:
+        """
+        Add one to a cached counter
+        :param key: The key of the counter
+        :return: The new value of the counter, or None if it isn't cached
+        """
+        reply = self._command(f"incr {key} 1")
+        return int(reply) if reply and reply.isdigit() else None
+
+    def invalidate(self, key: str) -> None:
+        """
+        Drop a single entry, if it is cached
+        :param key: The key to drop
+        :return: N/A
+        """
+        self._command(f"delete {key}")
+
+    def stats(self) -> JsonData:
+        """
+        :return: This process's hit/miss/error counters, plus the server's size and memory use
+        """
+        server: Dict[str, bytes] = {}
+
+        def read(reader) -> None:
+            while True:
+                line = reader.readline().rstrip(b"\r\n")
+                if not line.startswith(b"STAT "):
+                    return
+                _, name, value = line.split(b" ", 2)
+                server[name.decode()] = value
+
+        self._command("stats", read=read)
+        stats = {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+        if "curr_items" in server:
+            stats["size"] = int(server["curr_items"])
+        if "bytes" in server:
+            stats["bytes"] = int(server["bytes"])
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the connection to the server.  The next command opens a new one.
+        :return: N/A
+        """
+        with self._lock:
+            self._close()
+
+    def _store(self, command: str, key: str, value: bytes) -> Maybe[bytes]:
+        # An expiry of 0 would mean "never", so always round up to at least a second
+        header = f"{command} {key} 0 {max(1, round(self.ttl_seconds))} {len(value)}"
+        return self._command(header, value)
+
+    def _command(
+        self, line: str, value: Maybe[bytes] = None, read: Maybe[Callable] = None
+    ) -> Maybe[bytes]:
+        # Sends a single command and reads its reply, reconnecting on the next command if
+        # anything goes wrong.  Returns None if the server couldn't be reached.
+        request = line.encode() + b"\r\n"
+        if value is not None:
+            request += value + b"\r\n"
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.address, timeout=self.timeout)
+                    self._reader = self._sock.makefile("rb")
+                self._sock.sendall(request)
+                if read is not None:
+                    read(self._reader)
+                    return b"END"
+                return self._reader.readline().rstrip(b"\r\n")
+            except OSError:
+                self.errors += 1
+                self._close()
+                return None
+
+    def _close(self) -> None:
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = None
+        self._reader = None
+
+
+class ItemCache:
+    """
+    A read-through cache of single stored records, in front of `find_one`.  Records are
+    kept BSON-encoded, so cached copies can't be changed by whoever reads them and the
+    backend (an LruCache or a MemcachedCache) always knows how much memory they take up.
+    Each entry is stamped with the collection's generation and the record's own version,
+    as they were when the lookup missed, and is only served while both still match.
+    Writes to a record bump its version rather than just dropping its entry, so a copy read
+    before the write but cached after it is never served.  Writes that can't name every
+    record they touch (tag cascades, deleting everything) bump the generation instead.
+    """
+
+    # Past this many records, bumping the generation is cheaper than dropping each entry
+    MAX_INVALIDATIONS = 16
+
+    def __init__(self, backend: Union[LruCache, MemcachedCache]) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.collections: Set[str] = set()  # Every collection looked up by this process
+
+    def get(self, collection: str, item_id: str) -> Tuple[Maybe[JsonData], Maybe[Tuple[int, int]]]:
+        """
+        Look up a cached record
+        :param collection: The name of the collection the record is stored in
+        :param item_id: The unique ID of the record
+        :return: The record (or None on a miss), and its stamp (the collection's generation
+                 and the record's version), which must be handed back to `put()` when
+                 caching the record after a miss
+        """
+        self.collections.add(collection)
+        generation_key = f"{collection}:generation"
+        version_key = f"{collection}:{item_id}:version"
+        key = f"{collection}:{item_id}"
+        values = self.backend.get_many([generation_key, version_key, key])
+        generation = self._counter(generation_key, values)
+        version = self._counter(version_key, values)
+        stamp = None if generation is None or version is None else (generation, version)
+        entry = bson.decode(values[key]) if key in values else None
+        if (
+            entry is not None
+            and stamp is not None
+            and (entry["generation"], entry.get("version")) == stamp
+        ):
+            self.hits += 1
+            return entry["record"], stamp
+        self.misses += 1
+        return None, stamp
+
+    def put(
+        self, collection: str, item_id: str, record: JsonData, stamp: Maybe[Tuple[int, int]]
+    ) -> None:
+        """
+        Cache a record that was just read from the datastore
+        :param collection: The name of the collection the record is stored in
+        :param item_id: The unique ID of the record
+        :param record: The full record, as stored
+        :param stamp: The stamp returned by the `get()` that missed
+        :return: N/A
+        """
+        if stamp is None:
+            return
+        generation, version = stamp
+        entry = bson.encode({"generation": generation, "version": version, "record": record})
+        self.backend.put(f"{collection}:{item_id}", entry)
+
+    def invalidate(self, collection: str, item_ids: Maybe[List[str]] = None) -> None:
+        """
+        Drop the cached copies of records that were just written
+        :param collection: The name of the collection the records are stored in
+        :param item_ids: The unique IDs of the records, or None if any record may have changed
+        :return: N/A
+        """
+        # If a counter isn't cached, the next lookup starts a fresh one anyway
+        if item_ids is None or len(item_ids) > self.MAX_INVALIDATIONS:
+            self.backend.incr(f"{collection}:generation")
+            return
+        for item_id in item_ids:
+            self.backend.incr(f"{collection}:{item_id}:version")
+
+    def clear(self) -> None:
+        """
+        Orphan every record this process has cached, in every collection
+        :return: N/A
+        """
+        for collection in list(self.collections):
+            self.invalidate(collection)
+
+    def _counter(self, key: str, values: Dict[str, bytes]) -> Maybe[int]:
+        # A generation or version, as read by `get()`, or a new one if it isn't cached
+        if key in values:
+            return int(values[key])
+        # Never reuse a value that earlier entries might still be cached under
+        value = time.time_ns()
+        return value if self.backend.add(key, str(value).encode()) else None
+
+    def stats(self) -> JsonData:
+        """
+        :return: The record hit/miss counters and hit rate, plus the backend's own stats
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "backend": self.backend.stats(),
+        }
+
+
+def item_cache_from_env() -> Maybe[ItemCache]:
+    """
+    Build the ItemCache configured by the environment.  ITEM_CACHE_BACKEND is one of
+    "memory" (the default), "memcached" (at ITEM_CACHE_URL), or "none" to turn it off.
+    :return: The ItemCache, or None if it's turned off
+    """
+    backend = os.getenv("ITEM_CACHE_BACKEND", "memory")
+    ttl_seconds = float(os.getenv("ITEM_CACHE_TTL_SECONDS", 60))
+    if backend == "none":
+        return None
+    if backend == "memory":
+        size = int(os.getenv("ITEM_CACHE_SIZE", 10000))
+        return ItemCache(LruCache(max_size=size, ttl_seconds=ttl_seconds, sizeof=len))
+    if backend == "memcached":
+        address = os.getenv("ITEM_CACHE_URL", "localhost:11211")
+        return ItemCache(MemcachedCache(address, ttl_seconds=ttl_seconds))
+    raise ValueError(f"Unknown item cache backend '{backend}'")
+
+
+tag_cache = TagCache(ttl_seconds=float(os.getenv("TAG_CACHE_TTL_SECONDS", 60)))
+item_cache = item_cache_from_env()
@@ -0,0 +1,140 @@
+import os
+import socket
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import List, Type
+
+from ..categories.category import Category
+from ..categories.tag_cascades import TagCascade, DELETE, DONE, FAILED
+from ..connectors.mongo import MongoConnector
+from .session import connector_for
+
+# Shared by every cascade -- each collection's share of a cascade runs on its own worker,
+# and all of them go through the same pooled MongoClient
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("CASCADE_WORKERS", 8)), thread_name_prefix="minerva-cascade"
+)
+# A RUNNING cascade whose worker hasn't reported progress for this long is taken to be
+# abandoned, and may be picked up by another worker
+CASCADE_LEASE_SECONDS = int(os.getenv("CASCADE_LEASE_SECONDS", 600))
+
+
+def worker_id() -> str:
+    """Helper function for naming this worker process as the owner of a cascade"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def start_tag_cascade(
+    action: str,
+    old_name: str,
+    new_name: str,
+    item_types: List[Type[Category]],
+    is_test: bool = False,
+    run_async: bool = False,
+) -> TagCascade:
+    """
+    Records a new tag cascade and runs it across every given Category type at once
+    :param action: DELETE or UPDATE
+    :param old_name: The name of the Tag being deleted or renamed
+    :param new_name: The new name of the Tag (renames only)
+    :param item_types: The Category types whose tags need the cascade
+    :param is_test: Whether this is being run during tests
+    :param run_async: Return as soon as the cascade is recorded, and run it in the background
+    :return: The cascade, which can be polled by its ID
+    """
+    cascade = TagCascade(
+        action=action,
+        old_name=old_name,
+        new_name=new_name,
+        pending=[item_type.__name__ for item_type in item_types],
+        failed=[],
+        owner=worker_id(),
+        heartbeat_at=datetime.now(),
+    )
+    with connector_for(TagCascade, is_test) as db:
+        cascade.id = db.create(cascade)
+    if run_async:
+        threading.Thread(
+            target=run_tag_cascade, args=(cascade, item_types, is_test), daemon=True
+        ).start()
+    else:
+        run_tag_cascade(cascade, item_types, is_test)
+    return cascade
+
+
+def run_tag_cascade(
+    cascade: TagCascade, item_types: List[Type[Category]], is_test: bool = False
+) -> TagCascade:
+    """
+    Runs every pending part of a cascade concurrently, recording each collection as it
+    finishes.  Both cascade operations are idempotent, so re-running a part is harmless.
+    :param cascade: The cascade to run
+    :param item_types: The Category types that may be pending
+    :param is_test: Whether this is being run during tests
+    :return: The finished cascade
+    """
+    types_by_name = {item_type.__name__: item_type for item_type in item_types}
+    lock = threading.Lock()
+
+    def cascade_one(type_name: str) -> None:
+        try:
+            with MongoConnector(types_by_name[type_name], is_test) as db:
+                if cascade.action == DELETE:
+                    db.cascade_tag_delete(cascade.old_name)
+                else:
+                    db.cascade_tag_update(cascade.old_name, cascade.new_name)
+            succeeded = True
+        except Exception:
+            # Recorded on the cascade so that it can be retried with `resume_tag_cascades()`
+            succeeded = False
+        with lock:
+            cascade.pending = [name for name in cascade.pending if name != type_name]
+            if not succeeded:
+                cascade.failed = cascade.failed + [type_name]
+            save_cascade(cascade, is_test)
+
+    wait([_executor.submit(cascade_one, name) for name in cascade.pending])
+    cascade.status = FAILED if cascade.failed else DONE
+    if cascade.status == DONE:
+        cascade.finished_at = datetime.now()
+    save_cascade(cascade, is_test)
+    return cascade
+
+
+def save_cascade(cascade: TagCascade, is_test: bool = False) -> None:
+    """Helper function for recording a cascade's progress, which also renews its lease"""
+    cascade.heartbeat_at = datetime.now()
+    with MongoConnector(TagCascade, is_test) as db:
+        db.update_one(cascade.id, cascade)
+
+
+def resume_tag_cascades(
+    item_types: List[Type[Category]], is_test: bool = False
+) -> List[TagCascade]:
+    """
+    Picks up every cascade that had a collection fail, or whose worker stopped reporting
+    progress (see `CASCADE_LEASE_SECONDS`), and runs whatever is left of it.  Each one is
+    claimed first, so a cascade that another worker is still running is left alone, and
+    any number of workers can call this at once.
+    :param item_types: The Category types that may be pending
+    :param is_test: Whether this is being run during tests
+    :return: The cascades that were resumed
+    """
+    owner = worker_id()
+    resumed: List[TagCascade] = []
+    while True:
+        stale_before = datetime.now() - timedelta(seconds=CASCADE_LEASE_SECONDS)
+        with MongoConnector(TagCascade, is_test) as db:
+            # Skipping the ones already resumed keeps a cascade that fails again from
+            # being retried forever
+            cascade = db.claim_tag_cascade(
+                owner, stale_before, skip_ids=[done.id for done in resumed]
+            )
+        if cascade is None:
+            return resumed
+        cascade.pending = cascade.pending + cascade.failed
+        cascade.failed = []
+        run_tag_cascade(cascade, item_types, is_test)
+        resumed.append(cascade)
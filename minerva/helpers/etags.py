@@ -0,0 +1,78 @@
+import hashlib
+import threading
+
+from typing import Any, Dict, List
+
+from .custom_types import JsonData, Maybe
+
+
+def item_etag(item_id: str, version: int, fields: Maybe[List[str]] = None) -> str:
+    """
+    Build the (strong) ETag for a single stored object.  The version is readable back out
+    of it (see `etag_version()`), so that `If-Match` can be checked by the datastore itself.
+    :param item_id: The unique ID of the object
+    :param version: The object's version, which goes up on every write to it
+    :param fields: The fields that were asked for, if it was a projection
+    :return: The ETag, without quotes
+    """
+    etag = f"{item_id}.{version}"
+    if fields is not None:
+        etag += "." + hashlib.sha1(",".join(fields).encode()).hexdigest()[:12]
+    return etag
+
+
+def etag_version(etag: str, item_id: str) -> Maybe[int]:
+    """
+    Read the object version back out of an ETag built by `item_etag()`
+    :param etag: The ETag sent by the client, without quotes
+    :param item_id: The unique ID of the object the ETag should be for
+    :return: The version, or None if the ETag isn't one for this object
+    """
+    parts = etag.split(".")
+    if len(parts) < 2 or parts[0] != item_id:
+        return None
+    try:
+        return int(parts[1])
+    except ValueError:
+        return None
+
+
+def list_etag(version: int, *parts: Any) -> str:
+    """
+    Build the (strong) ETag for a list of stored objects
+    :param version: The collection's change counter, which goes up on every write to it
+    :param parts: Anything else the list depends on (query parameters, the date, etc.)
+    :return: The ETag, without quotes
+    """
+    return f"{version}." + hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+
+
+class NotModifiedCounter:
+    """
+    Keeps count of the `304 Not Modified` responses served, per endpoint, so that it's
+    easy to tell how much work conditional requests are saving
+    """
+
+    def __init__(self) -> None:
+        self.by_endpoint: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, endpoint: str) -> None:
+        """
+        Record a single 304 response
+        :param endpoint: The name of the endpoint that served it
+        :return: N/A
+        """
+        with self._lock:
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def stats(self) -> JsonData:
+        """
+        :return: The total number of 304s served, and the number per endpoint
+        """
+        with self._lock:
+            by_endpoint = dict(self.by_endpoint)
+        return {"total": sum(by_endpoint.values()), "by_endpoint": by_endpoint}
+
+
+not_modified_counter = NotModifiedCounter()
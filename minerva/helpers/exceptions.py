@@ -25,6 +25,11 @@ class NotFoundError(HttpError):
         super().__init__(message, code=404)
 
 
+class PreconditionFailedError(HttpError):
+    def __init__(self, message):
+        super().__init__(message, code=412)
+
+
 class InternalServerError(HttpError):
     def __init__(self, message):
         super().__init__(message, code=500)
@@ -0,0 +1,34 @@
+from typing import Dict, List, Type
+
+from ..categories.category import Category
+from .session import connector_for
+
+
+def ensure_indexes(categories: List[Type[Category]], is_test: bool = False) -> Dict[str, List[str]]:
+    """
+    Applies the `indexes()` manifest of every given Category to its collection.
+    Safe to run as often as you like -- existing indexes are left alone.
+    :param categories: The Category types to index
+    :param is_test: Whether to index the unit test collections instead
+    :return: The index names on each collection, keyed by collection name
+    """
+    applied = {}
+    for category in categories:
+        with connector_for(category, is_test) as db:
+            applied[category.collection()] = db.ensure_indexes()
+    return applied
+
+
+def find_unindexed_queries(categories: List[Type[Category]], is_test: bool = False) -> List[str]:
+    """
+    Reports every query the connectors run against the given Categories' collections that
+    would still be answered with a full collection scan
+    :param categories: The Category types to check
+    :param is_test: Whether to check the unit test collections instead
+    :return: A description of each query that scans its whole collection; can be empty
+    """
+    unindexed = []
+    for category in categories:
+        with connector_for(category, is_test) as db:
+            unindexed.extend(db.find_unindexed_queries())
+    return unindexed
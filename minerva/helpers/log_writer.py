@@ -0,0 +1,225 @@
+import os
+import atexit
+import threading
+import time
+
+from queue import Queue, Empty
+from typing import Callable, List
+
+import bson
+from bson import ObjectId
+from bson.errors import InvalidDocument
+from bson.raw_bson import RawBSONDocument
+
+from ..categories.logs import Log
+from ..connectors.mongo import MongoConnector
+from .custom_types import JsonData, Maybe
+
+# Overflow policies for when the queue is full
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+
+# Put on the queue to tell the background thread to flush and stop
+_STOP = object()
+
+
+def encode_log(log: Log) -> RawBSONDocument:
+    """
+    Helper function for encoding a Log record as it will be stored, exactly once.  Its size
+    is what the queue's byte limit counts, and the encoded record is what gets inserted, so
+    the background thread never has to encode it again.
+    """
+    return RawBSONDocument(bson.encode({"_id": ObjectId(), **log.to_json()}))
+
+
+def write_to_mongo(records: List[RawBSONDocument]) -> None:
+    """The default LogWriter sink -- one `insert_many` per batch"""
+    with MongoConnector(Log, is_test=False) as db:
+        db.add_logs(records)
+
+
+class LogWriter:
+    """
+    Buffers Log records in memory and writes them to the datastore in batches from a
+    background thread, so that logging never adds a datastore write to a request.
+    Records are queued already encoded (see `encode_log()`), and the sink gets them as is.
+    A batch is flushed once it is full or once `flush_interval_ms` has passed since its
+    first record.  The queue is bounded both by the number of records and by their
+    encoded size (records can carry whole response bodies as `details`) --
+    when either limit is hit, records are dropped according to the overflow policy and
+    counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[RawBSONDocument]], None] = write_to_mongo,
+        batch_size: int = 100,
+        flush_interval_ms: int = 500,
+        max_queue_size: int = 10000,
+        max_queue_bytes: int = 32 * 1024 * 1024,
+        overflow: str = DROP_NEWEST,
+    ) -> None:
+        if overflow not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy '{overflow}'")
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self.overflow = overflow
+        self.flushed = 0  # Records written to the sink
+        self.dropped = 0  # Records thrown away because the queue was full
+        self.failed = 0  # Records lost because they couldn't be encoded or the sink raised
+        # Holds (encoded record, its size) pairs, plus the stop marker
+        self._queue: Queue = Queue(maxsize=max_queue_size)
+        self._queued_bytes = 0
+        self._thread: Maybe[threading.Thread] = None
+        self._pid: Maybe[int] = None
+        self._lock = threading.Lock()
+
+    def write(self, log: Log) -> None:
+        """
+        Queue up a single Log record to be written.  Never blocks.
+        :param log: The Log record
+        :return: N/A
+        """
+        self._ensure_started()
+        try:
+            record = encode_log(log)
+        except (InvalidDocument, TypeError):
+            # It could never be stored, and would fail the rest of its batch with it
+            self._count("failed", 1)
+            return
+        size = len(record.raw)
+        with self._lock:
+            if size > self.max_queue_bytes:
+                # Would never fit, however much else was dropped to make room
+                self.dropped += 1
+                return
+            # Only writers add to the queue, and they all hold the lock, so it can only
+            # get emptier while this runs
+            while self._queue.full() or self._queued_bytes + size > self.max_queue_bytes:
+                if self.overflow == DROP_NEWEST or not self._drop_oldest():
+                    self.dropped += 1
+                    return
+            self._queue.put_nowait((record, size))
+            self._queued_bytes += size
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Flush everything that is still queued and stop the background thread
+        :param timeout: How long to wait on the background thread, in seconds
+        :return: N/A
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        # Anything left over (or queued without a running thread) gets written here
+        self._flush(self._drain())
+
+    def stats(self) -> JsonData:
+        """
+        :return: The writer's counters, plus the number of records waiting to be written
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "queued_bytes": self._queued_bytes,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _ensure_started(self) -> None:
+        # Threads don't survive a fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="minerva-log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _drop_oldest(self) -> bool:
+        # Called with the lock held; False if there was nothing that could be dropped
+        try:
+            entry = self._queue.get_nowait()
+        except Empty:
+            return False
+        if entry is _STOP:
+            self._queue.put_nowait(entry)
+            return False
+        self._queued_bytes -= entry[1]
+        self.dropped += 1
+        return True
+
+    def _take(self, entry) -> RawBSONDocument:
+        # Every record taken off the queue frees up its share of the byte limit
+        record, size = entry
+        with self._lock:
+            self._queued_bytes -= size
+        return record
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except Empty:
+                continue
+            if first is _STOP:
+                return
+            batch = [self._take(first)]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(self._take(entry))
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _drain(self) -> List[RawBSONDocument]:
+        records = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except Empty:
+                return records
+            if entry is not _STOP:
+                records.append(self._take(entry))
+
+    def _flush(self, batch: List[RawBSONDocument]) -> None:
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start : start + self.batch_size]
+            try:
+                self.sink(chunk)
+                self._count("flushed", len(chunk))
+            except Exception:
+                # There's nowhere left to log a logging failure -- just keep count of it
+                self._count("failed", len(chunk))
+
+    def _count(self, counter: str, amount: int) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+
+log_writer = LogWriter(
+    batch_size=int(os.getenv("LOG_BATCH_SIZE", 100)),
+    flush_interval_ms=int(os.getenv("LOG_FLUSH_INTERVAL_MS", 500)),
+    max_queue_size=int(os.getenv("LOG_QUEUE_SIZE", 10000)),
+    max_queue_bytes=int(os.getenv("LOG_QUEUE_BYTES", 32 * 1024 * 1024)),
+    overflow=os.getenv("LOG_OVERFLOW_POLICY", DROP_NEWEST),
+)
+atexit.register(log_writer.close)
@@ -1,9 +1,12 @@
+from datetime import datetime
+
 from .custom_types import JsonData, Maybe, LogLevel
-from ..connectors.mongo import MongoConnector
 from ..categories.logs import Log
+from .log_writer import log_writer
 
 """
-TODO:  These functions need to stop using the MongoConnector explicitly!
+Log records are handed off to the background `log_writer`, which writes them in batches.
+Nothing here waits on the datastore.
 """
 
 
@@ -11,26 +14,33 @@ def base_msg(request, message: str):
     return f"{request.method} {str(request.url_rule)} -- {message}"
 
 
+def write_log(request, user: str, level: LogLevel, message: str, details: Maybe[JsonData]):
+    log_writer.write(
+        Log(
+            created_at=datetime.now(),
+            user=user,
+            level=str(level),
+            message=base_msg(request, message),
+            details=details or {},
+        )
+    )
+
+
 def fatal(request, user: str, message: str, details: Maybe[JsonData] = None):
-    with MongoConnector(Log, is_test=False) as logger:
-        logger.add_log(user, LogLevel.Fatal, base_msg(request, message), details or {})
+    write_log(request, user, LogLevel.Fatal, message, details)
 
 
 def error(request, user: str, message: str, details: Maybe[JsonData] = None):
-    with MongoConnector(Log, is_test=False) as logger:
-        logger.add_log(user, LogLevel.Error, base_msg(request, message), details or {})
+    write_log(request, user, LogLevel.Error, message, details)
 
 
 def warn(request, user: str, message: str, details: Maybe[JsonData] = None):
-    with MongoConnector(Log, is_test=False) as logger:
-        logger.add_log(user, LogLevel.Warn, base_msg(request, message), details or {})
+    write_log(request, user, LogLevel.Warn, message, details)
 
 
 def info(request, user: str, message: str, details: Maybe[JsonData] = None):
-    with MongoConnector(Log, is_test=False) as logger:
-        logger.add_log(user, LogLevel.Info, base_msg(request, message), details or {})
+    write_log(request, user, LogLevel.Info, message, details)
 
 
 def debug(request, user: str, message: str, details: Maybe[JsonData] = None):
-    with MongoConnector(Log, is_test=False) as logger:
-        logger.add_log(user, LogLevel.Debug, base_msg(request, message), details or {})
+    write_log(request, user, LogLevel.Debug, message, details)
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Tuple, Type
+
+from flask import g, has_request_context
+
+from ..categories.category import Category
+from ..connectors.base_connector import BaseConnector
+from ..connectors.mongo import MongoConnector
+from .custom_types import JsonData, Maybe
+
+
+class DataSession:
+    """
+    A request-scoped "unit of work" for the datastore.  Each collection touched during
+    a request gets a single connector that is opened on first use, shared by everything
+    (auth, the CRUD operation, hooks, logging) for the rest of the request, and then
+    closed when the request is torn down.
+    Also remembers what each object serialized to, so that the response body and the log
+    details for the same object only serialize it once (see `serialize()`).
+    """
+
+    def __init__(self) -> None:
+        self.connectors: Dict[Tuple[Type[Category], bool], BaseConnector] = {}
+        # id(object) -> (object, its response body), holding on to the object so the id stays unique
+        self.serialized: Dict[int, Tuple[Any, JsonData]] = {}
+
+    def connector(self, item_type: Type[Category], is_test: bool = False) -> BaseConnector:
+        """
+        Get the open connector for the given Category type, opening it if needed
+        :param item_type: The type of "Category" object
+        :param is_test: Whether or not this is being used during tests
+        :return: The connector, already entered
+        """
+        key = (item_type, is_test)
+        if key not in self.connectors:
+            self.connectors[key] = MongoConnector(item_type, is_test=is_test).__enter__()
+        return self.connectors[key]
+
+    @property
+    def round_trips(self) -> int:
+        """
+        :return: The number of datastore round trips made during this session so far
+        """
+        return sum(db.round_trips for db in self.connectors.values())
+
+    def close(self) -> None:
+        """
+        Close every connector that was opened during the session
+        :return: N/A
+        """
+        for db in self.connectors.values():
+            db.__exit__(None, None, None)
+        self.connectors = {}
+        self.serialized = {}
+
+
+def open_session() -> None:
+    """
+    Start the DataSession for the current request.  Used as a `before_request` handler,
+    so this must not return anything (Flask would treat it as the response)
+    :return: N/A
+    """
+    g.data_session = DataSession()
+
+
+def close_session(exc=None) -> None:
+    """
+    Close the DataSession for the current request, if one was opened.
+    Used as a `teardown_request` handler
+    :param exc: IGNORED
+    :return: N/A
+    """
+    session = g.pop("data_session", None)
+    if session is not None:
+        session.close()
+
+
+def current_session() -> Maybe[DataSession]:
+    """
+    :return: The DataSession for the current request, or None when outside of one
+    """
+    if not has_request_context():
+        return None
+    return g.get("data_session", None)
+
+
+@contextmanager
+def connector_for(item_type: Type[Category], is_test: bool = False) -> Iterator[BaseConnector]:
+    """
+    Drop-in replacement for `with MongoConnector(...) as db:`.  Inside of a request this
+    reuses the request's DataSession; outside of one it falls back to a standalone connector.
+    :param item_type: The type of "Category" object
+    :param is_test: Whether or not this is being used during tests
+    :return: An open connector for the Category type
+    """
+    session = current_session()
+    if session is not None:
+        yield session.connector(item_type, is_test)
+    else:
+        with MongoConnector(item_type, is_test=is_test) as db:
+            yield db
+
+
+def serialize(item: Any) -> JsonData:
+    """
+    Drop-in replacement for `item.to_response()` that serializes each object at most once per
+    request.  Only use it for objects that aren't changed again during the request -- and
+    don't change the returned dictionary, since it's shared.
+    :param item: The Category (or Partial) object
+    :return: The object's API representation
+    """
+    session = current_session()
+    if session is None:
+        return item.to_response()
+    memo = session.serialized.get(id(item))
+    if memo is None:
+        memo = session.serialized[id(item)] = (item, item.to_response())
+    return memo[1]
@@ -1,6 +1,33 @@
+import threading
+
+from contextlib import contextmanager
+from typing import Iterator, Set
+
+from pymongo.errors import DuplicateKeyError
+
 from ..categories.tags import Tag
-from ..connectors.mongo import MongoConnector
+from .caches import tag_cache
 from .exceptions import BadRequestError
+from .session import connector_for
+
+# Holds the set of missing Tag names while tag creation is being deferred on this thread
+_deferred = threading.local()
+
+
+@contextmanager
+def defer_tag_creation() -> Iterator[Set[str]]:
+    """
+    While this is open, `validate_tag_list` collects the names of any missing Tags into
+    the yielded set instead of creating them one at a time.  Used by bulk endpoints so
+    that a whole batch of items can create all of its Tags in a single upsert.
+    :return: The set of missing Tag names, filled in as items are validated
+    """
+    missing: Set[str] = set()
+    _deferred.missing = missing
+    try:
+        yield missing
+    finally:
+        _deferred.missing = None
 
 
 def validate_tag_list(instance, attr, value) -> None:
@@ -8,17 +35,33 @@ def validate_tag_list(instance, attr, value) -> None:
     This is a helper function for making sure that when you add a Tag to a Category
     record, a matching Tag object is created in the datastore.  Also performs
     basic type validation.  This is a method as defined by `attr` for "Validators".
+    Known Tag names come from the in-process `tag_cache`, so only a Tag that is
+    actually missing costs a trip to the datastore.
     :param instance: IGNORED
     :param attr: IGNORED
     :param value: The value to be validated.  Should be a list of strings
     :return: N/A
     """
     if isinstance(value, list):
-        with MongoConnector(Tag) as db:
-            all_tags = [tag.name for tag in db.find_all_no_limit() if isinstance(tag, Tag)]
+        if not value:
+            return
+        with connector_for(Tag) as db:
+            # Only the names are read, and no Tag objects are built
+            all_tags = tag_cache.names(
+                lambda: (tag["name"] for tag in db.iter_all(fields=["name"], raw=True))
+            )
+            missing = getattr(_deferred, "missing", None)
             for tag in value:
                 if tag not in all_tags:
-                    db.create(Tag.from_request({"name": tag}))
+                    if missing is not None:
+                        missing.add(tag)
+                        continue
+                    try:
+                        db.create(Tag.from_request({"name": tag}))
+                    except DuplicateKeyError:
+                        # Another request created it after our cache was loaded
+                        pass
+                    tag_cache.add(tag)
     else:
         raise BadRequestError(f"Expected a list of strings but got [{value.__class__.__name__}]")
 
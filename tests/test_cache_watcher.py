@@ -0,0 +1,97 @@
+import time
+import unittest
+from contextlib import contextmanager
+
+from pymongo.errors import OperationFailure
+
+from minerva import STORED_TYPES
+from minerva.categories.logs import Log
+from minerva.categories.tag_cascades import TagCascade
+from minerva.helpers.cache_watcher import (
+    CacheWatcher,
+    change_filter,
+    invalidate_local_caches,
+    POLL,
+    WATCHED_TYPES,
+)
+from minerva.helpers.caches import tag_cache
+
+
+class FakeStream:
+    def __init__(self, changes):
+        self.changes = list(changes)
+
+    def try_next(self):
+        if self.changes:
+            return self.changes.pop(0)
+        time.sleep(0.01)
+        return None
+
+
+class CacheWatcherTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.seen = []
+
+    def listener(self, coll_name, item_id):
+        self.seen.append((coll_name, item_id))
+
+    def wait_for(self, count: int) -> None:
+        for _ in range(100):
+            if len(self.seen) >= count:
+                return
+            time.sleep(0.01)
+
+    def test_change_stream_names_the_record(self):
+        changes = [
+            {"operationType": "update", "ns": {"coll": "notes"}, "documentKey": {"_id": "1"}},
+            {"operationType": "drop", "ns": {"coll": "links"}},
+        ]
+        watcher = CacheWatcher(on_change=self.listener, poll_interval_ms=10)
+        watcher._open_stream = contextmanager(lambda: iter([FakeStream(changes)]))
+        watcher.ensure_started()
+        self.wait_for(2)
+        watcher.close()
+        self.assertEqual(self.seen, [("notes", "1"), ("links", None)], f"Got {self.seen}")
+        self.assertEqual(watcher.stats()["mode"], "change_stream", f"Got {watcher.stats()}")
+
+    def test_falls_back_to_polling_without_a_replica_set(self):
+        versions = iter([{"notes": 1, "links": 1}, {"notes": 2, "links": 1}])
+
+        def open_stream():
+            raise OperationFailure("not a replica set", code=40573)
+
+        watcher = CacheWatcher(on_change=self.listener, poll_interval_ms=10)
+        watcher._open_stream = open_stream
+        watcher._read_versions = lambda: next(versions, {"notes": 2, "links": 1})
+        watcher.ensure_started()
+        self.wait_for(1)
+        watcher.close()
+        self.assertEqual(self.seen, [("notes", None)], "Expected only notes to change")
+        self.assertEqual(watcher.stats()["mode"], POLL, f"Got {watcher.stats()}")
+
+    def test_errors_drop_everything(self):
+        def open_stream():
+            raise OperationFailure("connection lost", code=6)
+
+        watcher = CacheWatcher(on_change=self.listener, poll_interval_ms=10)
+        watcher._open_stream = open_stream
+        watcher.ensure_started()
+        self.wait_for(1)
+        watcher.close()
+        self.assertIn((None, None), self.seen, f"Expected a resync -- {self.seen}")
+        self.assertGreater(watcher.errors, 0, "Expected the error to be counted")
+
+    def test_tag_changes_drop_the_tag_cache(self):
+        tag_cache.names(lambda: ["First"])
+        invalidate_local_caches("tags", "1")
+        self.assertEqual(tag_cache.names(lambda: ["Second"]), {"Second"}, "Expected a reload")
+
+    def test_change_filter_skips_uncached_collections(self):
+        watched = change_filter()["$or"][0]["ns.coll"]["$in"]
+        self.assertIn("unittest_notes", watched, f"Expected test collections too -- {watched}")
+        self.assertNotIn("access_logs", watched, "Expected log writes to be filtered out")
+        self.assertNotIn("tag_cascades", watched, "Expected cascade progress to be filtered out")
+
+    def test_every_cached_type_is_watched(self):
+        unwatched = set(STORED_TYPES) - set(WATCHED_TYPES) - {Log, TagCascade}
+        self.assertEqual(unwatched, set(), f"Expected these to be watched -- {unwatched}")
@@ -0,0 +1,252 @@
+import socketserver
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from bson import ObjectId
+
+from minerva.categories.api_keys import ApiKey
+from minerva.helpers import authorization
+from minerva.helpers.caches import TagCache, LruCache, MemcachedCache, ItemCache
+from minerva.helpers.exceptions import UnauthorizedError
+
+
+class TagCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = TagCache(ttl_seconds=60)
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return ["First", "Second"]
+
+    def test_names_loaded_once(self):
+        self.cache.names(self.load)
+        names = self.cache.names(self.load)
+        self.assertEqual(names, {"First", "Second"}, f"Unexpected tag names -- {names}")
+        self.assertEqual(self.loads, 1, f"Expected a single load, but loaded {self.loads} times")
+
+    def test_add_skips_reload(self):
+        self.cache.names(self.load)
+        self.cache.add("Third")
+        names = self.cache.names(self.load)
+        self.assertIn("Third", names, f"Expected the added tag to be cached -- {names}")
+        self.assertEqual(self.loads, 1, f"Expected a single load, but loaded {self.loads} times")
+
+    def test_add_leaves_returned_names_alone(self):
+        names = self.cache.names(self.load)
+        self.cache.add("Third")
+        self.assertNotIn("Third", names, "Expected a set already handed out to stay as it was")
+        self.assertIn("Third", self.cache.names(self.load), "Expected the added tag to be cached")
+
+    def test_invalidate_forces_reload(self):
+        self.cache.names(self.load)
+        self.cache.invalidate()
+        self.cache.names(self.load)
+        self.assertEqual(self.loads, 2, f"Expected a reload after invalidating -- {self.loads}")
+
+    def test_expired_names_reload(self):
+        with mock.patch("minerva.helpers.caches.time.monotonic", return_value=1000.0):
+            self.cache.names(self.load)
+        with mock.patch("minerva.helpers.caches.time.monotonic", return_value=1061.0):
+            self.cache.names(self.load)
+        self.assertEqual(self.loads, 2, f"Expected a reload after the TTL -- {self.loads}")
+
+
+class LruCacheTests(unittest.TestCase):
+    def test_get_counts_hits_and_misses(self):
+        cache = LruCache(max_size=2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1, "Expected the cached value back")
+        self.assertIsNone(cache.get("b"), "Expected nothing for an uncached key")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1), f"Unexpected stats -- {stats}")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LruCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"), "Expected the least recently used entry to be evicted")
+        self.assertEqual(cache.get("a"), 1, "Expected the recently used entry to survive")
+
+    def test_expired_entries_miss(self):
+        cache = LruCache(ttl_seconds=10)
+        with mock.patch("minerva.helpers.caches.time.monotonic", return_value=1000.0):
+            cache.put("a", 1)
+        with mock.patch("minerva.helpers.caches.time.monotonic", return_value=1011.0):
+            self.assertIsNone(cache.get("a"), "Expected the entry to have expired")
+
+    def test_sizeof_tracks_memory(self):
+        cache = LruCache(max_size=2, sizeof=len)
+        cache.put("a", b"12345")
+        cache.put("b", b"123")
+        cache.put("a", b"1")
+        self.assertEqual(cache.stats()["bytes"], 4, f"Unexpected stats -- {cache.stats()}")
+        cache.put("c", b"12")
+        self.assertEqual(cache.stats()["bytes"], 3, "Expected the evicted entry to be uncounted")
+
+
+class StandInMemcached(socketserver.StreamRequestHandler):
+    """Just enough of memcached's text protocol to serve a MemcachedCache"""
+
+    def handle(self):
+        values = self.server.values
+        while True:
+            line = self.rfile.readline().split()
+            if not line:
+                return
+            command, args = line[0], [arg.decode() for arg in line[1:]]
+            if command in (b"set", b"add"):
+                value = self.rfile.read(int(args[3]) + 2)[:-2]
+                if command == b"add" and args[0] in values:
+                    self.wfile.write(b"NOT_STORED\r\n")
+                    continue
+                values[args[0]] = value
+                self.wfile.write(b"STORED\r\n")
+            elif command == b"get":
+                for key in args:
+                    if key in values:
+                        value = values[key]
+                        self.wfile.write(f"VALUE {key} 0 {len(value)}\r\n".encode())
+                        self.wfile.write(value + b"\r\n")
+                self.wfile.write(b"END\r\n")
+            elif command == b"incr":
+                if args[0] not in values:
+                    self.wfile.write(b"NOT_FOUND\r\n")
+                    continue
+                values[args[0]] = str(int(values[args[0]]) + int(args[1])).encode()
+                self.wfile.write(values[args[0]] + b"\r\n")
+            elif command == b"delete":
+                self.wfile.write(b"DELETED\r\n" if values.pop(args[0], None) else b"NOT_FOUND\r\n")
+            elif command == b"stats":
+                size = sum(len(value) for value in values.values())
+                self.wfile.write(f"STAT curr_items {len(values)}\r\n".encode())
+                self.wfile.write(f"STAT bytes {size}\r\nEND\r\n".encode())
+
+
+class ItemCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = ItemCache(LruCache(sizeof=len))
+        self.record = {"_id": ObjectId(), "contents": "Cached", "tags": ["First"], "_v": 1}
+
+    def cached(self, item_id: str = "1"):
+        record, stamp = self.cache.get("notes", item_id)
+        if record is None:
+            self.cache.put("notes", item_id, self.record, stamp)
+        return record
+
+    def test_record_is_cached_after_a_miss(self):
+        self.assertIsNone(self.cached(), "Expected the first lookup to miss")
+        self.assertEqual(self.cached(), self.record, "Expected the record to be cached")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hit_rate"], 0.5, f"Unexpected stats -- {stats}")
+        self.assertGreater(stats["backend"]["bytes"], 0, f"Expected memory use -- {stats}")
+
+    def test_invalidate_drops_the_record(self):
+        self.cached()
+        self.cache.invalidate("notes", ["1"])
+        self.assertIsNone(self.cached(), "Expected the record to have been dropped")
+
+    def test_record_read_before_a_write_is_not_cached_after_it(self):
+        # The lookup misses and reads the record, then a write lands before it is cached
+        record, stamp = self.cache.get("notes", "1")
+        self.assertIsNone(record, "Expected the first lookup to miss")
+        self.cache.invalidate("notes", ["1"])
+        self.cache.put("notes", "1", self.record, stamp)
+        self.assertIsNone(self.cached(), "Expected the stale record not to be served")
+        self.assertEqual(self.cached(), self.record, "Expected the record to be cached again")
+
+    def test_invalidate_everything_bumps_the_generation(self):
+        self.cached("1")
+        self.cached("2")
+        self.cache.invalidate("notes")
+        self.assertIsNone(self.cached("1"), "Expected every record to have been orphaned")
+        self.assertIsNone(self.cached("2"), "Expected every record to have been orphaned")
+        self.assertIsNotNone(self.cached("1"), "Expected the record to be cached again")
+
+    def test_lost_generation_orphans_records(self):
+        self.cached()
+        self.cache.backend.invalidate("notes:generation")
+        self.assertIsNone(self.cached(), "Expected a new generation after losing the old one")
+
+    def test_memcached_backend(self):
+        server = socketserver.ThreadingTCPServer(("localhost", 0), StandInMemcached)
+        server.daemon_threads = True
+        server.values = {}
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            host, port = server.server_address
+            self.cache = ItemCache(MemcachedCache(f"{host}:{port}"))
+            self.assertIsNone(self.cached(), "Expected the first lookup to miss")
+            self.assertEqual(self.cached(), self.record, "Expected the record to be cached")
+            self.cache.invalidate("notes", ["1"])
+            self.assertIsNone(self.cached(), "Expected the record to have been dropped")
+            self.cache.invalidate("notes")
+            self.assertIsNone(self.cached(), "Expected the record to have been orphaned")
+            stats = self.cache.stats()["backend"]
+            self.assertEqual(stats["errors"], 0, f"Unexpected errors -- {stats}")
+            self.assertGreater(stats["bytes"], 0, f"Expected the server's memory use -- {stats}")
+        finally:
+            self.cache.backend.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_unreachable_memcached_misses(self):
+        self.cache = ItemCache(MemcachedCache("localhost:1", timeout=0.1))
+        self.assertIsNone(self.cached(), "Expected the lookup to miss")
+        self.assertIsNone(self.cached(), "Expected nothing to have been cached")
+        self.assertGreater(self.cache.stats()["backend"]["errors"], 0, "Expected errors")
+
+
+class ApiKeyCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        authorization.forget_keys()
+        self.lookups = 0
+
+    def tearDown(self) -> None:
+        authorization.forget_keys()
+
+    @contextmanager
+    def fake_connector(self, item_type, is_test=False):
+        test = self
+
+        class FakeConnector:
+            def find_api_key(self, key):
+                test.lookups += 1
+                return ApiKey(key, "TEST_USER") if key == "good" else None
+
+        yield FakeConnector()
+
+    def test_valid_key_is_looked_up_once(self):
+        with mock.patch.object(authorization, "connector_for", self.fake_connector):
+            for _ in range(3):
+                api_key = authorization.validate_key("good")
+        self.assertEqual(api_key.user, "TEST_USER", f"Unexpected API key -- {api_key}")
+        self.assertEqual(self.lookups, 1, f"Expected a single lookup, but made {self.lookups}")
+
+    def test_unknown_key_is_looked_up_once(self):
+        with mock.patch.object(authorization, "connector_for", self.fake_connector):
+            for _ in range(3):
+                with self.assertRaises(UnauthorizedError):
+                    authorization.validate_key("bad")
+        self.assertEqual(self.lookups, 1, f"Expected a single lookup, but made {self.lookups}")
+
+    def test_forgotten_key_is_looked_up_again(self):
+        with mock.patch.object(authorization, "connector_for", self.fake_connector):
+            authorization.validate_key("good")
+            authorization.forget_keys("good")
+            authorization.validate_key("good")
+        self.assertEqual(self.lookups, 2, f"Expected a second lookup, but made {self.lookups}")
+
+    def test_unknown_keys_dont_push_out_valid_ones(self):
+        with mock.patch.object(authorization, "connector_for", self.fake_connector):
+            authorization.validate_key("good")
+            for i in range(authorization.unknown_keys.max_size * 2):
+                with self.assertRaises(UnauthorizedError):
+                    authorization.validate_key(f"bad-{i}")
+            self.lookups = 0
+            authorization.validate_key("good")
+        self.assertEqual(self.lookups, 0, "Expected the valid key to still be cached")
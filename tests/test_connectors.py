@@ -0,0 +1,54 @@
+import os
+import unittest
+from unittest import mock
+
+from minerva import MongoConnector
+from minerva.categories.notes import Note
+from minerva.categories.tags import Tag
+from minerva.connectors import mongo
+
+
+class PooledClientTests(unittest.TestCase):
+    """
+    These never touch the network -- pooled clients are built with `connect=False`
+    """
+
+    def tearDown(self) -> None:
+        mongo.close_pooled_clients()
+
+    def test_connectors_share_one_client(self):
+        with MongoConnector(Note, is_test=True) as notes_db:
+            with MongoConnector(Tag, is_test=True) as tags_db:
+                self.assertIs(
+                    notes_db.client, tags_db.client, "Expected pooled connectors to share a client"
+                )
+
+    def test_pooled_client_survives_exit(self):
+        with MongoConnector(Note, is_test=True) as db:
+            client = db.client
+        with MongoConnector(Note, is_test=True) as db:
+            self.assertIs(db.client, client, "Expected the pooled client to be reused")
+
+    def test_unpooled_connector_gets_own_client(self):
+        with MongoConnector(Note, is_test=True) as pooled_db:
+            with MongoConnector(Note, is_test=True, pooled=False) as own_db:
+                self.assertIsNot(
+                    pooled_db.client, own_db.client, "Expected a dedicated client when unpooled"
+                )
+
+    def test_forked_process_gets_new_client(self):
+        with MongoConnector(Note, is_test=True) as db:
+            parent_client = db.client
+        with mock.patch.object(mongo.os, "getpid", return_value=os.getpid() + 1):
+            with MongoConnector(Note, is_test=True) as db:
+                self.assertIsNot(
+                    db.client, parent_client, "Expected a forked process to build its own client"
+                )
+
+    def test_client_options_from_env(self):
+        with mock.patch.dict(
+            os.environ, {"MONGO_MAX_POOL_SIZE": "5", "MONGO_CONNECT_TIMEOUT_MS": "250"}
+        ):
+            options = mongo.client_options()
+        self.assertEqual(options.get("maxPoolSize"), 5, f"Unexpected options -- {options}")
+        self.assertEqual(options.get("connectTimeoutMS"), 250, f"Unexpected options -- {options}")
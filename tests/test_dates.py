@@ -2,6 +2,7 @@ from datetime import date
 
 from minerva import MongoConnector
 from minerva.categories.dates import Date
+from minerva.helpers.indexes import ensure_indexes, find_unindexed_queries
 from .test_categories_base import CategoriesTestsBase
 
 
@@ -303,4 +304,20 @@ class DatesTests(CategoriesTestsBase):
             f"Expected 'An Anniversary' for the name -- {response}",
         )
 
+    def test_today_and_tag_queries_are_indexed(self):
+        ensure_indexes([Date], is_test=True)
+        unindexed = find_unindexed_queries([Date], is_test=True)
+        self.assertEqual(unindexed, [], f"Expected no collection scans -- {unindexed}")
+
+    def test_unindexed_queries_are_reported(self):
+        ensure_indexes([Date], is_test=True)
+        with MongoConnector(Date, is_test=True) as db:
+            db.collection.drop_index([("month", 1), ("day", 1)])
+            try:
+                unindexed = db.find_unindexed_queries()
+            finally:
+                db.ensure_indexes()
+        self.assertEqual(len(unindexed), 1, f"Expected only the today query -- {unindexed}")
+        self.assertIn("'month'", unindexed[0], f"Expected the today query -- {unindexed}")
+
     # endregion
@@ -0,0 +1,56 @@
+import unittest
+
+from minerva.categories.addresses import Address
+from minerva.categories.employments import Employer, EMPLOYER_DECODER
+from minerva.categories.logins import Login, SecurityQuestion, LOGIN_DECODER
+from minerva.categories.notes import NOTE_DECODER
+from minerva.helpers.exceptions import BadRequestError
+
+ADDRESS = {
+    "number": "1",
+    "street": "Main St",
+    "city": "Springfield",
+    "state": "IL",
+    "zip_code": "1",
+}
+
+
+class RequestDecoderTests(unittest.TestCase):
+    def test_nested_objects_are_built(self):
+        employer = EMPLOYER_DECODER.decode({"name": "ACME", "address": ADDRESS, "phone": "5"})
+        self.assertIsInstance(employer, Employer, f"Unexpected object -- {employer}")
+        self.assertIsInstance(employer.address, Address, f"Unexpected address -- {employer}")
+        self.assertEqual(employer.address.extra, "", "Expected the missing 'extra' to be empty")
+
+    def test_nested_lists_are_built(self):
+        login = LOGIN_DECODER.decode(
+            {
+                "application": "App",
+                "username": "me",
+                "password": "pw",
+                "security_questions": [{"question": "Who?", "answer": "Me"}],
+            }
+        )
+        self.assertIsInstance(login, Login, f"Unexpected object -- {login}")
+        self.assertIsInstance(login.security_questions[0], SecurityQuestion, f"Got {login}")
+
+    def test_nested_fields_are_checked(self):
+        with self.assertRaises(BadRequestError):
+            EMPLOYER_DECODER.decode({"name": "ACME", "address": {"number": "1"}, "phone": "5"})
+        with self.assertRaises(BadRequestError):
+            LOGIN_DECODER.verify(
+                {"application": "App", "username": "me", "password": "pw", "security_questions": 1}
+            )
+
+    def test_unexpected_and_empty_fields(self):
+        with self.assertRaises(BadRequestError):
+            NOTE_DECODER.verify({"contents": "Note", "foo": "bar"})
+        with self.assertRaises(BadRequestError):
+            NOTE_DECODER.verify({"contents": ""})
+        with self.assertRaises(BadRequestError):
+            NOTE_DECODER.verify(["contents"])
+
+    def test_defaults_are_not_shared(self):
+        first = NOTE_DECODER.decode({"contents": "First"})
+        second = NOTE_DECODER.decode({"contents": "Second"})
+        self.assertIsNot(first.tags, second.tags, "Expected every note to get its own tag list")
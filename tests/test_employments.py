@@ -188,6 +188,26 @@ class EmploymentsTests(CategoriesTestsBase):
         title = self.assertFieldIn(response, field="title")
         self.assertEqual(title, "Senior Intern", f"Unexpected title '{title}'")
 
+    def test_get_all_employments_projected(self):
+        response = self.verify_response_code(
+            self.app.get("/api/v1/employments?fields=title,salary"), 200
+        )
+        employments = self.assertFieldIn(response, field="employments")
+        self.assertEqual(
+            set(employments[0]), {"_id", "title", "salary"}, f"Unexpected fields -- {response}"
+        )
+
+    def test_get_single_employment_projected_nested(self):
+        response = self.verify_response_code(
+            self.app.get(f"/api/v1/employments/{self.ids_to_cleanup[0]}?fields=employer"), 200
+        )
+        employer = self.assertFieldIn(response, field="employer")
+        self.assertEqual(employer["address"]["city"], "Nowhere", f"Unexpected employer {employer}")
+        self.assertNotIn("title", response, f"Expected only the employer -- {response}")
+
+    def test_get_employments_unknown_field(self):
+        self.verify_response_code(self.app.get("/api/v1/employments?fields=title,foo"), 400)
+
     def test_get_single_nonexistent_employment(self):
         self.verify_response_code(self.app.get("/api/v1/employments/5f0113731c990801cc5d3240"), 404)
 
@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime
+
+from minerva.categories.logs import Log
+from minerva.helpers.log_writer import LogWriter, DROP_OLDEST, encode_log
+
+
+def make_log(message: str) -> Log:
+    return Log(created_at=datetime.now(), user="TEST_USER", level="info", message=message)
+
+
+class LogWriterTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.batches = []
+
+    def sink(self, records):
+        self.batches.append([record["message"] for record in records])
+
+    def test_close_flushes_queued_logs(self):
+        writer = LogWriter(sink=self.sink, batch_size=10, flush_interval_ms=60000)
+        for i in range(3):
+            writer.write(make_log(str(i)))
+        writer.close()
+        self.assertEqual(self.batches, [["0", "1", "2"]], f"Unexpected batches -- {self.batches}")
+        self.assertEqual(writer.flushed, 3, f"Expected 3 flushed logs -- {writer.stats()}")
+
+    def test_full_batches_are_chunked(self):
+        writer = LogWriter(sink=self.sink, batch_size=2, flush_interval_ms=60000)
+        for i in range(5):
+            writer.write(make_log(str(i)))
+        writer.close()
+        self.assertTrue(
+            all(len(batch) <= 2 for batch in self.batches), f"Batch too big -- {self.batches}"
+        )
+        self.assertEqual(writer.flushed, 5, f"Expected 5 flushed logs -- {writer.stats()}")
+
+    def test_overflow_drops_newest(self):
+        writer = LogWriter(sink=self.sink, max_queue_size=2, flush_interval_ms=60000)
+        writer._ensure_started = lambda: None  # Keep the queue from draining
+        for i in range(4):
+            writer.write(make_log(str(i)))
+        writer.close()
+        self.assertEqual(writer.dropped, 2, f"Expected 2 dropped logs -- {writer.stats()}")
+        self.assertEqual(self.batches, [["0", "1"]], f"Unexpected batches -- {self.batches}")
+
+    def test_overflow_drops_oldest(self):
+        writer = LogWriter(
+            sink=self.sink, max_queue_size=2, flush_interval_ms=60000, overflow=DROP_OLDEST
+        )
+        writer._ensure_started = lambda: None  # Keep the queue from draining
+        for i in range(4):
+            writer.write(make_log(str(i)))
+        writer.close()
+        self.assertEqual(writer.dropped, 2, f"Expected 2 dropped logs -- {writer.stats()}")
+        self.assertEqual(self.batches, [["2", "3"]], f"Unexpected batches -- {self.batches}")
+
+    def test_overflow_by_size(self):
+        writer = LogWriter(sink=self.sink, flush_interval_ms=60000, overflow=DROP_OLDEST)
+        writer._ensure_started = lambda: None  # Keep the queue from draining
+        big = make_log("big")
+        big.details = {"body": "x" * 1000}
+        writer.max_queue_bytes = 2 * len(encode_log(big).raw)
+        for _ in range(3):
+            writer.write(big)
+        self.assertEqual(writer.dropped, 1, f"Expected 1 dropped log -- {writer.stats()}")
+        self.assertLessEqual(writer.stats()["queued_bytes"], writer.max_queue_bytes)
+        writer.close()
+        self.assertEqual(writer.stats()["queued_bytes"], 0, "Expected nothing left queued")
+
+    def test_sink_errors_are_counted(self):
+        def broken_sink(logs):
+            raise RuntimeError("datastore is down")
+
+        writer = LogWriter(sink=broken_sink, flush_interval_ms=60000)
+        writer.write(make_log("lost"))
+        writer.close()
+        self.assertEqual(writer.failed, 1, f"Expected 1 failed log -- {writer.stats()}")
+
+    def test_unencodable_logs_are_counted(self):
+        writer = LogWriter(sink=self.sink, flush_interval_ms=60000)
+        bad = make_log("bad")
+        bad.details = {"body": object()}
+        writer.write(bad)
+        writer.write(make_log("good"))
+        writer.close()
+        self.assertEqual(writer.failed, 1, f"Expected 1 failed log -- {writer.stats()}")
+        self.assertEqual(
+            self.batches, [["good"]], f"Expected the rest to be written -- {self.batches}"
+        )
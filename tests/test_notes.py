@@ -1,3 +1,5 @@
+import json
+
 from minerva import MongoConnector
 from minerva.categories.notes import Note
 from .test_categories_base import CategoriesTestsBase
@@ -52,6 +54,58 @@ class NotesTests(CategoriesTestsBase):
     def test_create_note_missing_body(self):
         self.verify_response_code(self.app.post("/api/v1/notes"), 400)
 
+    def test_bulk_create_notes(self):
+        response = self.verify_response_code(
+            self.app.post(
+                "/api/v1/notes/bulk",
+                json=[
+                    {"contents": "TEST_BULK_NOTE_1", "url": "", "tags": []},
+                    {"contents": "TEST_BULK_NOTE_2", "url": "", "tags": []},
+                ],
+            ),
+            201,
+        )
+        items = self.assertFieldIn(response, field="items")
+        self.ids_to_cleanup.extend(item["id"] for item in items)
+        self.assertEqual(len(items), 2, f"Expected an id for each note -- {response}")
+        self.assertItemExists(items[1]["id"], item_type=Note)
+
+    def test_bulk_create_notes_ndjson(self):
+        body = "\n".join(
+            json.dumps({"contents": f"TEST_BULK_NDJSON_{i}", "tags": []}) for i in range(3)
+        )
+        response = self.verify_response_code(
+            self.app.post(
+                "/api/v1/notes/bulk", data=body, headers={"Content-Type": "application/x-ndjson"}
+            ),
+            201,
+        )
+        items = self.assertFieldIn(response, field="items")
+        self.ids_to_cleanup.extend(item["id"] for item in items)
+        created = self.assertFieldIn(response, field="created")
+        self.assertEqual(created, 3, f"Expected 3 notes to be created -- {response}")
+
+    def test_bulk_create_notes_partial_errors(self):
+        response = self.verify_response_code(
+            self.app.post(
+                "/api/v1/notes/bulk",
+                json=[
+                    {"contents": "TEST_BULK_VALID_NOTE", "tags": []},
+                    {"url": "speedrun.com", "tags": []},  # Missing "contents"
+                ],
+            ),
+            207,
+        )
+        items = self.assertFieldIn(response, field="items")
+        self.assertIn("id", items[0], f"Expected the valid note to be created -- {response}")
+        self.ids_to_cleanup.append(items[0]["id"])
+        self.assertIn("error", items[1], f"Expected an error for the invalid note -- {response}")
+
+    def test_bulk_create_notes_not_a_list(self):
+        self.verify_response_code(
+            self.app.post("/api/v1/notes/bulk", json={"contents": "Not a list", "tags": []}), 400
+        )
+
     # endregion
 
     # region Read
@@ -60,11 +114,87 @@ class NotesTests(CategoriesTestsBase):
         notes = self.assertFieldIn(response, field="notes")
         self.assertEqual(len(notes), 2, f"Expected 2 notes in response -- {response}")
 
+    def test_get_all_notes_served_as_stored(self):
+        with MongoConnector(Note, is_test=True) as db:
+            # Stored before `url` and `tags` existed, so it has neither (nor a version)
+            old_id = db.collection.insert_one({"contents": "Old Note"}).inserted_id
+            self.ids_to_cleanup.append(str(old_id))
+        response = self.verify_response_code(self.app.get("/api/v1/notes?all=1"), 200)
+        notes = self.assertFieldIn(response, field="notes")
+        self.assertEqual(len(notes), 3, f"Expected 3 notes in response -- {response}")
+        for note in notes:
+            single = self.verify_response_code(self.app.get(f"/api/v1/notes/{note['_id']}"), 200)
+            self.assertEqual(note, single, "Expected the same note as a single GET returns")
+
     def test_get_all_notes_paginated(self):
         response = self.verify_response_code(self.app.get("/api/v1/notes?page=2&count=1"), 200)
         notes = self.assertFieldIn(response, field="notes")
         self.assertEqual(len(notes), 1, f"Expected just 1 note in response -- {response}")
 
+    def test_get_all_notes_total_and_next(self):
+        response = self.app.get("/api/v1/notes?page=1&count=1&fields=contents")
+        body = self.verify_response_code(response, 200)
+        total = self.assertFieldIn(body, field="total")
+        self.assertEqual(total, 2, f"Expected a total of 2 notes -- {body}")
+        next_url = self.assertFieldIn(body, field="next")
+        self.assertIn("page=2", next_url, f"Expected a link to the second page -- {body}")
+        self.assertIn("fields=contents", next_url, f"Expected the fields to be kept -- {body}")
+        round_trips = response.headers.get("X-Round-Trips")
+        # The collection's change counter (for the ETag), then one query for the page and total
+        self.assertEqual(round_trips, "2", f"Expected a single query, but made {round_trips}")
+        body = self.verify_response_code(self.app.get(next_url), 200)
+        notes = self.assertFieldIn(body, field="notes")
+        self.assertEqual(len(notes), 1, f"Expected just 1 note on the second page -- {body}")
+        self.assertIsNone(body["next"], f"Expected no link after the last page -- {body}")
+
+    def test_get_all_notes_estimated_total(self):
+        response = self.verify_response_code(self.app.get("/api/v1/notes?estimate=1"), 200)
+        total = self.assertFieldIn(response, field="total")
+        self.assertEqual(total, 2, f"Expected a total of 2 notes -- {response}")
+
+    def test_get_all_notes_invalid_page(self):
+        self.verify_response_code(self.app.get("/api/v1/notes?page=0"), 400)
+
+    def test_get_all_notes_cursor_paginated(self):
+        response = self.verify_response_code(self.app.get("/api/v1/notes?after=&count=1"), 200)
+        notes = self.assertFieldIn(response, field="notes")
+        self.assertEqual(len(notes), 1, f"Expected just 1 note in response -- {response}")
+        cursor = self.assertFieldIn(response, field="next")
+        self.assertIsNotNone(cursor, f"Expected a cursor for the next page -- {response}")
+        response = self.verify_response_code(
+            self.app.get(f"/api/v1/notes?after={cursor}&count=1"), 200
+        )
+        next_notes = self.assertFieldIn(response, field="notes")
+        self.assertEqual(len(next_notes), 1, f"Expected just 1 note in response -- {response}")
+        self.assertNotEqual(notes[0]["_id"], next_notes[0]["_id"], "Expected a different note")
+        cursor = self.assertFieldIn(response, field="next")
+        self.assertIsNone(cursor, f"Expected no cursor on the last page -- {response}")
+
+    def test_get_all_notes_invalid_cursor(self):
+        self.verify_response_code(self.app.get("/api/v1/notes?after=not-a-cursor"), 400)
+
+    def test_get_all_notes_streamed(self):
+        response = self.app.get("/api/v1/notes?all=1", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 200, f"Unexpected status {response.status_code}")
+        self.assertEqual(response.mimetype, "application/x-ndjson", "Expected an NDJSON stream")
+        notes = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(len(notes), 2, f"Expected 2 notes in the stream -- {notes}")
+        self.assertIn("contents", notes[0], f"Expected full notes in the stream -- {notes}")
+
+    def test_iter_notes_projected(self):
+        with MongoConnector(Note, is_test=True) as db:
+            notes = db.iter_all(batch_size=1, fields=["contents"])
+            self.assertNotIsInstance(notes, list, "Expected the notes to be read lazily")
+            contents = [note.values for note in notes]
+        self.assertEqual(
+            contents, [{"contents": "First Note"}, {"contents": "Second Note"}], f"Got {contents}"
+        )
+
+    def test_iter_notes_counts_the_query_when_issued(self):
+        with MongoConnector(Note, is_test=True) as db:
+            db.iter_all()
+            self.assertEqual(db.round_trips, 1, "Expected the query to count before it is read")
+
     def test_get_single_note(self):
         response = self.verify_response_code(
             self.app.get(f"/api/v1/notes/{self.ids_to_cleanup[0]}"), 200
@@ -72,9 +202,78 @@ class NotesTests(CategoriesTestsBase):
         contents = self.assertFieldIn(response, field="contents")
         self.assertEqual(contents, "First Note", f"Unexpected contents '{contents}'")
 
+    def test_get_single_note_projected(self):
+        response = self.verify_response_code(
+            self.app.get(f"/api/v1/notes/{self.ids_to_cleanup[0]}?fields=contents"), 200
+        )
+        self.assertEqual(set(response), {"_id", "contents"}, f"Unexpected fields -- {response}")
+
+    def test_get_single_note_round_trips(self):
+        response = self.app.get(f"/api/v1/notes/{self.ids_to_cleanup[0]}")
+        self.verify_response_code(response, 200)
+        round_trips = response.headers.get("X-Round-Trips")
+        # Logging happens in the background, so only the lookup counts
+        self.assertEqual(round_trips, "1", f"Expected a single lookup, but made {round_trips}")
+
+    def test_get_single_note_not_modified(self):
+        response = self.app.get(f"/api/v1/notes/{self.ids_to_cleanup[0]}")
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag, "Expected an ETag on the response")
+        before = self.verify_response_code(self.app.get("/api/v1/stats"), 200)
+        response = self.app.get(
+            f"/api/v1/notes/{self.ids_to_cleanup[0]}", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304, f"Expected a 304 -- {response.status_code}")
+        # The first GET cached the note, so its version is known without asking the datastore
+        self.assertEqual(response.headers.get("X-Round-Trips"), "0", "Expected a cached lookup")
+        after = self.verify_response_code(self.app.get("/api/v1/stats"), 200)
+        served = after["not_modified"]["total"] - before["not_modified"]["total"]
+        self.assertEqual(served, 1, f"Expected the 304 to be counted -- {after}")
+
+    def test_get_all_notes_not_modified_until_written(self):
+        etag = self.app.get("/api/v1/notes").headers.get("ETag")
+        response = self.app.get("/api/v1/notes", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304, f"Expected a 304 -- {response.status_code}")
+        self.verify_response_code(
+            self.app.put(
+                f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"contents": "New", "tags": []}
+            ),
+            200,
+        )
+        response = self.app.get("/api/v1/notes", headers={"If-None-Match": etag})
+        self.verify_response_code(response, 200)
+
+    def test_get_all_notes_not_modified_until_replaced(self):
+        etag = self.app.get("/api/v1/notes").headers.get("ETag")
+        # The same number of notes, all at the same versions, but not the same notes
+        self.verify_response_code(self.app.delete(f"/api/v1/notes/{self.ids_to_cleanup[0]}"), 204)
+        with MongoConnector(Note, is_test=True) as db:
+            self.ids_to_cleanup.append(db.create(Note.from_request({"contents": "Replacement"})))
+        response = self.app.get("/api/v1/notes", headers={"If-None-Match": etag})
+        self.verify_response_code(response, 200)
+
+    def test_get_single_note_cached_until_written(self):
+        item_id = self.ids_to_cleanup[0]
+        self.app.get(f"/api/v1/notes/{item_id}")
+        response = self.app.get(f"/api/v1/notes/{item_id}?fields=contents")
+        self.assertEqual(response.headers.get("X-Round-Trips"), "0", "Expected a cached lookup")
+        self.verify_response_code(
+            self.app.put(f"/api/v1/notes/{item_id}", json={"contents": "New", "tags": []}), 200
+        )
+        response = self.app.get(f"/api/v1/notes/{item_id}")
+        contents = self.assertFieldIn(self.verify_response_code(response, 200), field="contents")
+        self.assertEqual(contents, "New", "Expected the update to drop the cached note")
+        self.assertEqual(response.headers.get("X-Round-Trips"), "1", "Expected a fresh lookup")
+
     def test_get_single_nonexistent_note(self):
         self.verify_response_code(self.app.get("/api/v1/notes/5f0113731c990801cc5d3240"), 404)
 
+    def test_get_single_nonexistent_note_round_trips(self):
+        response = self.app.get("/api/v1/notes/5f0113731c990801cc5d3240")
+        self.verify_response_code(response, 404)
+        round_trips = response.headers.get("X-Round-Trips")
+        self.assertEqual(round_trips, "1", f"Expected a single lookup, but made {round_trips}")
+
     # endregion
 
     # region Update
@@ -137,6 +336,123 @@ class NotesTests(CategoriesTestsBase):
         url = self.assertFieldIn(response, field="url")
         self.assertEqual(url, "", f"Expected 'url' field to be empty but it was '{url}'")
 
+    def test_update_note_round_trips(self):
+        response = self.app.put(
+            f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"contents": "One trip", "tags": []}
+        )
+        self.verify_response_code(response, 200)
+        round_trips = response.headers.get("X-Round-Trips")
+        # The update itself, then the collection's change counter (for list ETags)
+        self.assertEqual(round_trips, "2", f"Expected two writes, but made {round_trips}")
+
+    def test_update_note_if_match(self):
+        etag = self.app.get(f"/api/v1/notes/{self.ids_to_cleanup[0]}").headers.get("ETag")
+        self.verify_response_code(
+            self.app.put(
+                f"/api/v1/notes/{self.ids_to_cleanup[0]}",
+                json={"contents": "First write", "tags": []},
+                headers={"If-Match": etag},
+            ),
+            200,
+        )
+        # The ETag is now stale, so the second write must be refused
+        self.verify_response_code(
+            self.app.put(
+                f"/api/v1/notes/{self.ids_to_cleanup[0]}",
+                json={"contents": "Second write", "tags": []},
+                headers={"If-Match": etag},
+            ),
+            412,
+        )
+        note = self.assertItemExists(self.ids_to_cleanup[0], item_type=Note)
+        self.assertEqual(note.contents, "First write", f"Unexpected contents '{note.contents}'")
+
+    def test_update_nonexistent_note(self):
+        self.verify_response_code(
+            self.app.put(
+                "/api/v1/notes/5f0113731c990801cc5d3240", json={"contents": "Missing", "tags": []}
+            ),
+            404,
+        )
+
+    def test_patch_note(self):
+        response = self.app.patch(
+            f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"url": "patched.com"}
+        )
+        body = self.verify_response_code(response, 200)
+        url = self.assertFieldIn(body, field="url")
+        self.assertEqual(url, "patched.com", "'url' field did not update correctly")
+        contents = self.assertFieldIn(body, field="contents")
+        self.assertEqual(contents, "First Note", "'contents' was changed but shouldn't have been")
+        round_trips = response.headers.get("X-Round-Trips")
+        # The update itself, then the collection's change counter (for list ETags)
+        self.assertEqual(round_trips, "2", f"Expected two writes, but made {round_trips}")
+
+    def test_patch_note_extra_field(self):
+        self.verify_response_code(
+            self.app.patch(f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"foo": "bar"}), 400
+        )
+
+    def test_patch_note_empty_required_field(self):
+        self.verify_response_code(
+            self.app.patch(f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"contents": ""}), 400
+        )
+
+    def test_patch_note_add_to_non_list_field(self):
+        self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/notes/{self.ids_to_cleanup[0]}", json={"$add": {"url": ["a.com"]}}
+            ),
+            400,
+        )
+
+    def test_patch_nonexistent_note(self):
+        self.verify_response_code(
+            self.app.patch("/api/v1/notes/5f0113731c990801cc5d3240", json={"url": "missing.com"}),
+            404,
+        )
+
+    def test_bulk_update_notes(self):
+        response = self.verify_response_code(
+            self.app.put(
+                "/api/v1/notes/bulk",
+                json={
+                    self.ids_to_cleanup[0]: {"contents": "Bulk First", "tags": []},
+                    self.ids_to_cleanup[1]: {"contents": "Bulk Second", "tags": []},
+                },
+            ),
+            200,
+        )
+        updated = self.assertFieldIn(response, field="updated")
+        self.assertEqual(updated, 2, f"Expected both notes to be updated -- {response}")
+        note = self.assertItemExists(self.ids_to_cleanup[1], item_type=Note)
+        self.assertEqual(note.contents, "Bulk Second", f"Unexpected contents '{note.contents}'")
+
+    def test_bulk_update_notes_round_trips(self):
+        response = self.app.put(
+            "/api/v1/notes/bulk",
+            json={item_id: {"contents": "Bulk", "tags": []} for item_id in self.ids_to_cleanup},
+        )
+        self.verify_response_code(response, 200)
+        round_trips = response.headers.get("X-Round-Trips")
+        # A read, a write, and the collection's change counter (for list ETags)
+        self.assertEqual(round_trips, "3", f"Expected a read and two writes, made {round_trips}")
+
+    def test_bulk_update_nonexistent_note(self):
+        response = self.verify_response_code(
+            self.app.put(
+                "/api/v1/notes/bulk",
+                json={
+                    self.ids_to_cleanup[0]: {"contents": "Bulk First", "tags": []},
+                    "5f0113731c990801cc5d3240": {"contents": "Missing", "tags": []},
+                },
+            ),
+            207,
+        )
+        items = self.assertFieldIn(response, field="items")
+        self.assertIn("error", items["5f0113731c990801cc5d3240"], f"Expected an error -- {items}")
+        self.assertEqual(items[self.ids_to_cleanup[0]]["contents"], "Bulk First")
+
     # endregion
 
     # region Delete
@@ -149,6 +465,43 @@ class NotesTests(CategoriesTestsBase):
         response = self.verify_response_code(self.app.delete(f"/api/v1/notes/{new_id}"), 204)
         self.assertEqual(response, {}, f"Expected empty response -- {response}")
 
+    def test_bulk_delete_notes(self):
+        response = self.verify_response_code(
+            self.app.delete(
+                "/api/v1/notes/bulk", json=self.ids_to_cleanup + ["5f0113731c990801cc5d3240"]
+            ),
+            207,
+        )
+        deleted = self.assertFieldIn(response, field="deleted")
+        self.assertEqual(deleted, 2, f"Expected both notes to be deleted -- {response}")
+        items = self.assertFieldIn(response, field="items")
+        self.assertIn("error", items["5f0113731c990801cc5d3240"], f"Expected an error -- {items}")
+        with MongoConnector(Note, is_test=True) as db:
+            remaining = db.find_many(self.ids_to_cleanup)
+        self.assertEqual(remaining, [], f"Expected the notes to be gone -- {remaining}")
+
+    def test_bulk_delete_notes_not_a_list(self):
+        self.verify_response_code(
+            self.app.delete("/api/v1/notes/bulk", json={"id": self.ids_to_cleanup[0]}), 400
+        )
+
+    def test_delete_note_round_trips(self):
+        response = self.app.delete(f"/api/v1/notes/{self.ids_to_cleanup[0]}")
+        self.verify_response_code(response, 204)
+        round_trips = response.headers.get("X-Round-Trips")
+        # The delete itself, then the collection's change counter (for list ETags)
+        self.assertEqual(round_trips, "2", f"Expected two writes, but made {round_trips}")
+
+    def test_delete_note_if_match_stale(self):
+        self.verify_response_code(
+            self.app.delete(
+                f"/api/v1/notes/{self.ids_to_cleanup[0]}",
+                headers={"If-Match": f'"{self.ids_to_cleanup[0]}.41"'},
+            ),
+            412,
+        )
+        self.assertItemExists(self.ids_to_cleanup[0], item_type=Note)
+
     def test_delete_nonexistent_note(self):
         self.verify_response_code(self.app.delete("/api/v1/notes/5f0113731c990801cc5d3240"), 404)
 
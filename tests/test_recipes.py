@@ -237,3 +237,95 @@ class RecipesTests(CategoriesTestsBase):
         self.verify_response_code(self.app.delete("/api/v1/recipes/5f0113731c990801cc5d3240"), 404)
 
     # endregion
+
+
+class RecipePatchTests(CategoriesTestsBase):
+    def setUp(self) -> None:
+        self.item_type = Recipe
+        super().setUp()
+        test_recipes = [
+            {
+                "name": "Creme Fraiche",
+                "ingredients": [
+                    {"amount": "1/2", "item": "creme"},
+                    {"amount": "1/2", "item": "fraiche"},
+                ],
+                "instructions": ["combine", "serve"],
+                "recipe_type": RecipeType.Dessert,
+                "url": "google.com",
+                "source": "South Park",
+                "notes": ["CREME", "FRAICHE"],
+                "tags": [],
+            },
+            {
+                "name": "Scalloped Potatoes",
+                "ingredients": [{"amount": "3", "item": "potatoes"}],
+                "instructions": ["scallop", "eat"],
+                "recipe_type": RecipeType.SideDish,
+                "url": "google.com",
+                "source": "The Almighty",
+                "notes": [],
+                "tags": [],
+            },
+        ]
+        with MongoConnector(Recipe, is_test=True) as db:
+            for recipe in test_recipes:
+                self.ids_to_cleanup.append(db.create(Recipe.from_request(recipe)))
+
+    def test_patch_recipe_notes(self):
+        response = self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/recipes/{self.ids_to_cleanup[0]}",
+                json={"$add": {"notes": ["SOUTH PARK", "CREME"]}, "$remove": {"tags": ["Old"]}},
+            ),
+            200,
+        )
+        notes = self.assertFieldIn(response, field="notes")
+        self.assertEqual(notes, ["CREME", "FRAICHE", "SOUTH PARK"], f"Unexpected notes -- {notes}")
+        recipe = self.assertItemExists(self.ids_to_cleanup[0], item_type=Recipe)
+        self.assertEqual(recipe.notes, notes, f"Expected the patch to be stored -- {recipe}")
+        self.assertEqual(len(recipe.ingredients), 2, "Ingredients should not have changed")
+
+    def test_patch_recipe_add_repeated_note(self):
+        response = self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/recipes/{self.ids_to_cleanup[1]}",
+                json={"$add": {"notes": ["crispy", "crispy"]}},
+            ),
+            200,
+        )
+        notes = self.assertFieldIn(response, field="notes")
+        self.assertEqual(notes, ["crispy"], f"Expected the note to be added once -- {notes}")
+        recipe = self.assertItemExists(self.ids_to_cleanup[1], item_type=Recipe)
+        self.assertEqual(recipe.notes, notes, f"Expected the patch to be stored -- {recipe}")
+
+    def test_patch_recipe_ingredients(self):
+        response = self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/recipes/{self.ids_to_cleanup[1]}",
+                json={"ingredients": [{"amount": "2", "item": "potatoes"}]},
+            ),
+            200,
+        )
+        ingredients = self.assertFieldIn(response, field="ingredients")
+        self.assertEqual(ingredients, [{"amount": "2", "item": "potatoes"}])
+        name = self.assertFieldIn(response, field="name")
+        self.assertEqual(name, "Scalloped Potatoes", "'name' was changed but shouldn't have been")
+
+    def test_patch_recipe_add_and_remove_same_field(self):
+        self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/recipes/{self.ids_to_cleanup[0]}",
+                json={"$add": {"notes": ["SOUTH PARK"]}, "$remove": {"notes": ["CREME"]}},
+            ),
+            400,
+        )
+
+    def test_patch_recipe_bad_ingredient(self):
+        self.verify_response_code(
+            self.app.patch(
+                f"/api/v1/recipes/{self.ids_to_cleanup[1]}",
+                json={"ingredients": [{"item": "potatoes"}]},
+            ),
+            400,
+        )
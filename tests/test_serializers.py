@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from minerva.categories.addresses import Address
+from minerva.categories.employments import Employment
+from minerva.categories.logs import Log
+from minerva.categories.recipes import Recipe, RecipeType
+from minerva.helpers.session import open_session, close_session, serialize
+
+ADDRESS = Address("1", "Main St", "Springfield", "IL", "12345", "")
+
+
+class SerializerTests(unittest.TestCase):
+    def test_nested_objects(self):
+        employment = Employment.from_trusted(
+            {
+                "title": "Engineer",
+                "salary": 100,
+                "employer": {"name": "ACME", "address": ADDRESS.to_json(), "phone": "555-5555"},
+                "start_month": "01",
+                "start_year": "2015",
+                "id": "ID",
+            }
+        )
+        body = employment.to_response()
+        self.assertEqual(body["_id"], "ID", f"Expected the ID first -- {body}")
+        self.assertEqual(body["employer"]["address"]["city"], "Springfield", f"Got {body}")
+        stored = employment.to_json()
+        self.assertNotIn("_id", stored, f"Expected no ID in the stored form -- {stored}")
+        self.assertNotIn("id", stored, f"Expected no ID in the stored form -- {stored}")
+
+    def test_lists_of_nested_objects_and_enums(self):
+        recipe = Recipe.from_trusted(
+            {
+                "name": "Soup",
+                "ingredients": [{"amount": "1 cup", "item": "water"}],
+                "instructions": ["boil"],
+                "recipe_type": RecipeType.Soup,
+            }
+        )
+        stored = recipe.to_json()
+        self.assertEqual(stored["ingredients"], [{"amount": "1 cup", "item": "water"}])
+        self.assertEqual(stored["recipe_type"], "soup", f"Expected a plain string -- {stored}")
+
+    def test_datetimes_are_only_strings_in_responses(self):
+        created_at = datetime(2020, 1, 2, 3, 4, 5)
+        log = Log(created_at=created_at, user="USER", level="info", message="Hi", details={})
+        self.assertEqual(log.to_response()["created_at"], created_at.isoformat())
+        self.assertEqual(log.to_response()["level"], "info")
+        self.assertIs(log.to_json()["created_at"], created_at, "Expected the datetime as it is")
+
+    def test_models_are_slotted(self):
+        recipe = Recipe.from_trusted(
+            {
+                "name": "Soup",
+                "ingredients": [{"amount": "1 cup", "item": "water"}],
+                "instructions": ["boil"],
+                "recipe_type": RecipeType.Soup,
+            }
+        )
+        for item in (ADDRESS, recipe, recipe.ingredients[0]):
+            self.assertFalse(hasattr(item, "__dict__"), f"Expected no instance dict -- {item}")
+
+    def test_serialize_once_per_request(self):
+        with Flask(__name__).test_request_context():
+            open_session()
+            body = serialize(ADDRESS)
+            self.assertIs(serialize(ADDRESS), body, "Expected the same object to be reused")
+            close_session()
+        self.assertIsNot(serialize(ADDRESS), body, "Expected no reuse outside of a request")
@@ -1,5 +1,10 @@
+import time
+from datetime import datetime, timedelta
+
 from minerva import MongoConnector, Note
+from minerva.categories.tag_cascades import TagCascade, DELETE, DONE, FAILED
 from minerva.categories.tags import Tag
+from minerva.helpers.cascades import resume_tag_cascades, CASCADE_LEASE_SECONDS
 from .test_categories_base import CategoriesTestsBase
 
 
@@ -29,6 +34,25 @@ class TagsTests(CategoriesTestsBase):
     def test_create_tag_missing_body(self):
         self.verify_response_code(self.app.post("/api/v1/tags"), 400)
 
+    def test_bulk_create_tags(self):
+        response = self.verify_response_code(
+            self.app.post("/api/v1/tags/bulk", json=[{"name": "BulkOne"}, "BulkTwo"]), 207
+        )
+        items = self.assertFieldIn(response, field="items")
+        self.assertIn("id", items[0], f"Expected the first tag to be created -- {response}")
+        self.ids_to_cleanup.append(items[0]["id"])
+        self.assertIn("error", items[1], f"Expected an error for a non-object item -- {response}")
+
+    def test_upsert_tags_creates_only_missing(self):
+        with MongoConnector(Tag, is_test=True) as db:
+            created = db.upsert_tags(["First", "Upserted"])
+            # The upsert, then the collection's change counter
+            self.assertEqual(db.round_trips, 2, f"Expected a single upsert -- {db.round_trips}")
+            new_tags = [t for t in db.find_all_no_limit() if t.name == "Upserted"]
+            self.ids_to_cleanup.extend(t.id for t in new_tags)
+        self.assertEqual(created, 1, f"Expected only the missing tag to be created -- {created}")
+        self.assertEqual(len(new_tags), 1, f"Expected the missing tag to exist -- {new_tags}")
+
     # endregion
 
     # region Read
@@ -52,6 +76,66 @@ class TagsTests(CategoriesTestsBase):
     def test_get_single_nonexistent_tag(self):
         self.verify_response_code(self.app.get("/api/v1/tags/5f0113731c990801cc5d3240"), 404)
 
+    def test_get_items_by_tag(self):
+        with MongoConnector(Note, is_test=True) as db:
+            note_id = db.create(Note.from_request({"contents": "Tagged", "tags": ["First"]}))
+        try:
+            response = self.verify_response_code(self.app.get("/api/v1/tagged/First"), 200)
+            notes = self.assertFieldIn(response, field="notes")
+            self.assertEqual(len(notes), 1, f"Expected 1 tagged note -- {response}")
+            self.assertEqual(notes[0]["_id"], note_id, f"Expected the tagged note -- {response}")
+            counts = self.assertFieldIn(response, field="counts")
+            self.assertEqual(counts["notes"], 1, f"Expected a count of 1 note -- {response}")
+            self.assertEqual(counts["links"], 0, f"Expected a count of 0 links -- {response}")
+        finally:
+            with MongoConnector(Note, is_test=True) as db:
+                db.delete_one(note_id)
+
+    def test_get_items_by_tag_paginated(self):
+        with MongoConnector(Note, is_test=True) as db:
+            note_ids = [
+                db.create(Note.from_request({"contents": f"Tagged {i}", "tags": ["First"]}))
+                for i in range(3)
+            ]
+        try:
+            response = self.verify_response_code(
+                self.app.get("/api/v1/tagged/First?page=2&count=2"), 200
+            )
+            notes = self.assertFieldIn(response, field="notes")
+            self.assertEqual(len(notes), 1, f"Expected just 1 note on page 2 -- {response}")
+            counts = self.assertFieldIn(response, field="counts")
+            self.assertEqual(counts["notes"], 3, f"Expected a count of 3 notes -- {response}")
+        finally:
+            with MongoConnector(Note, is_test=True) as db:
+                for note_id in note_ids:
+                    db.delete_one(note_id)
+
+    def test_get_items_by_tag_projected(self):
+        with MongoConnector(Note, is_test=True) as db:
+            note_id = db.create(Note.from_request({"contents": "Tagged", "tags": ["First"]}))
+        try:
+            response = self.verify_response_code(
+                self.app.get("/api/v1/tagged/First?fields=contents"), 200
+            )
+            notes = self.assertFieldIn(response, field="notes")
+            self.assertEqual(
+                notes, [{"_id": note_id, "contents": "Tagged"}], f"Expected only contents -- {notes}"
+            )
+        finally:
+            with MongoConnector(Note, is_test=True) as db:
+                db.delete_one(note_id)
+
+    def test_get_items_by_tag_unknown_field(self):
+        self.verify_response_code(self.app.get("/api/v1/tagged/First?fields=nope"), 400)
+
+    def test_get_items_by_tag_page_below_one(self):
+        self.verify_response_code(self.app.get("/api/v1/tagged/First?page=0"), 400)
+        self.verify_response_code(self.app.get("/api/v1/tagged/First?page=-1&count=2"), 400)
+
+    def test_get_items_by_tag_count_below_one(self):
+        self.verify_response_code(self.app.get("/api/v1/tagged/First?page=1&count=0"), 400)
+        self.verify_response_code(self.app.get("/api/v1/tagged/First?count=-5"), 400)
+
     # endregion
 
     # region Update
@@ -86,7 +170,116 @@ class TagsTests(CategoriesTestsBase):
         response = self.verify_response_code(self.app.delete(f"/api/v1/tags/{new_id}"), 204)
         self.assertEqual(response, {}, f"Expected empty response -- {response}")
 
+    def test_delete_tag_cascade_status(self):
+        with MongoConnector(Tag, is_test=True) as db:
+            new_id = db.create(Tag.from_request({"name": "TEST_CASCADE_TAG"}))
+            self.ids_to_cleanup.append(new_id)
+        response = self.app.delete(f"/api/v1/tags/{new_id}")
+        self.verify_response_code(response, 204)
+        cascade_id = response.headers.get("X-Cascade-Id")
+        self.assertIsNotNone(cascade_id, "Expected a cascade ID header on the response")
+        cascade = self.verify_response_code(self.app.get(f"/api/v1/tags/cascades/{cascade_id}"))
+        status = self.assertFieldIn(cascade, field="status")
+        self.assertEqual(status, "done", f"Expected the cascade to be done -- {cascade}")
+
+    def test_delete_tag_async_cascade(self):
+        with MongoConnector(Tag, is_test=True) as db:
+            new_id = db.create(Tag.from_request({"name": "TEST_ASYNC_CASCADE_TAG"}))
+            self.ids_to_cleanup.append(new_id)
+        response = self.app.delete(f"/api/v1/tags/{new_id}?async=1")
+        self.verify_response_code(response, 204)
+        cascade_id = response.headers.get("X-Cascade-Id")
+        self.assertIsNotNone(cascade_id, "Expected a cascade ID header on the response")
+        status = "running"
+        for _ in range(50):
+            cascade = self.verify_response_code(
+                self.app.get(f"/api/v1/tags/cascades/{cascade_id}")
+            )
+            status = self.assertFieldIn(cascade, field="status")
+            if status != "running":
+                break
+            time.sleep(0.1)
+        self.assertEqual(status, "done", f"Expected the cascade to finish -- {status}")
+
+    def test_cascade_status_is_not_cached(self):
+        with MongoConnector(Tag, is_test=True) as db:
+            new_id = db.create(Tag.from_request({"name": "TEST_UNCACHED_CASCADE_TAG"}))
+            self.ids_to_cleanup.append(new_id)
+        response = self.app.delete(f"/api/v1/tags/{new_id}")
+        cascade_id = response.headers.get("X-Cascade-Id")
+        self.verify_response_code(self.app.get(f"/api/v1/tags/cascades/{cascade_id}"))
+        response = self.app.get(f"/api/v1/tags/cascades/{cascade_id}")
+        self.verify_response_code(response)
+        round_trips = response.headers.get("X-Round-Trips")
+        self.assertEqual(round_trips, "1", f"Expected the status to be read again -- {round_trips}")
+
+    def test_delete_tag_cascade_drops_cached_items(self):
+        with MongoConnector(Tag, is_test=True) as db:
+            new_id = db.create(Tag.from_request({"name": "TEST_CACHED_TAG"}))
+            self.ids_to_cleanup.append(new_id)
+        with MongoConnector(Note, is_test=True) as db:
+            note_id = db.create(Note.from_request({"contents": "C", "tags": ["TEST_CACHED_TAG"]}))
+        try:
+            self.verify_response_code(self.app.get(f"/api/v1/notes/{note_id}"), 200)
+            self.verify_response_code(self.app.delete(f"/api/v1/tags/{new_id}"), 204)
+            note = self.verify_response_code(self.app.get(f"/api/v1/notes/{note_id}"), 200)
+            self.assertEqual(note["tags"], [], f"Expected the cascade to reach the cache -- {note}")
+        finally:
+            with MongoConnector(Note, is_test=True) as db:
+                db.delete_one(note_id)
+
     def test_delete_nonexistent_tag(self):
         self.verify_response_code(self.app.delete("/api/v1/tags/5f0113731c990801cc5d3240"), 404)
 
+    def test_bulk_delete_tags_cascades_once_per_tag(self):
+        response = self.app.delete("/api/v1/tags/bulk", json=self.ids_to_cleanup)
+        self.verify_response_code(response, 200)
+        cascade_ids = response.headers.get("X-Cascade-Id", "").split(", ")
+        self.assertEqual(len(cascade_ids), 2, f"Expected a cascade per tag -- {cascade_ids}")
+
+    def test_resume_only_claims_abandoned_cascades(self):
+        now = datetime.now()
+        cascades = {
+            "live": TagCascade(
+                action=DELETE, old_name="LIVE", owner="other", heartbeat_at=now, pending=["Note"]
+            ),
+            "abandoned": TagCascade(
+                action=DELETE,
+                old_name="ABANDONED",
+                owner="other",
+                heartbeat_at=now - timedelta(seconds=CASCADE_LEASE_SECONDS + 1),
+                pending=["Note"],
+            ),
+            "done": TagCascade(action=DELETE, old_name="DONE", status=DONE, finished_at=now),
+        }
+        with MongoConnector(TagCascade, is_test=True) as db:
+            ids = {name: db.create(cascade) for name, cascade in cascades.items()}
+        try:
+            resumed = resume_tag_cascades([Note], is_test=True)
+            self.assertEqual(
+                [c.id for c in resumed], [ids["abandoned"]], f"Unexpected cascades -- {resumed}"
+            )
+            with MongoConnector(TagCascade, is_test=True) as db:
+                live = db.find_one(ids["live"])
+                abandoned = db.find_one(ids["abandoned"])
+            self.assertEqual(live.owner, "other", f"Expected the live cascade untouched -- {live}")
+            self.assertEqual(abandoned.status, DONE, f"Expected it to finish -- {abandoned}")
+            self.assertIsNotNone(abandoned.finished_at, "Expected the finished cascade to expire")
+        finally:
+            with MongoConnector(TagCascade, is_test=True) as db:
+                db.delete_many(list(ids.values()))
+
+    def test_cascades_are_claimed_once(self):
+        with MongoConnector(TagCascade, is_test=True) as db:
+            cascade_id = db.create(TagCascade(action=DELETE, old_name="ONCE", status=FAILED))
+            try:
+                stale_before = datetime.now()
+                first = db.claim_tag_cascade("first", stale_before)
+                second = db.claim_tag_cascade("second", stale_before)
+            finally:
+                db.delete_one(cascade_id)
+        self.assertEqual(first.id, cascade_id, f"Expected the failed cascade -- {first}")
+        self.assertEqual(first.owner, "first", f"Expected it to be claimed -- {first}")
+        self.assertIsNone(second, f"Expected a claimed cascade to be left alone -- {second}")
+
     # endregion